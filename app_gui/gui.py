@@ -3,27 +3,113 @@ import os
 os.environ.setdefault('MPLBACKEND', 'Agg')
 import tkinter as tk
 from tkinter import ttk, messagebox, filedialog
-import threading
-import subprocess
 import sys
 import shutil
 
+from lib import metrics
 from lib.auth_store import register_user, authenticate_user
-from qkdn_sim import default_topology, baseline_route, crosslayer_route, rl_route, plot_network_path  # retained (not used now)
 from app_gui.tetris import TetrisFrame
+from app_gui.tasks import TaskExecutor, run_streamed
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
 
-def run_cmd(cmd, cwd=None):
-    try:
-        subprocess.check_call(cmd, cwd=cwd)
-    except subprocess.CalledProcessError as e:
-        messagebox.showerror("Error", f"Command failed: {' '.join(cmd)}\nExit code: {e.returncode}")
+def build_pqc(ctx):
+    # Same steps as `cli pqc build`, run as a background task
+    core = os.path.join(ROOT, 'pqc_core')
+    if shutil.which('cmake'):
+        build_dir = os.path.join(core, 'build')
+        os.makedirs(build_dir, exist_ok=True)
+        run_streamed(ctx, ['cmake', '..'], cwd=build_dir)
+        run_streamed(ctx, ['make'], cwd=build_dir)
+    else:
+        run_streamed(ctx, ['make', '-C', core])
+    return 'Build finished'
+
+
+def simulate_qkd(ctx, steps, policy, chunk=10):
+    # Imported lazily: networkx/matplotlib are only needed once a simulation runs
+    from qkdn_sim import default_topology, baseline_route, crosslayer_route, rl_route
+    net = default_topology()
+    done = 0
+    while done < steps:
+        ctx.check()
+        n = min(chunk, steps - done)
+        net.step(n)
+        done += n
+        ctx.report(done / steps, f"t={net.t}")
+    ctx.report(None, f"Routing ({policy})")
+    route = {'baseline': baseline_route, 'cross': crosslayer_route}.get(policy, rl_route)
+    return net.t, route(net, 'A', 'F')
+
+
+class TaskBar(ttk.Frame):
+    """Progress bar, status text and Cancel button for one background task at a time."""
+
+    def __init__(self, master, executor):
+        super().__init__(master)
+        self.executor = executor
+        self.handle = None
+        self.status = tk.StringVar(value='')
+        self.progress = ttk.Progressbar(self, length=180, mode='indeterminate')
+        self.progress.pack(side='left', padx=4)
+        ttk.Label(self, textvariable=self.status, width=48, anchor='w').pack(side='left', padx=4)
+        self.btn_cancel = ttk.Button(self, text='Cancel', command=self.cancel, state='disabled')
+        self.btn_cancel.pack(side='left', padx=4)
+
+    @property
+    def busy(self):
+        return self.handle is not None
+
+    def run(self, fn, *args, message='Working...', on_done=None, on_error=None, on_cancel=None, **kwargs):
+        """Submit fn to the executor; the bar tracks it until done/error/cancel."""
+        if self.busy:
+            return None
+        self.status.set(message)
+        self.progress.configure(mode='indeterminate')
+        self.progress.start(12)
+        self.btn_cancel.configure(state='normal')
+
+        def finish(cb):
+            def inner(*a):
+                self._idle()
+                if cb:
+                    cb(*a)
+            return inner
+
+        def cancelled():
+            self._idle()
+            self.status.set('Cancelled')
+            if on_cancel:
+                on_cancel()
+
+        self.handle = self.executor.submit(fn, *args, on_done=finish(on_done), on_error=finish(on_error),
+                                           on_progress=self._on_progress, on_cancel=cancelled, **kwargs)
+        return self.handle
+
+    def _on_progress(self, fraction, message):
+        if fraction is not None:
+            if str(self.progress.cget('mode')) != 'determinate':
+                self.progress.stop()
+                self.progress.configure(mode='determinate', maximum=1.0)
+            self.progress['value'] = fraction
+        if message:
+            self.status.set(message[-60:])
+
+    def _idle(self):
+        self.handle = None
+        self.progress.stop()
+        self.progress['value'] = 0
+        self.btn_cancel.configure(state='disabled')
+        self.status.set('')
+
+    def cancel(self):
+        if self.handle is not None:
+            self.handle.cancel()
 
 
 class LoginFrame(ttk.Frame):
-    def __init__(self, master, on_success):
+    def __init__(self, master, on_success, executor):
         super().__init__(master)
         self.on_success = on_success
         self.username = tk.StringVar()
@@ -36,58 +122,146 @@ class LoginFrame(ttk.Frame):
 
         btns = ttk.Frame(self)
         btns.grid(row=2, column=0, columnspan=2, pady=6)
-        ttk.Button(btns, text="Login", command=self.do_login).pack(side='left', padx=4)
-        ttk.Button(btns, text="Register", command=self.do_register).pack(side='left', padx=4)
+        self.btn_login = ttk.Button(btns, text="Login", command=self.do_login)
+        self.btn_login.pack(side='left', padx=4)
+        self.btn_register = ttk.Button(btns, text="Register", command=self.do_register)
+        self.btn_register.pack(side='left', padx=4)
+
+        # PBKDF2 + KEM decapsulation + AES-GCM run off the Tk thread
+        self.tasks = TaskBar(self, executor)
+        self.tasks.grid(row=3, column=0, columnspan=2, sticky='w')
 
         self.columnconfigure(1, weight=1)
 
-    def do_login(self):
+    def _credentials(self, title):
         u = self.username.get().strip()
         p = self.password.get()
         if not u or not p:
-            messagebox.showwarning("Login", "Enter username and password")
+            messagebox.showwarning(title, "Enter username and password")
+            return None
+        return u, p
+
+    def _set_buttons(self, enabled):
+        state = 'normal' if enabled else 'disabled'
+        self.btn_login.configure(state=state)
+        self.btn_register.configure(state=state)
+
+    def _run(self, fn, creds, message, on_done, title):
+        def done(result):
+            self._set_buttons(True)
+            on_done(result)
+
+        def error(exc):
+            self._set_buttons(True)
+            messagebox.showerror(title, f"{type(exc).__name__}: {exc}")
+
+        if self.tasks.run(fn, *creds, message=message, on_done=done, on_error=error,
+                          on_cancel=lambda: self._set_buttons(True)) is not None:
+            self._set_buttons(False)
+
+    def do_login(self):
+        creds = self._credentials("Login")
+        if creds is None:
             return
-        if authenticate_user(u, p):
-            self.on_success(u)
-        else:
-            messagebox.showerror("Login", "Invalid credentials")
+        u = creds[0]
+
+        def done(ok):
+            if ok:
+                self.on_success(u)
+            else:
+                messagebox.showerror("Login", "Invalid credentials")
+        self._run(authenticate_user, creds, "Verifying credentials...", done, "Login")
 
     def do_register(self):
-        u = self.username.get().strip()
-        p = self.password.get()
-        if not u or not p:
-            messagebox.showwarning("Register", "Enter username and password")
+        creds = self._credentials("Register")
+        if creds is None:
             return
-        ok = register_user(u, p)
-        if ok:
-            messagebox.showinfo("Register", "Registration successful. You can login now.")
-        else:
-            messagebox.showerror("Register", "User already exists")
+
+        def done(ok):
+            if ok:
+                messagebox.showinfo("Register", "Registration successful. You can login now.")
+            else:
+                messagebox.showerror("Register", "User already exists")
+        self._run(register_user, creds, "Registering...", done, "Register")
 
 
 class MainFrame(ttk.Frame):
-    def __init__(self, master, username):
+    def __init__(self, master, username, executor):
         super().__init__(master)
         # Replaced content with embedded Tetris game
         ttk.Label(self, text=f"PQC Login OK - Tetris Mode (Player: {username})", font=(None, 14, 'bold')).pack(pady=8)
-        # Mount Tetris
-        tf = TetrisFrame(self, username=username)
-        tf.pack()
+
+        # Background jobs: PQC build and QKD simulation (window stays responsive)
+        tools = ttk.Frame(self)
+        tools.pack(fill='x', padx=8)
+        ttk.Button(tools, text="Build PQC", command=self.do_build).pack(side='left', padx=4)
+        self.policy = tk.StringVar(value='baseline')
+        ttk.Combobox(tools, textvariable=self.policy, values=('baseline', 'cross', 'rl'),
+                     width=9, state='readonly').pack(side='left', padx=4)
+        ttk.Button(tools, text="Run QKD sim", command=self.do_simulate).pack(side='left', padx=4)
+        self.tasks = TaskBar(tools, executor)
+        self.tasks.pack(side='left', padx=8)
+
+        # Tetris and the live QKD dashboard share a notebook; the dashboard
+        # (matplotlib/networkx) is only built when its tab is first opened
+        self.executor = executor
+        self.notebook = ttk.Notebook(self)
+        self.notebook.pack(fill='both', expand=True)
+        tf = TetrisFrame(self.notebook, username=username)
+        self.notebook.add(tf, text='Tetris')
+        self.qkd_tab = ttk.Frame(self.notebook)
+        self.notebook.add(self.qkd_tab, text='QKD live')
+        self.qkd_panel = None
+        self.notebook.bind('<<NotebookTabChanged>>', self._on_tab)
+
+    def _on_tab(self, _event):
+        if self.qkd_panel is None and self.notebook.select() == str(self.qkd_tab):
+            from app_gui.qkd_panel import QKDPanel
+            self.qkd_panel = QKDPanel(self.qkd_tab, self.executor)
+            self.qkd_panel.pack(fill='both', expand=True)
+
+    def _show_error(self, title):
+        def inner(exc):
+            detail = getattr(exc, 'output', None) or ''
+            messagebox.showerror(title, f"{type(exc).__name__}: {exc}\n{detail}".strip())
+        return inner
+
+    def do_build(self):
+        self.tasks.run(build_pqc, context=True, message="Building pqc_core...",
+                       on_done=lambda msg: messagebox.showinfo("PQC", msg),
+                       on_error=self._show_error("PQC build"))
+
+    def do_simulate(self):
+        policy = self.policy.get()
+
+        def done(result):
+            t, path = result
+            messagebox.showinfo("QKD", f"t={t}, policy={policy}\nChosen path: {' -> '.join(path)}")
+        self.tasks.run(simulate_qkd, 200, policy, context=True, message="Simulating...",
+                       on_done=done, on_error=self._show_error("QKD simulation"))
 
 
 def main():
+    metrics.start_from_env()
     root = tk.Tk()
     root.title("PQC-QKD Suite")
     root.geometry('840x600')
+    # one worker stays busy while the live QKD dashboard runs
+    executor = TaskExecutor(root, max_workers=3)
+
+    def on_close():
+        executor.shutdown()
+        root.destroy()
+    root.protocol('WM_DELETE_WINDOW', on_close)
 
     def on_success(user):
         for w in root.winfo_children():
             w.destroy()
         # Load Tetris-based main frame
-        mf = MainFrame(root, user)
+        mf = MainFrame(root, user, executor)
         mf.pack(fill='both', expand=True)
 
-    lf = LoginFrame(root, on_success=on_success)
+    lf = LoginFrame(root, on_success=on_success, executor=executor)
     lf.pack(fill='both', expand=True, padx=8, pady=8)
 
     root.mainloop()
@@ -0,0 +1,287 @@
+"""Live QKD simulation dashboard for the Tk GUI.
+
+A background task (app_gui.tasks) advances a QKDNetwork and re-routes
+every frame, publishing only the latest snapshot (t, link availability,
+path). The Tk side renders at most `fps` times per second and skips
+frames in which nothing visible changed, so the simulation rate does not
+depend on the redraw rate.
+
+The graph is drawn once: edges are a single LineCollection and nodes a
+single scatter, both created when a topology is loaded, and the rendered
+figure is cached as a background. A frame restores that background and
+blits a small overlay holding only the highlighted path and the edges
+whose colour changed. Availability is quantised to COLOR_LEVELS steps
+with one level of hysteresis, so jitter around a boundary is not
+redrawn. The full figure is only redrawn on resize or topology change, or
+once enough links changed that re-baking the background is cheaper than
+a large overlay.
+"""
+import time
+import tkinter as tk
+from tkinter import ttk, messagebox
+
+import numpy as np
+import networkx as nx
+import matplotlib
+from matplotlib.figure import Figure
+from matplotlib.collections import LineCollection
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
+
+from qkdn_sim import default_topology, random_topology, baseline_route, crosslayer_route, rl_route, resolve_node
+from qkdn_sim.model import AVAILABILITY_MIN, AVAILABILITY_MAX
+
+DEFAULT_FPS = 15
+SIM_RATE_HZ = 60          # simulation frames per second (upper bound)
+COLOR_LEVELS = 12
+HYSTERESIS = 1.0          # an edge is recoloured once it drifts this many colour levels
+BASE_WIDTH = 1.2
+PATH_WIDTH = 3.5
+PATH_COLOR = (0.85, 0.1, 0.1, 1.0)
+LABEL_LIMIT = 60          # draw node labels only for small graphs
+REBAKE_FRACTION = 0.25    # redraw the background once this share of edges changed colour
+
+ROUTERS = {'baseline': baseline_route, 'cross': crosslayer_route, 'rl': rl_route}
+TOPOLOGIES = {
+    'default (6)': lambda: default_topology(),
+    'random 100': lambda: random_topology(100),
+    'random 1000': lambda: random_topology(1000),
+    'random 5000': lambda: random_topology(5000),
+}
+
+
+def stream_simulation(ctx, net, policy, src, dst, publish, steps_per_frame=1, rate_hz=SIM_RATE_HZ):
+    """Background task: step, route, publish the newest snapshot; runs until cancelled."""
+    route = ROUTERS[policy]
+    period = 1.0 / rate_hz
+    while True:
+        ctx.check()
+        t0 = time.perf_counter()
+        net.step(steps_per_frame)
+        try:
+            path = route(net, src, dst)
+        except nx.NetworkXNoPath:
+            path = []
+        publish((net.t, net.link_state['availability'].copy(), path))
+        slack = period - (time.perf_counter() - t0)
+        if slack > 0:
+            time.sleep(slack)
+
+
+class QKDPanel(ttk.Frame):
+    def __init__(self, master, executor, fps=DEFAULT_FPS):
+        super().__init__(master)
+        self.executor = executor
+        self.handle = None
+        self.net = None
+        self._latest = None       # written by the worker, read by the Tk loop
+        self._generation = 0      # bumped per topology; stale workers' snapshots are dropped
+        self._shown = None
+        self._bg = None
+        self._frames = 0
+        self._fps_t0 = time.perf_counter()
+
+        bar = ttk.Frame(self)
+        bar.pack(fill='x', pady=4)
+        self.topology = tk.StringVar(value=next(iter(TOPOLOGIES)))
+        self.policy = tk.StringVar(value='cross')
+        self.src = tk.StringVar(value='1')
+        self.dst = tk.StringVar(value='6')
+        self.steps = tk.IntVar(value=1)
+        self.fps = tk.IntVar(value=fps)
+        topo_box = ttk.Combobox(bar, textvariable=self.topology, values=list(TOPOLOGIES), width=12, state='readonly')
+        topo_box.pack(side='left', padx=2)
+        topo_box.bind('<<ComboboxSelected>>', lambda _e: self.load_topology())
+        ttk.Combobox(bar, textvariable=self.policy, values=list(ROUTERS), width=8,
+                     state='readonly').pack(side='left', padx=2)
+        for label, var in (('src', self.src), ('dst', self.dst)):
+            ttk.Label(bar, text=label).pack(side='left')
+            ttk.Entry(bar, textvariable=var, width=6).pack(side='left', padx=2)
+        ttk.Label(bar, text='steps/frame').pack(side='left')
+        ttk.Spinbox(bar, from_=1, to=100, textvariable=self.steps, width=4).pack(side='left', padx=2)
+        ttk.Label(bar, text='fps').pack(side='left')
+        ttk.Spinbox(bar, from_=1, to=60, textvariable=self.fps, width=4).pack(side='left', padx=2)
+        self.btn_start = ttk.Button(bar, text='Start', command=self.start)
+        self.btn_start.pack(side='left', padx=2)
+        self.btn_stop = ttk.Button(bar, text='Stop', command=self.stop, state='disabled')
+        self.btn_stop.pack(side='left', padx=2)
+        self.status = tk.StringVar(value='')
+        ttk.Label(self, textvariable=self.status, anchor='w').pack(fill='x')
+
+        self.figure = Figure(figsize=(7, 4.2), dpi=100)
+        self.ax = self.figure.add_axes([0.01, 0.01, 0.98, 0.98])
+        self.canvas = FigureCanvasTkAgg(self.figure, master=self)
+        self.canvas.get_tk_widget().pack(fill='both', expand=True)
+        self.canvas.mpl_connect('draw_event', self._on_draw)
+
+        cmap = matplotlib.colormaps['RdYlGn']
+        self._palette = cmap(np.linspace(0.0, 1.0, COLOR_LEVELS))
+
+        self.load_topology()
+        self.after(self._interval(), self._render)
+
+    # ----------------------------- scene ----------------------------- #
+
+    def load_topology(self):
+        self.stop()
+        self._generation += 1
+        self.net = TOPOLOGIES[self.topology.get()]()
+        net = self.net
+        nodes = list(net.nodes)
+        xy = np.array([(net.nodes[n]['x'], net.nodes[n]['y']) for n in nodes], dtype=float)
+        pos = {n: i for i, n in enumerate(nodes)}
+        self._edge_index = {}
+        segs = np.empty((len(net.edge_list), 2, 2))
+        for i, (u, v) in enumerate(net.edge_list):
+            segs[i, 0] = xy[pos[u]]
+            segs[i, 1] = xy[pos[v]]
+            self._edge_index[(u, v)] = i
+            self._edge_index[(v, u)] = i
+        n_edges = len(segs)
+        self._segs = segs
+        self._base_levels = np.full(n_edges, COLOR_LEVELS - 1)   # what the background shows
+        self._shown_key = None
+
+        ax = self.ax
+        ax.clear()
+        ax.set_axis_off()
+        self.edges = LineCollection(segs, linewidths=BASE_WIDTH, colors=self._palette[self._base_levels], zorder=1)
+        ax.add_collection(self.edges)
+        # changed/highlighted edges only, drawn over the cached background
+        self.overlay = LineCollection([], zorder=1.5, animated=True)
+        ax.add_collection(self.overlay)
+        small = len(nodes) <= LABEL_LIMIT
+        size = 300 if small else max(2, 4000 // len(nodes))
+        # small graphs: nodes/labels stay above the overlay; large graphs: dots live in the background
+        self.nodes = ax.scatter(xy[:, 0], xy[:, 1], s=size, c='#246', zorder=2, animated=small)
+        self.labels = []
+        if small:
+            self.labels = [ax.text(x, y, str(n), color='white', ha='center', va='center', fontsize=8,
+                                   zorder=3, animated=True) for n, (x, y) in zip(nodes, xy)]
+        pad = 0.05 * max(np.ptp(xy[:, 0]), np.ptp(xy[:, 1]), 1.0)
+        ax.set_xlim(xy[:, 0].min() - pad, xy[:, 0].max() + pad)
+        ax.set_ylim(xy[:, 1].min() - pad, xy[:, 1].max() + pad)
+        self._shown = None
+        self._latest = (net.t, net.link_state['availability'].copy(), [])
+        self._bg = None
+        self.canvas.draw()  # full draw once; draw_event captures the background
+
+    def _animated(self):
+        return [self.overlay] + ([self.nodes] if self.nodes.get_animated() else []) + self.labels
+
+    def _on_draw(self, event):
+        self._bg = self.canvas.copy_from_bbox(self.ax.bbox)
+        for artist in self._animated():
+            self.ax.draw_artist(artist)
+
+    def _blit(self):
+        if self._bg is None:
+            self.canvas.draw()
+            return
+        self.canvas.restore_region(self._bg)
+        for artist in self._animated():
+            self.ax.draw_artist(artist)
+        self.canvas.blit(self.ax.bbox)
+
+    def _apply(self, snap):
+        """Update the overlay from a snapshot; returns True if anything visible changed.
+
+        Only edges whose quantised colour differs from the background, plus
+        the highlighted path, are in the overlay. Once more than
+        REBAKE_FRACTION of the edges differ, the colours are baked into the
+        background with one full redraw and the overlay starts empty again.
+        """
+        _t, avail, path = snap
+        span = AVAILABILITY_MAX - AVAILABILITY_MIN
+        scaled = np.clip((avail - AVAILABILITY_MIN) / span * (COLOR_LEVELS - 1), 0, COLOR_LEVELS - 1)
+        levels = self._base_levels.copy()
+        drifted = np.abs(scaled - levels) >= HYSTERESIS
+        levels[drifted] = np.rint(scaled[drifted])
+        on_path = np.array([self._edge_index[e] for e in zip(path[:-1], path[1:]) if e in self._edge_index], dtype=int)
+        changed = np.flatnonzero(drifted)
+        if len(changed) > REBAKE_FRACTION * len(levels):
+            self._base_levels = levels
+            self.edges.set_color(self._palette[levels])
+            changed = changed[:0]
+            self._bg = None  # next _blit does a full draw
+        idx = np.union1d(changed, on_path)
+        key = (idx.tobytes(), levels[idx].tobytes(), on_path.tobytes())
+        if key == self._shown_key and self._bg is not None:
+            return False
+        self._shown_key = key
+        colors = self._palette[levels[idx]]
+        widths = np.full(len(idx), BASE_WIDTH)
+        hot = np.isin(idx, on_path)
+        colors[hot] = PATH_COLOR
+        widths[hot] = PATH_WIDTH
+        self.overlay.set_segments(self._segs[idx])
+        self.overlay.set_color(colors)
+        self.overlay.set_linewidths(widths)
+        return True
+
+    # ----------------------------- loop ----------------------------- #
+
+    def _interval(self):
+        try:
+            return max(1, int(1000 / max(1, self.fps.get())))
+        except tk.TclError:
+            return 1000 // DEFAULT_FPS
+
+    def _render(self):
+        if not self.winfo_exists():
+            return
+        snap = self._latest
+        if snap is not None and snap is not self._shown:
+            self._shown = snap
+            if self._apply(snap):
+                self._blit()
+                self._frames += 1
+            now = time.perf_counter()
+            if now - self._fps_t0 >= 1.0:
+                path = snap[2]
+                self.status.set(f"t={snap[0]}  redraws/s={self._frames / (now - self._fps_t0):.1f}  "
+                                f"path: {' -> '.join(map(str, path)) if len(path) <= 12 else f'{len(path)} hops'}")
+                self._frames = 0
+                self._fps_t0 = now
+        self.after(self._interval(), self._render)
+
+    def _publisher(self):
+        generation = self._generation
+
+        def publish(snap):
+            # single reference assignment; the renderer picks up the newest
+            if generation == self._generation:
+                self._latest = snap
+        return publish
+
+    def start(self):
+        if self.handle is not None:
+            return
+        try:
+            src = resolve_node(self.net, self.src.get().strip())
+            dst = resolve_node(self.net, self.dst.get().strip())
+        except KeyError as e:
+            messagebox.showerror('QKD', str(e))
+            return
+        self.btn_start.configure(state='disabled')
+        self.btn_stop.configure(state='normal')
+
+        def finished(*_):
+            self.handle = None
+            self.btn_start.configure(state='normal')
+            self.btn_stop.configure(state='disabled')
+
+        def failed(exc):
+            finished()
+            messagebox.showerror('QKD', f"{type(exc).__name__}: {exc}")
+
+        self.handle = self.executor.submit(stream_simulation, self.net, self.policy.get(), src, dst, self._publisher(),
+                                           max(1, self.steps.get()), context=True, name='qkd-live',
+                                           on_done=finished, on_error=failed, on_cancel=finished)
+
+    def stop(self):
+        if self.handle is not None:
+            self.handle.cancel()
+
+    def destroy(self):
+        self.stop()
+        super().destroy()
@@ -0,0 +1,203 @@
+"""Background task executor for the Tk GUI.
+
+Tk widgets may only be touched from the main loop thread, and anything
+slow (PBKDF2, KEM decapsulation, builds, simulations) freezes the window
+if it runs in a callback. TaskExecutor runs such work on a small thread
+pool and hands every event back to the main loop through a queue drained
+by `after()` polling, so callbacks (on_done / on_error / on_progress /
+on_cancel) always run on the Tk thread.
+
+Tasks that accept a TaskContext (submit(..., context=True)) can report
+progress and check for cancellation. Cancelling a task that has not
+started yet prevents it from running. Cancelling a running task sets its
+flag: cooperative tasks stop at the next ctx.check(), subprocesses are
+terminated, and any late result is discarded. Non-cooperative work such
+as one PBKDF2 call is abandoned rather than interrupted.
+"""
+from __future__ import annotations
+import queue
+import logging
+import collections
+import subprocess
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, List, Optional, Sequence
+
+POLL_MS = 40
+
+log = logging.getLogger(__name__)
+
+
+class TaskCancelled(Exception):
+    """Raised by TaskContext.check() once the task has been cancelled."""
+
+
+class TaskContext:
+    """Handed to cooperative tasks: progress reporting and cancellation checks."""
+
+    def __init__(self, handle: "TaskHandle"):
+        self._handle = handle
+
+    @property
+    def cancelled(self) -> bool:
+        return self._handle.cancelled
+
+    def check(self) -> None:
+        if self._handle.cancelled:
+            raise TaskCancelled()
+
+    def attach_process(self, proc: subprocess.Popen) -> None:
+        """Terminate proc when the task is cancelled."""
+        self._handle._proc = proc
+        if self._handle.cancelled:
+            proc.terminate()
+
+    def report(self, fraction: Optional[float] = None, message: Optional[str] = None) -> None:
+        """fraction in [0, 1] (None = indeterminate) and/or a status message."""
+        self._handle._post('progress', (fraction, message))
+
+
+class TaskHandle:
+    def __init__(self, executor: "TaskExecutor", name: str):
+        self.name = name
+        self.future: Optional[Future] = None
+        self._executor = executor
+        self._cancel = threading.Event()
+        self._proc: Optional[subprocess.Popen] = None
+        self.on_done: Optional[Callable[[Any], None]] = None
+        self.on_error: Optional[Callable[[BaseException], None]] = None
+        self.on_progress: Optional[Callable[[Optional[float], Optional[str]], None]] = None
+        self.on_cancel: Optional[Callable[[], None]] = None
+
+    @property
+    def cancelled(self) -> bool:
+        return self._cancel.is_set()
+
+    def done(self) -> bool:
+        return self.future is not None and self.future.done()
+
+    def cancel(self) -> None:
+        if self._cancel.is_set():
+            return
+        self._cancel.set()
+        if self.future is not None and self.future.cancel():
+            self._post('cancelled', None)  # never started
+        proc = self._proc
+        if proc is not None and proc.poll() is None:
+            proc.terminate()
+
+    def _post(self, kind: str, payload: Any) -> None:
+        self._executor._events.put((self, kind, payload))
+
+
+def run_streamed(ctx: TaskContext, cmd: Sequence[str], cwd: Optional[str] = None) -> int:
+    """Run cmd inside a task, reporting each output line; raises on failure or cancel."""
+    proc = subprocess.Popen(list(cmd), cwd=cwd, stdout=subprocess.PIPE, stderr=subprocess.STDOUT,
+                            text=True, bufsize=1)
+    ctx.attach_process(proc)
+    tail: collections.deque = collections.deque(maxlen=20)
+    for line in proc.stdout:
+        line = line.rstrip('\n')
+        tail.append(line)
+        ctx.report(None, line)
+    rc = proc.wait()
+    ctx.check()
+    if rc != 0:
+        raise subprocess.CalledProcessError(rc, list(cmd), output='\n'.join(tail))
+    return rc
+
+
+class TaskExecutor:
+    """Thread pool whose results are delivered on the Tk main loop."""
+
+    def __init__(self, widget, max_workers: int = 2, poll_ms: int = POLL_MS):
+        self.widget = widget
+        self.poll_ms = poll_ms
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='gui-task')
+        self._events: "queue.Queue" = queue.Queue()
+        self._active: List[TaskHandle] = []
+        self._polling = False
+        self._closed = False
+
+    def submit(self, fn: Callable, *args, name: Optional[str] = None, context: bool = False,
+               on_done=None, on_error=None, on_progress=None, on_cancel=None, **kwargs) -> TaskHandle:
+        """Run fn(*args, **kwargs) (or fn(ctx, *args, **kwargs) with context=True) in the pool."""
+        if self._closed:
+            raise RuntimeError('executor is shut down')
+        handle = TaskHandle(self, name or getattr(fn, '__name__', 'task'))
+        handle.on_done, handle.on_error = on_done, on_error
+        handle.on_progress, handle.on_cancel = on_progress, on_cancel
+
+        def run():
+            if handle.cancelled:
+                handle._post('cancelled', None)
+                return
+            try:
+                result = fn(TaskContext(handle), *args, **kwargs) if context else fn(*args, **kwargs)
+            except TaskCancelled:
+                handle._post('cancelled', None)
+            except BaseException as e:  # delivered to on_error on the Tk thread
+                handle._post('cancelled' if handle.cancelled else 'error', e)
+            else:
+                handle._post('cancelled' if handle.cancelled else 'done', result)
+
+        self._active.append(handle)
+        handle.future = self._pool.submit(run)
+        self._ensure_polling()
+        return handle
+
+    def run_process(self, cmd: Sequence[str], cwd: Optional[str] = None, **callbacks) -> TaskHandle:
+        """Run a subprocess in the pool; each output line is reported as progress.
+
+        on_done receives the return code. A non-zero exit goes to on_error as
+        CalledProcessError (with the captured tail of the output).
+        """
+        def work(ctx: TaskContext):
+            return run_streamed(ctx, cmd, cwd)
+
+        return self.submit(work, name=' '.join(cmd), context=True, **callbacks)
+
+    def _ensure_polling(self) -> None:
+        if not self._polling:
+            self._polling = True
+            self.widget.after(self.poll_ms, self._poll)
+
+    def _poll(self) -> None:
+        try:
+            while True:
+                try:
+                    handle, kind, payload = self._events.get_nowait()
+                except queue.Empty:
+                    break
+                self._dispatch(handle, kind, payload)
+        finally:
+            # reschedule even if something above raised, or _ensure_polling
+            # would see _polling stuck at True and never poll again
+            if self._active and not self._closed:
+                self.widget.after(self.poll_ms, self._poll)
+            else:
+                self._polling = False
+
+    def _dispatch(self, handle: TaskHandle, kind: str, payload: Any) -> None:
+        if kind == 'progress':
+            cb = handle.on_progress if not handle.cancelled else None
+            args = payload
+        else:
+            if handle in self._active:
+                self._active.remove(handle)
+            cb = {'done': handle.on_done, 'error': handle.on_error, 'cancelled': handle.on_cancel}[kind]
+            args = () if kind == 'cancelled' else (payload,)
+        if cb is None:
+            return
+        try:
+            cb(*args)
+        except Exception:
+            # one faulty callback must not drop the remaining events
+            log.exception('%s callback of task %r failed', kind, handle.name)
+
+    def shutdown(self) -> None:
+        """Cancel everything and stop the pool without waiting (e.g. on window close)."""
+        self._closed = True
+        for handle in list(self._active):
+            handle.cancel()
+        self._pool.shutdown(wait=False, cancel_futures=True)
@@ -1,21 +1,11 @@
 import tkinter as tk
-import random
-from dataclasses import dataclass
 
-BOARD_WIDTH = 10
-BOARD_HEIGHT = 20
-CELL_SIZE = 24
+from app_gui.tetris_engine import (  # noqa: F401  (re-exported for existing imports)
+    BOARD_WIDTH, BOARD_HEIGHT, SHAPES, SCORE_TABLE, LEVEL_LINES,
+    INITIAL_DELAY, MIN_DELAY, DELAY_STEP, Piece, TetrisEngine,
+)
 
-# Standard tetromino shapes with rotation states (list of (x,y) relative coords)
-SHAPES = {
-    'I': [ [(0,0),(1,0),(2,0),(3,0)], [(2,-1),(2,0),(2,1),(2,2)] ],
-    'O': [ [(0,0),(1,0),(0,1),(1,1)] ],
-    'T': [ [(0,0),(1,0),(2,0),(1,1)], [(1,0),(0,1),(1,1),(1,2)], [(1,0),(0,1),(1,1),(2,1)], [(0,0),(0,1),(1,1),(0,2)] ],
-    'S': [ [(1,0),(2,0),(0,1),(1,1)], [(0,0),(0,1),(1,1),(1,2)] ],
-    'Z': [ [(0,0),(1,0),(1,1),(2,1)], [(1,0),(0,1),(1,1),(0,2)] ],
-    'J': [ [(0,0),(0,1),(1,1),(2,1)], [(0,0),(1,0),(0,1),(0,2)], [(0,0),(1,0),(2,0),(2,1)], [(1,0),(1,1),(0,2),(1,2)] ],
-    'L': [ [(2,0),(0,1),(1,1),(2,1)], [(0,0),(0,1),(0,2),(1,2)], [(0,0),(1,0),(2,0),(0,1)], [(0,0),(1,0),(1,1),(1,2)] ],
-}
+CELL_SIZE = 24
 
 # Color mapping (requested colors): red, blue, yellow, orange, green, purple, cyan
 COLORS = {
@@ -28,32 +18,17 @@ COLORS = {
     'L': '#ff9800',  # orange
 }
 
-SCORE_TABLE = {1:100, 2:300, 3:500, 4:800}
-LEVEL_LINES = 10
-INITIAL_DELAY = 1000  # ms
-MIN_DELAY = 80
-DELAY_STEP = 70
-
-@dataclass
-class Piece:
-    shape: str
-    rotation: int
-    x: int
-    y: int
 
 class TetrisGame(tk.Frame):
-    def __init__(self, master, on_game_over=None):
+    """Tk view/controller over a headless TetrisEngine."""
+
+    def __init__(self, master, on_game_over=None, seed=None):
         super().__init__(master)
         self.on_game_over = on_game_over
-        self.board = [[None for _ in range(BOARD_WIDTH)] for _ in range(BOARD_HEIGHT)]
-        self.current = None
-        self.next_shape = self.random_shape()
-        self.score = 0
-        self.lines = 0
-        self.level = 0
-        self.delay = INITIAL_DELAY
+        self.engine = TetrisEngine(seed=seed)
         self.running = True
-        self.game_over_flag = False
+        self._game_over_reported = False
+        self._step_id = None  # pending gravity callback (at most one)
 
         # UI Layout
         self.canvas = tk.Canvas(self, width=BOARD_WIDTH*CELL_SIZE, height=BOARD_HEIGHT*CELL_SIZE, bg='#111')
@@ -74,164 +49,121 @@ class TetrisGame(tk.Frame):
         controls_txt = 'Controls:\n←/→: Move\n↑: Rotate\n↓: Soft Drop\nSpace: Hard Drop\nR: Restart'
         tk.Label(side, text=controls_txt, justify='left', font=('Arial', 10)).pack(anchor='w', pady=(8,0))
 
-        self.spawn_piece()
-        self.draw_preview()
         self.draw()
 
         self.bind_all('<Key>', self.on_key)
-        self.after(self.delay, self.step)
+        self._schedule_step()
 
-    def random_shape(self):
-        return random.choice(list(SHAPES.keys()))
+    # legacy attribute names, backed by the engine
+    @property
+    def score(self):
+        return self.engine.score
 
-    def spawn_piece(self):
-        shape = self.next_shape
-        self.next_shape = self.random_shape()
-        # center spawn
-        self.current = Piece(shape=shape, rotation=0, x=BOARD_WIDTH//2 - 2, y=0)
-        if self.collision(self.current):
-            self.game_over()
+    @property
+    def lines(self):
+        return self.engine.lines
+
+    @property
+    def level(self):
+        return self.engine.level
 
-    def rotation_states(self, piece):
-        return SHAPES[piece.shape]
-
-    def cells(self, piece):
-        states = self.rotation_states(piece)
-        coords = states[piece.rotation % len(states)]
-        return [(piece.x + cx, piece.y + cy) for (cx, cy) in coords]
-
-    def collision(self, piece):
-        for x,y in self.cells(piece):
-            if x < 0 or x >= BOARD_WIDTH or y < 0 or y >= BOARD_HEIGHT:
-                return True
-            if y >=0 and self.board[y][x] is not None:
-                return True
-        return False
-
-    def lock_piece(self):
-        for x,y in self.cells(self.current):
-            if 0 <= y < BOARD_HEIGHT:
-                self.board[y][x] = COLORS[self.current.shape]
-        self.clear_lines()
-        self.spawn_piece()
-
-    def clear_lines(self):
-        new_board = [row for row in self.board if any(cell is None for cell in row)]
-        cleared = BOARD_HEIGHT - len(new_board)
-        while len(new_board) < BOARD_HEIGHT:
-            new_board.insert(0, [None]*BOARD_WIDTH)
-        self.board = new_board
+    @property
+    def game_over_flag(self):
+        return self.engine.game_over
+
+    def _after_lock(self, cleared):
         if cleared > 0:
-            self.lines += cleared
-            self.score += SCORE_TABLE.get(cleared, 100*cleared)
-            prev_level = self.level
-            self.level = self.lines // LEVEL_LINES
-            if self.level != prev_level:
-                # speed up
-                self.delay = max(MIN_DELAY, INITIAL_DELAY - self.level*DELAY_STEP)
             self.update_labels()
+        if self.engine.game_over:
+            self.game_over()
 
     def update_labels(self):
         self.lbl_score.config(text=f'Score: {self.score}')
         self.lbl_lines.config(text=f'Lines: {self.lines}')
         self.lbl_level.config(text=f'Level: {self.level}')
 
+    def _schedule_step(self):
+        # replace any pending gravity tick so only one loop ever runs
+        if self._step_id is not None:
+            self.after_cancel(self._step_id)
+        self._step_id = self.after(self.engine.delay, self.step)
+
     def step(self):
+        self._step_id = None
         if not self.running:
             return
         if self.game_over_flag:
             return
-        # try move down
-        nxt = Piece(self.current.shape, self.current.rotation, self.current.x, self.current.y + 1)
-        if self.collision(nxt):
-            # lock
-            self.lock_piece()
-        else:
-            self.current = nxt
+        cleared = self.engine.tick()
+        if cleared >= 0:
+            self._after_lock(cleared)
         self.draw()
-        self.after(self.delay, self.step)
+        if not self.game_over_flag:
+            self._schedule_step()
 
     def on_key(self, event):
         if self.game_over_flag and event.keysym.lower() != 'r':
             return
         k = event.keysym
+        eng = self.engine
         if k in ['Left','Right']:
-            dx = -1 if k=='Left' else 1
-            nxt = Piece(self.current.shape, self.current.rotation, self.current.x + dx, self.current.y)
-            if not self.collision(nxt):
-                self.current = nxt
+            if eng.move(-1 if k=='Left' else 1):
                 self.draw()
         elif k == 'Up':
-            nxt = Piece(self.current.shape, self.current.rotation + 1, self.current.x, self.current.y)
-            if not self.collision(nxt):
-                self.current = nxt
+            if eng.rotate():
                 self.draw()
         elif k == 'Down':
-            nxt = Piece(self.current.shape, self.current.rotation, self.current.x, self.current.y + 1)
-            if not self.collision(nxt):
-                self.current = nxt
+            if eng.soft_drop():
                 self.draw()
         elif k == 'space':
-            # hard drop
-            temp = Piece(self.current.shape, self.current.rotation, self.current.x, self.current.y)
-            while True:
-                nxt = Piece(temp.shape, temp.rotation, temp.x, temp.y + 1)
-                if self.collision(nxt):
-                    break
-                temp = nxt
-            self.current = temp
-            self.lock_piece()
+            self._after_lock(eng.hard_drop())
             self.draw()
         elif k.lower() == 'r':
             self.restart()
 
     def restart(self):
-        self.board = [[None for _ in range(BOARD_WIDTH)] for _ in range(BOARD_HEIGHT)]
-        self.score = 0
-        self.lines = 0
-        self.level = 0
-        self.delay = INITIAL_DELAY
-        self.game_over_flag = False
-        self.next_shape = self.random_shape()
-        self.spawn_piece()
+        self.engine.reset()
+        self._game_over_reported = False
         self.update_labels()
-        self.draw_preview()
         self.draw()
-        if not self.running:
-            self.running = True
-            self.after(self.delay, self.step)
+        self.running = True
+        # a tick queued before a hard-drop game over may still be pending
+        self._schedule_step()
 
     def game_over(self):
-        self.game_over_flag = True
         self.draw()  # to overlay text
-        if self.on_game_over:
+        if self.on_game_over and not self._game_over_reported:
+            self._game_over_reported = True
             self.on_game_over()
 
     def draw_preview(self):
         self.preview.delete('all')
-        states = SHAPES[self.next_shape][0]
+        shape = self.engine.next_shape
+        states = SHAPES[shape][0]
         min_x = min(x for x,_ in states)
         min_y = min(y for _,y in states)
         for cx, cy in states:
             x = (cx - min_x + 1) * CELL_SIZE
             y = (cy - min_y + 1) * CELL_SIZE
-            self.preview.create_rectangle(x, y, x+CELL_SIZE, y+CELL_SIZE, fill=COLORS[self.next_shape], outline='#333')
+            self.preview.create_rectangle(x, y, x+CELL_SIZE, y+CELL_SIZE, fill=COLORS[shape], outline='#333')
 
     def draw(self):
         self.canvas.delete('all')
+        eng = self.engine
         # grid
         for y in range(BOARD_HEIGHT):
+            row = eng.rows[y]
             for x in range(BOARD_WIDTH):
-                color = self.board[y][x]
-                if color:
+                if row >> x & 1:
+                    color = COLORS[eng.kinds[y][x]]
                     self.canvas.create_rectangle(x*CELL_SIZE, y*CELL_SIZE, (x+1)*CELL_SIZE, (y+1)*CELL_SIZE, fill=color, outline='#222')
                 else:
                     self.canvas.create_rectangle(x*CELL_SIZE, y*CELL_SIZE, (x+1)*CELL_SIZE, (y+1)*CELL_SIZE, fill='#181818', outline='#202020')
         # current piece
         if not self.game_over_flag:
-            for x,y in self.cells(self.current):
+            for x,y in eng.cells():
                 if y >=0:
-                    self.canvas.create_rectangle(x*CELL_SIZE, y*CELL_SIZE, (x+1)*CELL_SIZE, (y+1)*CELL_SIZE, fill=COLORS[self.current.shape], outline='#222')
+                    self.canvas.create_rectangle(x*CELL_SIZE, y*CELL_SIZE, (x+1)*CELL_SIZE, (y+1)*CELL_SIZE, fill=COLORS[eng.current.shape], outline='#222')
         # game over overlay
         if self.game_over_flag:
             self.canvas.create_rectangle(0, BOARD_HEIGHT*CELL_SIZE//3, BOARD_WIDTH*CELL_SIZE, BOARD_HEIGHT*CELL_SIZE*2//3, fill='#000000', stipple='gray50')
@@ -0,0 +1,256 @@
+"""Headless Tetris engine (no Tk dependency).
+
+Board rows are integer bitmasks (bit x set = cell occupied), row 0 at the
+top. Every shape/rotation is precomputed as (dy, mask) pairs already
+shifted for each legal x, so a collision test is a table lookup plus a
+few ANDs, and a full row is simply `row == FULL`.
+
+The piece sequence comes from a seeded random.Random, so a game is fully
+reproducible from its seed and input sequence. app_gui.tetris renders
+from this engine; benchmark() runs random-policy games headless:
+
+  PYTHONPATH=. python scripts/bench_tetris.py --games 2000
+"""
+from __future__ import annotations
+import random
+import time
+from functools import lru_cache
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Tuple
+
+BOARD_WIDTH = 10
+BOARD_HEIGHT = 20
+
+# Standard tetromino shapes with rotation states (list of (x,y) relative coords)
+SHAPES = {
+    'I': [ [(0,0),(1,0),(2,0),(3,0)], [(2,-1),(2,0),(2,1),(2,2)] ],
+    'O': [ [(0,0),(1,0),(0,1),(1,1)] ],
+    'T': [ [(0,0),(1,0),(2,0),(1,1)], [(1,0),(0,1),(1,1),(1,2)], [(1,0),(0,1),(1,1),(2,1)], [(0,0),(0,1),(1,1),(0,2)] ],
+    'S': [ [(1,0),(2,0),(0,1),(1,1)], [(0,0),(0,1),(1,1),(1,2)] ],
+    'Z': [ [(0,0),(1,0),(1,1),(2,1)], [(1,0),(0,1),(1,1),(0,2)] ],
+    'J': [ [(0,0),(0,1),(1,1),(2,1)], [(0,0),(1,0),(0,1),(0,2)], [(0,0),(1,0),(2,0),(2,1)], [(1,0),(1,1),(0,2),(1,2)] ],
+    'L': [ [(2,0),(0,1),(1,1),(2,1)], [(0,0),(0,1),(0,2),(1,2)], [(0,0),(1,0),(2,0),(0,1)], [(0,0),(1,0),(1,1),(1,2)] ],
+}
+SHAPE_NAMES = tuple(SHAPES)
+
+SCORE_TABLE = {1:100, 2:300, 3:500, 4:800}
+LEVEL_LINES = 10
+INITIAL_DELAY = 1000  # ms
+MIN_DELAY = 80
+DELAY_STEP = 70
+
+
+@dataclass
+class Piece:
+    shape: str
+    rotation: int
+    x: int
+    y: int
+
+
+@lru_cache(maxsize=None)
+def _build_masks(width: int) -> Dict[str, List[Dict[int, Tuple[Tuple[int, int], ...]]]]:
+    """shape -> rotation -> {x: ((dy, row mask), ...)} for every x that keeps the piece inside the walls."""
+    table: Dict[str, List[Dict[int, Tuple[Tuple[int, int], ...]]]] = {}
+    for name, states in SHAPES.items():
+        per_rot = []
+        for coords in states:
+            rows: Dict[int, int] = {}
+            for cx, cy in coords:
+                rows[cy] = rows.get(cy, 0) | (1 << cx)
+            min_x = min(cx for cx, _ in coords)
+            max_x = max(cx for cx, _ in coords)
+            per_rot.append({
+                x: tuple((dy, m << x if x >= 0 else m >> -x) for dy, m in sorted(rows.items()))
+                for x in range(-min_x, width - max_x)
+            })
+        table[name] = per_rot
+    return table
+
+
+class PieceGenerator:
+    """Deterministic piece sequence: uniform choice from a seeded Random."""
+
+    def __init__(self, seed: Optional[int] = None):
+        self.seed = seed
+        self._rng = random.Random(seed)
+
+    def __call__(self) -> str:
+        return self._rng.choice(SHAPE_NAMES)
+
+
+class TetrisEngine:
+    """Game state and rules; rendering and timing are left to the caller."""
+
+    def __init__(self, seed: Optional[int] = None, width: int = BOARD_WIDTH, height: int = BOARD_HEIGHT):
+        self.width = width
+        self.height = height
+        self.full = (1 << width) - 1
+        self._masks = _build_masks(width)
+        self.reset(seed)
+
+    def reset(self, seed: Optional[int] = None) -> None:
+        self.rows: List[int] = [0] * self.height
+        # shape letter per cell, only touched on lock/clear (for colour rendering)
+        self.kinds: List[List[Optional[str]]] = [[None] * self.width for _ in range(self.height)]
+        self.generator = PieceGenerator(seed)
+        self.score = 0
+        self.lines = 0
+        self.level = 0
+        self.delay = INITIAL_DELAY
+        self.pieces = 0
+        self.game_over = False
+        self.current: Optional[Piece] = None
+        self.next_shape = self.generator()
+        self.spawn_piece()
+
+    # ----------------------------- rules ----------------------------- #
+
+    def _fits(self, shape: str, rotation: int, x: int, y: int) -> bool:
+        states = self._masks[shape]
+        cells = states[rotation % len(states)].get(x)
+        if cells is None:
+            return False
+        rows = self.rows
+        height = self.height
+        for dy, m in cells:
+            yy = y + dy
+            if yy < 0 or yy >= height or rows[yy] & m:
+                return False
+        return True
+
+    def collision(self, piece: Piece) -> bool:
+        return not self._fits(piece.shape, piece.rotation, piece.x, piece.y)
+
+    def cells(self, piece: Optional[Piece] = None) -> List[Tuple[int, int]]:
+        p = piece or self.current
+        states = SHAPES[p.shape]
+        return [(p.x + cx, p.y + cy) for cx, cy in states[p.rotation % len(states)]]
+
+    def spawn_piece(self) -> None:
+        shape = self.next_shape
+        self.next_shape = self.generator()
+        # center spawn
+        self.current = Piece(shape=shape, rotation=0, x=self.width // 2 - 2, y=0)
+        if not self._fits(shape, 0, self.current.x, 0):
+            self.game_over = True
+
+    def _try(self, dx: int, dy: int, drot: int) -> bool:
+        p = self.current
+        if self.game_over or not self._fits(p.shape, p.rotation + drot, p.x + dx, p.y + dy):
+            return False
+        p.x += dx
+        p.y += dy
+        p.rotation += drot
+        return True
+
+    def move(self, dx: int) -> bool:
+        return self._try(dx, 0, 0)
+
+    def rotate(self) -> bool:
+        return self._try(0, 0, 1)
+
+    def soft_drop(self) -> bool:
+        return self._try(0, 1, 0)
+
+    def tick(self) -> int:
+        """Gravity step. Returns lines cleared if the piece locked, else -1."""
+        if self.game_over:
+            return -1
+        if self._try(0, 1, 0):
+            return -1
+        return self.lock_piece()
+
+    def hard_drop(self) -> int:
+        """Drop and lock the current piece. Returns lines cleared."""
+        if self.game_over:
+            return 0
+        while self._try(0, 1, 0):
+            pass
+        return self.lock_piece()
+
+    def lock_piece(self) -> int:
+        p = self.current
+        states = self._masks[p.shape]
+        rot = p.rotation % len(states)
+        rows = self.rows
+        full = self.full
+        completed = False
+        for dy, m in states[rot][p.x]:
+            r = rows[p.y + dy] | m
+            rows[p.y + dy] = r
+            completed = completed or r == full
+        for x, y in self.cells(p):
+            self.kinds[y][x] = p.shape
+        self.pieces += 1
+        # only rows the piece touched can have become full
+        cleared = self.clear_lines() if completed else 0
+        self.spawn_piece()
+        return cleared
+
+    def clear_lines(self) -> int:
+        full = self.full
+        keep = [i for i, r in enumerate(self.rows) if r != full]
+        cleared = self.height - len(keep)
+        if cleared:
+            self.rows = [0] * cleared + [self.rows[i] for i in keep]
+            self.kinds = [[None] * self.width for _ in range(cleared)] + [self.kinds[i] for i in keep]
+            self.lines += cleared
+            self.score += SCORE_TABLE.get(cleared, 100 * cleared)
+            prev_level = self.level
+            self.level = self.lines // LEVEL_LINES
+            if self.level != prev_level:
+                # speed up
+                self.delay = max(MIN_DELAY, INITIAL_DELAY - self.level * DELAY_STEP)
+        return cleared
+
+    def kind_at(self, x: int, y: int) -> Optional[str]:
+        return self.kinds[y][x] if self.rows[y] >> x & 1 else None
+
+
+# ----------------------------- headless runs ----------------------------- #
+
+def play_random(engine: TetrisEngine, rng: random.Random, max_pieces: int = 1000) -> int:
+    """Random policy: random rotation and column, then hard drop. Returns pieces placed."""
+    while not engine.game_over and engine.pieces < max_pieces:
+        for _ in range(rng.randrange(4)):
+            engine.rotate()
+        dx = rng.randrange(-engine.width // 2, engine.width // 2 + 1)
+        step = 1 if dx > 0 else -1
+        for _ in range(abs(dx)):
+            if not engine.move(step):
+                break
+        engine.hard_drop()
+    return engine.pieces
+
+
+def benchmark(games: int = 1000, seed: int = 0, max_pieces: int = 1000) -> Dict:
+    """Play `games` seeded random games headless and report throughput."""
+    engine = TetrisEngine(seed=seed)
+    pieces = lines = 0
+    t0 = time.perf_counter()
+    for g in range(games):
+        engine.reset(seed + g)
+        pieces += play_random(engine, random.Random(seed + g), max_pieces)
+        lines += engine.lines
+    seconds = time.perf_counter() - t0
+    return {
+        'games': games,
+        'pieces': pieces,
+        'lines': lines,
+        'seconds': seconds,
+        'games_per_s': games / seconds if seconds else 0.0,
+        'pieces_per_s': pieces / seconds if seconds else 0.0,
+    }
+
+
+def main(argv=None) -> int:
+    import argparse
+    import json
+    ap = argparse.ArgumentParser(description='Headless Tetris engine benchmark')
+    ap.add_argument('--games', type=int, default=1000)
+    ap.add_argument('--seed', type=int, default=0)
+    ap.add_argument('--max-pieces', type=int, default=1000)
+    args = ap.parse_args(argv)
+    print(json.dumps(benchmark(args.games, args.seed, args.max_pieces), indent=2))
+    return 0
@@ -1,59 +1,32 @@
-import sysimport argparse
-
+import argparse
 import subprocess
-
-USAGE = """PQC-QKD Suite CLI (stub)import sys
-
+import sys
 import os
-
-현재 GUI 테트리스 모드 중심입니다. 기본 명령:import shutil
-
-  help            도움말 출력import getpass
-
-  exit            종료import binascii
-
+import shutil
+import getpass
+import binascii
 import hashlib
-
-추후: pqc build/run, qkd simulate 등 복구 예정.from qkdn_sim import default_topology, baseline_route, crosslayer_route, rl_route, plot_network_path
-
-"""
+import json
+import time
 
 # Determine project root. When frozen via PyInstaller, prefer current working directory.
+if getattr(sys, 'frozen', False):
+    ROOT = os.getcwd()
+else:
+    ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
-def main():if getattr(sys, 'frozen', False):
-
-    if len(sys.argv) > 1 and sys.argv[1] in ('help','-h','--help'):    ROOT = os.getcwd()
-
-        print(USAGE)else:
-
-        return    ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
 
-    print(USAGE)
+def run(cmd, cwd=None):
+    print("$", " ".join(cmd))
+    r = subprocess.run(cmd, cwd=cwd)
+    if r.returncode != 0:
+        sys.exit(r.returncode)
 
-    # 간단 인터랙티브 루프 (옵션)
-
-    try:def run(cmd, cwd=None):
-
-        while True:    print("$", " ".join(cmd))
-
-            cmd = input('cli> ').strip().lower()    r = subprocess.run(cmd, cwd=cwd)
-
-            if cmd in ('exit','quit'): break    if r.returncode != 0:
-
-            elif cmd in ('help',''): print(USAGE)        sys.exit(r.returncode)
-
-            else: print('알 수 없는 명령:', cmd)
-
-    except (EOFError, KeyboardInterrupt):
-
-        passdef cmd_pqc(args):
 
+def cmd_pqc(args):
     if args.action == 'build':
-
-if __name__ == '__main__':        # try cmake first, fallback to make
-
-    main()        build_dir = os.path.join(ROOT, 'pqc_core', 'build')
-
+        # try cmake first, fallback to make
+        build_dir = os.path.join(ROOT, 'pqc_core', 'build')
         os.makedirs(build_dir, exist_ok=True)
         cmake = shutil.which('cmake')
         if cmake:
@@ -65,6 +38,9 @@ if __name__ == '__main__':        # try cmake first, fallback to make
     elif args.action == 'run':
         # prefer fallback make target for portability
         run(['make', 'core-make-example'], cwd=ROOT)
+    elif args.action == 'bench':
+        from lib import native_bench
+        sys.exit(native_bench.run_cli(args, root=ROOT))
     else:
         print('Unknown pqc action')
 
@@ -77,16 +53,154 @@ def cmd_embedded(args):
 
 def cmd_qkd(args):
     # Run scenario directly (avoid relying on python -m when frozen)
-    net = default_topology()
-    net.step(args.steps)
+    profile_out = getattr(args, 'profile', None)
+    t0 = time.perf_counter()
+    # imported here so thin-client commands (call) skip networkx/matplotlib
+    from qkdn_sim import profiling
+    runner = _pareto_qkd if args.action == 'pareto' else _run_qkd
+    if not profile_out:
+        runner(args)
+        return
+    profiling.reset()
+    profiling.enable()
+    profiling.add_time('import', time.perf_counter() - t0)
+    prof = None
+    if profile_out.endswith(('.pstats', '.prof')):
+        import cProfile
+        prof = cProfile.Profile()
+        prof.enable()
+    try:
+        with profiling.timer('qkd.run'):
+            runner(args)
+    finally:
+        if prof is not None:
+            prof.disable()
+            prof.dump_stats(profile_out)
+        else:
+            profiling.dump_json(profile_out)
+        profiling.disable()
+        print(profiling.format_report())
+        print(f"Profile written to {profile_out}")
+
+
+def _run_qkd(args):
+    from qkdn_sim import default_topology, baseline_route, crosslayer_route, rl_route, plot_network_path, resolve_node, profiling
+    with profiling.timer('topology.build'):
+        net = default_topology()
+    if args.physics:
+        net.apply_physics()
+    ckpt_path = getattr(args, 'checkpoint', None)
+    cache = key = None
+    # checkpointed and profiled runs exist for their side effects, so they always compute
+    if not getattr(args, 'no_cache', False) and not ckpt_path and not profiling.ENABLED:
+        from qkdn_sim import ResultCache, scenario_key
+        cache = ResultCache()
+        key = scenario_key(net, {'scenario': 'qkd run', 'topology': 'default', 'policy': args.policy,
+                                 'src': str(resolve_node(net, args.src)), 'dst': str(resolve_node(net, args.dst)),
+                                 'steps': args.steps, 'physics': bool(args.physics),
+                                 'astar': bool(getattr(args, 'astar', False))})
+        hit = cache.get(key)
+        if hit is not None and (not args.plot or 'plot.png' in hit.files):
+            print(f"Chosen path: {hit.data['path']} (cached)")
+            if args.plot:
+                with open(args.plot, 'wb') as f:
+                    f.write(hit.files['plot.png'])
+            return
+    if getattr(args, 'resume', False):
+        if not ckpt_path:
+            print('--resume needs --checkpoint PATH')
+            sys.exit(2)
+        if os.path.exists(ckpt_path):
+            from qkdn_sim import checkpoint
+            checkpoint.restore(ckpt_path, net)
+            print(f"Resumed from {ckpt_path} at t={net.t}")
+        else:
+            print(f"No checkpoint at {ckpt_path}; starting from t=0")
+    if ckpt_path:
+        _step_with_checkpoints(net, args.steps, ckpt_path, args.checkpoint_every)
+    else:
+        net.step(args.steps)
+    src = resolve_node(net, args.src)
+    dst = resolve_node(net, args.dst)
+    index = None
+    if getattr(args, 'astar', False) and args.policy in ('baseline', 'cross'):
+        from qkdn_sim import GeometricAStar
+        index = GeometricAStar(net, 'length_km' if args.policy == 'baseline' else 'cross')
     if args.policy == 'baseline':
-        path = baseline_route(net, args.src, args.dst)
+        path = baseline_route(net, src, dst, index=index)
     elif args.policy == 'cross':
-        path = crosslayer_route(net, args.src, args.dst)
+        path = crosslayer_route(net, src, dst, index=index)
     else:
-        path = rl_route(net, args.src, args.dst)
+        path = rl_route(net, src, dst)
     print(f"Chosen path: {path}")
-    plot_network_path(net, path, out=args.plot)
+    files = {}
+    if args.plot:
+        plot_network_path(net, path, args.plot)
+        with open(args.plot, 'rb') as f:
+            files['plot.png'] = f.read()
+    if cache is not None:
+        edges = list(zip(path[:-1], path[1:]))
+        cache.put(key, {'path': path, 't': net.t, 'hops': len(edges),
+                        'length_km': sum(net.edges[e].get('length_km', 0.0) for e in edges),
+                        'min_availability': min((net.edges[e].get('availability', 0.0) for e in edges), default=None)},
+                  files)
+
+
+def _pareto_qkd(args):
+    # Pareto front over (length, end-to-end availability, hops) after the simulated steps
+    from qkdn_sim import default_topology, pareto_routes, resolve_node
+    net = default_topology()
+    if args.physics:
+        net.apply_physics()
+    net.step(args.steps)
+    src = resolve_node(net, args.src)
+    dst = resolve_node(net, args.dst)
+    front = pareto_routes(net, src, dst, eps=args.eps, max_labels=args.max_labels, max_hops=args.max_hops)
+    print(f"{len(front)} Pareto-optimal path(s) {src} -> {dst} (t={net.t}):")
+    print(f"  {'length_km':>10}  {'availability':>12}  {'hops':>4}  path")
+    for p in front:
+        print(f"  {p.length_km:10.2f}  {p.availability:12.4f}  {p.hops:4d}  {' - '.join(map(str, p.path))}")
+
+
+def _step_with_checkpoints(net, total_steps, path, min_interval):
+    # --steps is the total simulated time, so a resumed run stops at the same t
+    from qkdn_sim.checkpoint import Checkpointer
+    chunk = 100
+    try:
+        with Checkpointer(path, net, min_interval=min_interval) as ck:
+            while net.t < total_steps:
+                net.step(min(chunk, total_steps - net.t))
+                ck.maybe_save()
+    except KeyboardInterrupt:
+        print(f"Interrupted; last checkpoint in {path} (continue with --resume)")
+        sys.exit(130)
+    print(f"Checkpoint written to {path} (t={net.t}, {ck.saved} writes)")
+
+
+def cmd_serve(args):
+    # Long-lived daemon: keeps imports, topologies, route caches and keys warm
+    from cli import serve
+    sys.exit(serve.serve(args.socket))
+
+
+def cmd_call(args):
+    # Thin client for a running `serve` daemon
+    from cli import serve
+    try:
+        params = json.loads(args.params) if args.params else {}
+    except ValueError as e:
+        print(f"Invalid --params JSON: {e}")
+        sys.exit(2)
+    try:
+        with serve.Client(args.socket) as client:
+            result = client.call(args.method, **params)
+    except OSError as e:
+        print(f"Cannot reach daemon at {args.socket or serve.default_socket_path()}: {e}")
+        sys.exit(1)
+    except serve.RPCError as e:
+        print(f"Error {e.code}: {e.message}")
+        sys.exit(1)
+    print(json.dumps(result, indent=2, default=str))
 
 
 def cmd_auth(args):
@@ -124,6 +238,24 @@ def cmd_auth(args):
     print("Note: Password and key are NOT stored. This is a local, ephemeral demo.")
 
 
+def cmd_vault(args):
+    # Seal/open files or directory trees with the PQC envelope (PQS1 streams)
+    from lib import bulk_crypto
+    if args.action == 'seal':
+        stats = bulk_crypto.seal_path(args.src, args.dst, workers=args.workers,
+                                      segment_size=args.segment_kb * 1024,
+                                      max_inflight_bytes=args.inflight_mb << 20)
+    else:
+        stats = bulk_crypto.open_path(args.src, args.dst, workers=args.workers,
+                                      max_inflight_bytes=args.inflight_mb << 20)
+    print(f"{args.action}: {stats['files']} file(s), {stats['bytes'] / 1e6:.1f} MB "
+          f"in {stats['seconds']:.2f}s -> {stats['mb_per_s']:.1f} MB/s ({stats['workers']} workers)")
+    for path, err in stats['failed'].items():
+        print(f"  FAILED {path}: {err}")
+    if stats['failed']:
+        sys.exit(1)
+
+
 def interactive_menu():
     print("\nPQC-QKD Suite — Interactive Mode")
     print("Select an option:")
@@ -178,6 +310,8 @@ def interactive_menu():
         a.steps = steps
         a.policy = policy
         a.plot = plot
+        a.profile = None
+        a.physics = False
         cmd_qkd(a)
     elif choice == "5":
         class A:
@@ -201,20 +335,41 @@ def main():
     ap = argparse.ArgumentParser(prog='cli')
     sub = ap.add_subparsers(dest='cmd', required=True)
 
-    p_pqc = sub.add_parser('pqc', help='Build/Run pqc_core example')
-    p_pqc.add_argument('action', choices=['build','run'])
+    p_pqc = sub.add_parser('pqc', help='Build/Run/Benchmark pqc_core and pqc_embedded')
+    p_pqc.add_argument('action', choices=['build','run','bench'])
+    from lib import native_bench  # cheap to import; the harness itself loads lazily
+    native_bench.add_arguments(p_pqc.add_argument_group('bench options'))
     p_pqc.set_defaults(func=cmd_pqc)
 
     p_emb = sub.add_parser('embedded', help='Show embedded optimization notes')
     p_emb.set_defaults(func=cmd_embedded)
 
     p_qkd = sub.add_parser('qkd', help='Run QKD simulation')
-    p_qkd.add_argument('action', choices=['run'])
-    p_qkd.add_argument('--src', type=int, default=1)
-    p_qkd.add_argument('--dst', type=int, default=6)
+    p_qkd.add_argument('action', choices=['run', 'pareto'],
+                       help='run: route with --policy; pareto: list the length/availability/hops Pareto front')
+    p_qkd.add_argument('--src', type=str, default='1', help='Node name or 1-based index (default: 1)')
+    p_qkd.add_argument('--dst', type=str, default='6', help='Node name or 1-based index (default: 6)')
     p_qkd.add_argument('--steps', type=int, default=50)
     p_qkd.add_argument('--policy', choices=['baseline','cross','rl'], default='baseline')
     p_qkd.add_argument('--plot', type=str, default=None)
+    p_qkd.add_argument('--physics', action='store_true',
+                       help='Use decoy-state BB84 key rates per link (affects cross/rl routing)')
+    p_qkd.add_argument('--astar', action='store_true',
+                       help='Route baseline/cross with bidirectional A* guided by node coordinates')
+    p_qkd.add_argument('--checkpoint', type=str, default=None, metavar='PATH',
+                       help='Periodically save the simulation state to PATH (atomic replace)')
+    p_qkd.add_argument('--checkpoint-every', type=float, default=5.0, metavar='SECONDS',
+                       help='Minimum wall-clock time between checkpoints (default: 5)')
+    p_qkd.add_argument('--no-cache', action='store_true',
+                       help='Recompute even if this scenario is in the result cache ($PQC_QKD_CACHE)')
+    p_qkd.add_argument('--resume', action='store_true',
+                       help='Continue from --checkpoint PATH if it exists; --steps is the total')
+    p_qkd.add_argument('--profile', type=str, default=None, metavar='OUT',
+                       help='Record phase timers/counters to OUT (JSON); OUT ending in .pstats/.prof writes a cProfile dump instead')
+    p_qkd.add_argument('--eps', type=float, default=0.0,
+                       help='pareto: drop paths within a factor (1+EPS) of a kept one (approximate, faster)')
+    p_qkd.add_argument('--max-labels', type=int, default=None, help='pareto: cap on labels kept per node (approximate)')
+    p_qkd.add_argument('--max-hops', type=int, default=None, help='pareto: only paths with at most this many hops')
     p_qkd.set_defaults(func=cmd_qkd)
 
     p_auth = sub.add_parser('auth', help='Secure password prompt and key-derivation demo')
@@ -224,7 +379,31 @@ def main():
     p_auth.add_argument('--no-confirm', dest='confirm', action='store_false', help='Skip confirm prompt')
     p_auth.set_defaults(func=cmd_auth, confirm=True)
 
+    p_vault = sub.add_parser('vault', help='Encrypt/decrypt files or directories with the PQC envelope')
+    p_vault.add_argument('action', choices=['seal','open'])
+    p_vault.add_argument('src', help='File or directory to process')
+    p_vault.add_argument('dst', help='Output file or directory (tree is mirrored; sealed files get .pqs)')
+    p_vault.add_argument('--workers', type=int, default=None, help='Worker threads (default: CPU count)')
+    p_vault.add_argument('--segment-kb', type=int, default=64, help='Plaintext segment size in KiB when sealing (default: 64)')
+    p_vault.add_argument('--inflight-mb', type=int, default=64, help='Upper bound on buffered segments in MiB (default: 64)')
+    p_vault.set_defaults(func=cmd_vault)
+
+    p_serve = sub.add_parser('serve', help='Run the local JSON-RPC daemon (Unix socket)')
+    p_serve.add_argument('--socket', type=str, default=None, help='Socket path (default: $PQC_QKD_SOCKET, $XDG_RUNTIME_DIR/pqc_qkd.sock)')
+    p_serve.set_defaults(func=cmd_serve)
+
+    p_call = sub.add_parser('call', help='Send one request to a running serve daemon')
+    p_call.add_argument('method', help='ping, topologies, reset, route, simulate, plot, auth, encrypt, decrypt, metrics')
+    p_call.add_argument('--params', type=str, default=None, help='JSON object of method parameters')
+    p_call.add_argument('--socket', type=str, default=None, help='Socket path of the daemon')
+    p_call.set_defaults(func=cmd_call)
+
     args = ap.parse_args()
+    if args.cmd in ('serve', 'auth', 'vault'):
+        # PQC_METRICS_FILE / PQC_METRICS_PORT export lib.metrics: auth/store timings and
+        # KEM operations (vault seals/opens through pqc_envelope); other commands record nothing
+        from lib import metrics
+        metrics.start_from_env()
     if args.cmd == 'qkd':
         args.func(args)
     elif args.cmd == 'embedded':
@@ -233,6 +412,10 @@ def main():
         args.func(args)
     elif args.cmd == 'auth':
         args.func(args)
+    elif args.cmd == 'vault':
+        args.func(args)
+    elif args.cmd in ('serve', 'call'):
+        args.func(args)
 
 if __name__ == '__main__':
     main()
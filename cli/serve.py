@@ -0,0 +1,295 @@
+"""Long-lived local daemon behind `cli serve`, plus the thin client behind `cli call`.
+
+The daemon keeps the interpreter, networkx/matplotlib, loaded topologies,
+routing results (incl. trained RL agents) and key material (pqc_envelope /
+secure_store caches) resident, and serves requests concurrently, one
+thread per connection.
+
+Protocol: newline-delimited JSON-RPC 2.0 over a Unix domain socket.
+  -> {"jsonrpc": "2.0", "id": 1, "method": "route", "params": {"src": "A", "dst": "F"}}
+  <- {"jsonrpc": "2.0", "id": 1, "result": {"path": ["A", "B", "C", "F"], "cached": true}}
+
+Methods:
+  ping                                         -> {"pong": true, "uptime_s": ...}
+  topologies                                   -> {name: {"nodes", "edges", "t"}}
+  reset     {topology, seed}                   -> rebuild a topology
+  route     {topology, src, dst, policy}       -> {"path", "cached"}
+  simulate  {topology, steps, src?, dst?, policy?} -> {"t", "path"?}
+  plot      {topology, outfile, path? | src, dst, policy} -> {"outfile"}
+  auth      {action: login|register, username, password} -> {"ok"}
+  encrypt   {src, dst, workers?}                -> bulk_crypto stats
+  decrypt   {src, dst, workers?}                -> bulk_crypto stats
+  metrics   {format?: json|prometheus}          -> lib.metrics snapshot (or {"text": ...})
+
+The Client class only needs the standard library, so scripts that import
+it (instead of spawning `cli call`) get sub-millisecond warm route queries.
+"""
+import os
+import sys
+import json
+import time
+import inspect
+import socket
+import threading
+import socketserver
+
+PROTOCOL_VERSION = 1
+
+
+def default_socket_path():
+    env = os.environ.get('PQC_QKD_SOCKET')
+    if env:
+        return env
+    runtime = os.environ.get('XDG_RUNTIME_DIR')
+    if runtime and os.path.isdir(runtime):
+        return os.path.join(runtime, 'pqc_qkd.sock')
+    uid = os.getuid() if hasattr(os, 'getuid') else 0
+    return f'/tmp/pqc_qkd-{uid}.sock'
+
+
+class RPCError(Exception):
+    def __init__(self, code, message):
+        super().__init__(message)
+        self.code = code
+        self.message = message
+
+
+class Client:
+    """Persistent-connection client for the serve daemon (stdlib only)."""
+
+    def __init__(self, path=None, timeout=60.0):
+        self.path = path or default_socket_path()
+        self._sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._sock.settimeout(timeout)
+        self._sock.connect(self.path)
+        self._rfile = self._sock.makefile('rb')
+        self._next_id = 0
+
+    def call(self, method, **params):
+        self._next_id += 1
+        req = {'jsonrpc': '2.0', 'id': self._next_id, 'method': method, 'params': params}
+        self._sock.sendall(json.dumps(req, separators=(',', ':')).encode('utf-8') + b'\n')
+        line = self._rfile.readline()
+        if not line:
+            raise ConnectionError('daemon closed the connection')
+        resp = json.loads(line)
+        if 'error' in resp:
+            raise RPCError(resp['error'].get('code', -32000), resp['error'].get('message', 'error'))
+        return resp.get('result')
+
+    def close(self):
+        try:
+            self._rfile.close()
+        finally:
+            self._sock.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+class _Topology:
+    def __init__(self, net):
+        self.net = net
+        self.version = 0
+        self.lock = threading.RLock()
+        self.routes = {}
+
+
+class ServiceState:
+    """Resident state and method implementations of the daemon."""
+
+    def __init__(self):
+        # warm imports once; every request after this is in-process
+        from qkdn_sim import default_topology, baseline_route, crosslayer_route, rl_route, plot_network_path, resolve_node
+        self._build = {'default': default_topology}
+        self._routers = {'baseline': baseline_route, 'cross': crosslayer_route, 'rl': rl_route}
+        self._plot = plot_network_path
+        self._resolve = resolve_node
+        self._plot_lock = threading.Lock()  # pyplot is not thread-safe
+        self._topo_lock = threading.Lock()
+        self.topologies = {}
+        self.started = time.time()
+        self.methods = {
+            'ping': self.ping, 'topologies': self.list_topologies, 'reset': self.reset,
+            'route': self.route, 'simulate': self.simulate, 'plot': self.plot,
+            'auth': self.auth, 'encrypt': self.encrypt, 'decrypt': self.decrypt,
+            'metrics': self.metrics,
+        }
+        self._signatures = {name: inspect.signature(fn) for name, fn in self.methods.items()}
+        self._topology('default')
+
+    def _topology(self, name='default', seed=None, rebuild=False):
+        with self._topo_lock:
+            topo = self.topologies.get(name)
+            if topo is None or rebuild:
+                builder = self._build.get(name, self._build['default'])
+                net = builder() if seed is None else builder(seed=int(seed))
+                topo = _Topology(net)
+                self.topologies[name] = topo
+            return topo
+
+    def _node(self, topo, token):
+        try:
+            return self._resolve(topo.net, token)
+        except KeyError as e:
+            raise RPCError(-32602, str(e.args[0]) if e.args else f'unknown node: {token}')
+
+    def _route(self, topo, src, dst, policy):
+        if policy not in self._routers:
+            raise RPCError(-32602, f'unknown policy: {policy}')
+        with topo.lock:
+            s = self._node(topo, src)
+            d = self._node(topo, dst)
+            key = (topo.version, policy, s, d)
+            path = topo.routes.get(key)
+            if path is not None:
+                return path, True
+            path = list(self._routers[policy](topo.net, s, d))
+            topo.routes[key] = path
+            return path, False
+
+    def ping(self):
+        return {'pong': True, 'protocol': PROTOCOL_VERSION, 'uptime_s': time.time() - self.started}
+
+    def metrics(self, format='json'):
+        from lib import metrics
+        if format == 'prometheus':
+            return {'text': metrics.render_prometheus()}
+        if format != 'json':
+            raise RPCError(-32602, f'unknown format: {format}')
+        return metrics.snapshot()
+
+    def list_topologies(self):
+        return {name: {'nodes': t.net.number_of_nodes(), 'edges': t.net.number_of_edges(),
+                       't': getattr(t.net, 't', 0), 'version': t.version}
+                for name, t in list(self.topologies.items())}
+
+    def reset(self, topology='default', seed=None):
+        topo = self._topology(topology, seed=seed, rebuild=True)
+        return {'topology': topology, 'nodes': topo.net.number_of_nodes(), 'edges': topo.net.number_of_edges()}
+
+    def route(self, src, dst, topology='default', policy='baseline'):
+        path, cached = self._route(self._topology(topology), src, dst, policy)
+        return {'path': path, 'cached': cached}
+
+    def simulate(self, steps=1, topology='default', src=None, dst=None, policy='baseline'):
+        topo = self._topology(topology)
+        with topo.lock:
+            t = topo.net.step(int(steps))
+            topo.version += 1
+            topo.routes.clear()  # link states changed; cached routes are stale
+            out = {'t': t}
+            if src is not None and dst is not None:
+                out['path'] = self._route(topo, src, dst, policy)[0]
+        return out
+
+    def plot(self, outfile, topology='default', path=None, src=None, dst=None, policy='baseline'):
+        topo = self._topology(topology)
+        if path is None:
+            if src is None or dst is None:
+                raise RPCError(-32602, 'plot needs path or src/dst')
+            path = self._route(topo, src, dst, policy)[0]
+        with topo.lock, self._plot_lock:
+            self._plot(topo.net, path, outfile)
+        return {'outfile': outfile, 'path': path}
+
+    def auth(self, username, password, action='login'):
+        from lib.auth_store import authenticate_user, register_user
+        if action == 'login':
+            return {'ok': authenticate_user(username, password)}
+        if action == 'register':
+            return {'ok': register_user(username, password)}
+        raise RPCError(-32602, f'unknown auth action: {action}')
+
+    def encrypt(self, src, dst, workers=None):
+        from lib import bulk_crypto
+        return bulk_crypto.seal_path(src, dst, workers=workers)
+
+    def decrypt(self, src, dst, workers=None):
+        from lib import bulk_crypto
+        return bulk_crypto.open_path(src, dst, workers=workers)
+
+    def dispatch(self, line):
+        req_id = None
+        try:
+            try:
+                req = json.loads(line)
+            except ValueError:
+                raise RPCError(-32700, 'parse error')
+            if not isinstance(req, dict) or 'method' not in req:
+                raise RPCError(-32600, 'invalid request')
+            req_id = req.get('id')
+            fn = self.methods.get(req['method'])
+            if fn is None:
+                raise RPCError(-32601, f"method not found: {req['method']}")
+            params = req.get('params') or {}
+            if not isinstance(params, (dict, list)):
+                raise RPCError(-32602, 'params must be an object or an array')
+            # only a signature mismatch is "invalid params"; a TypeError raised
+            # while the method runs is a server error (-32000)
+            sig = self._signatures.get(req['method']) or inspect.signature(fn)
+            try:
+                bound = sig.bind(*params) if isinstance(params, list) else sig.bind(**params)
+            except TypeError as e:
+                raise RPCError(-32602, str(e))
+            # methods raise RPCError(-32602) themselves for bad values (unknown
+            # node, policy, ...); any other exception is a server error
+            result = fn(*bound.args, **bound.kwargs)
+            return {'jsonrpc': '2.0', 'id': req_id, 'result': result}
+        except RPCError as e:
+            return {'jsonrpc': '2.0', 'id': req_id, 'error': {'code': e.code, 'message': e.message}}
+        except Exception as e:
+            return {'jsonrpc': '2.0', 'id': req_id, 'error': {'code': -32000, 'message': f'{type(e).__name__}: {e}'}}
+
+
+class _Handler(socketserver.StreamRequestHandler):
+    def handle(self):
+        state = self.server.state
+        for line in self.rfile:
+            if not line.strip():
+                continue
+            resp = state.dispatch(line)
+            self.wfile.write(json.dumps(resp, separators=(',', ':'), default=str).encode('utf-8') + b'\n')
+            self.wfile.flush()
+
+
+class Server(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, path, state):
+        self.state = state
+        super().__init__(path, _Handler)
+
+
+def serve(path=None):
+    path = path or default_socket_path()
+    if os.path.exists(path):
+        # refuse to steal a live daemon's socket; clean up a stale one
+        try:
+            Client(path, timeout=1.0).close()
+            print(f'Daemon already running on {path}')
+            return 1
+        except OSError:
+            os.unlink(path)
+    state = ServiceState()
+    old_umask = os.umask(0o077)  # socket is private to this user
+    try:
+        server = Server(path, state)
+    finally:
+        os.umask(old_umask)
+    print(f'Serving on {path} (pid {os.getpid()})')
+    sys.stdout.flush()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        try:
+            os.unlink(path)
+        except OSError:
+            pass
+    return 0
@@ -2,7 +2,12 @@ import os
 import json
 import hashlib
 import binascii
-from typing import Dict, Tuple
+import time
+import threading
+from typing import Any, Dict, Tuple
+
+from . import metrics
+from .store_io import atomic_write, file_lock, group_commit
 
 # Optional secure storage (AES-GCM; optionally PQC-derived)
 try:
@@ -15,6 +20,18 @@ except Exception:
 DEFAULT_ROUNDS = 200_000
 
 USERS_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data', 'users.json')
+# Serializes writers of users.json / users.enc across processes
+LOCK_PATH = os.path.join(os.path.dirname(USERS_PATH), 'users.lock')
+# Queued user changes waiting for the next group commit
+SPOOL_DIR = os.path.join(os.path.dirname(USERS_PATH), 'users.pending')
+
+_LOGIN_SECONDS = metrics.histogram('pqc_auth_login_seconds', 'authenticate_user latency (load + PBKDF2 verify)', ('result',))
+_LOGINS = metrics.counter('pqc_auth_logins', 'Login attempts by result', ('result',))
+_REGISTRATIONS = metrics.counter('pqc_auth_registrations', 'Registration attempts by result', ('result',))
+_PBKDF2_SECONDS = metrics.histogram('pqc_auth_pbkdf2_seconds', 'PBKDF2-HMAC-SHA256 derivation time', ('op',))
+_LOAD_SECONDS = metrics.histogram('pqc_users_store_load_seconds', 'load_users duration by backend that served it', ('backend',))
+_SAVE_SECONDS = metrics.histogram('pqc_users_store_save_seconds', 'Users store save duration by backend that wrote it', ('backend',))
+_FALLBACKS = metrics.counter('pqc_users_store_fallbacks', 'Secure store failures that fell back to users.json', ('op', 'reason'))
 
 
 def _ensure_data_dir():
@@ -30,24 +47,15 @@ def _load_json(path: str) -> Dict:
 
 
 def _save_json(path: str, obj: Dict) -> None:
-    # Try to ensure file is 0600 on POSIX
-    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
-    mode = 0o600
-    fd = os.open(path, flags, mode)
-    try:
-        with os.fdopen(fd, 'w', encoding='utf-8') as f:
-            json.dump(obj, f, indent=2)
-    finally:
-        try:
-            os.chmod(path, mode)
-        except Exception:
-            pass
+    # Atomic replace; file is 0600 on POSIX
+    atomic_write(path, json.dumps(obj, indent=2).encode('utf-8'), mode=0o600)
 
 
 def hash_password(password: str, salt: bytes = None, rounds: int = DEFAULT_ROUNDS) -> Tuple[str, int, str]:
     if salt is None:
         salt = os.urandom(16)
-    dk = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, rounds, dklen=32)
+    with _PBKDF2_SECONDS.time(op='hash'):
+        dk = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, rounds, dklen=32)
     return binascii.hexlify(salt).decode(), rounds, binascii.hexlify(dk).decode()
 
 
@@ -57,58 +65,141 @@ def verify_password(password: str, salt_hex: str, rounds: int, hash_hex: str) ->
         expected = binascii.unhexlify(hash_hex)
     except (binascii.Error, ValueError):
         return False
-    dk = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, rounds, dklen=32)
+    with _PBKDF2_SECONDS.time(op='verify'):
+        dk = hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, rounds, dklen=32)
     # Constant-time compare
     return hashlib.sha256(dk).digest() == hashlib.sha256(expected).digest()
 
 
 def load_users() -> Dict:
     _ensure_data_dir()
+    t0 = time.perf_counter()
     # Prefer secure store if available and encrypted file exists
     enc_path = os.path.join(os.path.dirname(USERS_PATH), 'users.enc')
     if _HAS_SECURE and os.path.exists(enc_path):
         try:
-            return _secure_store.load_users_secure()
-        except Exception:
+            users = _secure_store.load_users_secure()
+            _LOAD_SECONDS.observe(time.perf_counter() - t0, backend='secure')
+            return users
+        except Exception as e:
             # Fallback to legacy JSON
-            pass
-    return _load_json(USERS_PATH)
+            _FALLBACKS.inc(op='load', reason=type(e).__name__)
+    users = _load_json(USERS_PATH)
+    _LOAD_SECONDS.observe(time.perf_counter() - t0, backend='json')
+    return users
 
 
-def save_users(obj: Dict) -> None:
-    _ensure_data_dir()
+def _save_users_locked(obj: Dict) -> None:
+    # Caller must hold LOCK_PATH
+    t0 = time.perf_counter()
     # Try secure store first
     if _HAS_SECURE:
         try:
             _secure_store.save_users_secure(obj)
+            _SAVE_SECONDS.observe(time.perf_counter() - t0, backend='secure')
             return
-        except Exception:
+        except Exception as e:
             # Fallback to legacy JSON
-            pass
+            _FALLBACKS.inc(op='save', reason=type(e).__name__)
+    else:
+        _FALLBACKS.inc(op='save', reason='unavailable')
     _save_json(USERS_PATH, obj)
+    _SAVE_SECONDS.observe(time.perf_counter() - t0, backend='json')
+
+
+def save_users(obj: Dict) -> None:
+    _ensure_data_dir()
+    with file_lock(LOCK_PATH):
+        _save_users_locked(obj)
+
+
+def rewrap_users(background: bool = False):
+    """Re-encrypt the store under a fresh data-encryption key.
+
+    With background=True the work runs on a daemon thread, which is returned.
+    """
+    def _run() -> None:
+        _ensure_data_dir()
+        with file_lock(LOCK_PATH):
+            users = load_users()
+            if _HAS_SECURE:
+                _secure_store.rotate_dek()
+            _save_users_locked(users)
+    if background:
+        t = threading.Thread(target=_run, name='users-rewrap', daemon=True)
+        t.start()
+        return t
+    _run()
+    return None
+
+
+def _apply_change(users: Dict, change: Dict[str, Any]) -> Any:
+    """Apply one queued change to the users dict (runs inside a group commit)."""
+    table = users.setdefault('users', {})
+    op = change['op']
+    if op == 'add':
+        if change['username'] in table:
+            return False
+        table[change['username']] = change['record']
+        return True
+    if op == 'set':
+        table[change['username']] = change['record']
+        return True
+    if op == 'delete':
+        return table.pop(change['username'], None) is not None
+    raise ValueError(f'Unknown user change: {op}')
+
+
+def commit_user_change(change: Dict[str, Any]) -> Any:
+    """Queue a change ({'op': 'add'|'set'|'delete', 'username', 'record'}) and
+    return its result once it is durably stored. Concurrent callers, in this
+    or other processes, are batched into a single load/encrypt/save."""
+    _ensure_data_dir()
+    if not (_HAS_SECURE and _secure_store.HAS_CRYPTO):
+        # no way to encrypt the spool: apply directly instead of writing the
+        # record (salt, hash) to users.pending in the clear
+        with file_lock(LOCK_PATH):
+            users = load_users()
+            try:
+                result = _apply_change(users, change)
+            except (ValueError, KeyError) as e:
+                raise RuntimeError(str(e) or type(e).__name__) from None
+            _save_users_locked(users)
+            return result
+    return group_commit(SPOOL_DIR, LOCK_PATH, change, load_users, _apply_change, _save_users_locked,
+                        seal=_secure_store.seal_spool, unseal=_secure_store.open_spool)
 
 
 def register_user(username: str, password: str) -> bool:
     username = username.strip()
     if not username:
         raise ValueError('Username required')
-    users = load_users()
-    if username in users.get('users', {}):
+    if username in load_users().get('users', {}):
+        _REGISTRATIONS.inc(result='exists')
         return False
+    # PBKDF2 runs outside the store lock; the existence check is repeated
+    # atomically when the change is applied
     salt_hex, rounds, hash_hex = hash_password(password)
-    users['users'][username] = {
+    record = {
         'salt': salt_hex,
         'rounds': rounds,
         'hash': hash_hex,
     }
-    save_users(users)
-    return True
+    ok = bool(commit_user_change({'op': 'add', 'username': username, 'record': record}))
+    _REGISTRATIONS.inc(result='ok' if ok else 'exists')
+    return ok
 
 
 def authenticate_user(username: str, password: str) -> bool:
+    t0 = time.perf_counter()
     username = username.strip()
     users = load_users().get('users', {})
     rec = users.get(username)
     if not rec:
-        return False
-    return verify_password(password, rec.get('salt', ''), int(rec.get('rounds', DEFAULT_ROUNDS)), rec.get('hash', ''))
+        ok, result = False, 'unknown_user'
+    else:
+        ok = verify_password(password, rec.get('salt', ''), int(rec.get('rounds', DEFAULT_ROUNDS)), rec.get('hash', ''))
+        result = 'ok' if ok else 'bad_password'
+    _LOGINS.inc(result=result)
+    _LOGIN_SECONDS.observe(time.perf_counter() - t0, result=result)
+    return ok
@@ -0,0 +1,267 @@
+"""
+Micro-benchmarks for the crypto building blocks in lib.
+
+Sections (each can be skipped; missing libraries are reported, not fatal):
+  kem     keygen / encap / decap for every liboqs mechanism _select_alg could pick
+  hkdf    HKDF-SHA256 as used by secure_store
+  aesgcm  AES-256-GCM encrypt/decrypt throughput, 1 KiB .. 1 GiB
+  pbkdf2  auth_store.hash_password at several round counts
+  store   save_users_secure / load_users_secure round trips at growing user counts
+
+Everything runs against a temporary data directory, so real keys and
+stores are never touched. The result is a JSON-serializable dict with
+host/library metadata, meant to be diffed between releases:
+
+  PYTHONPATH=. python scripts/bench_crypto.py --out bench.json
+"""
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import platform
+import tempfile
+import statistics
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional
+
+from . import auth_store, pqc_envelope, secure_store
+
+SCHEMA_VERSION = 1
+SECTIONS = ('kem', 'hkdf', 'aesgcm', 'pbkdf2', 'store')
+AES_SIZES = (1 << 10, 1 << 16, 1 << 20, 1 << 24, 1 << 28, 1 << 30)
+PBKDF2_ROUNDS = (10_000, 100_000, auth_store.DEFAULT_ROUNDS, 600_000)
+STORE_USER_COUNTS = (10, 100, 1_000, 10_000)
+
+
+def _summary(samples_ns: List[int]) -> Dict:
+    s = sorted(samples_ns)
+    return {
+        'n': len(s),
+        'min_us': s[0] / 1e3,
+        'median_us': statistics.median(s) / 1e3,
+        'mean_us': statistics.fmean(s) / 1e3,
+        'p95_us': s[min(len(s) - 1, int(round(0.95 * (len(s) - 1))))] / 1e3,
+        'max_us': s[-1] / 1e3,
+    }
+
+
+def _time(fn: Callable[[], object], repeat: int, warmup: int = 1) -> Dict:
+    for _ in range(warmup):
+        fn()
+    samples = []
+    for _ in range(repeat):
+        t0 = time.perf_counter_ns()
+        fn()
+        samples.append(time.perf_counter_ns() - t0)
+    return _summary(samples)
+
+
+def _repeat_for(nbytes: int, budget: int = 1 << 28) -> int:
+    # keep every size at roughly the same total work, at least 3 samples
+    return max(3, min(200, budget // max(1, nbytes)))
+
+
+def _drop_key_caches() -> None:
+    # cached KEM keys / DEKs belong to whichever data dir was active
+    pqc_envelope.reset_cache()
+    secure_store.rotate_dek()
+    with secure_store._OPEN_DEKS_LOCK:
+        secure_store._OPEN_DEKS.clear()
+
+
+@contextmanager
+def _scratch_data_dir() -> Iterator[str]:
+    """Point secure_store/pqc_envelope/auth_store at a throwaway data dir."""
+    saved = {
+        (secure_store, 'DATA_DIR'): secure_store.DATA_DIR,
+        (secure_store, 'ENC_PATH'): secure_store.ENC_PATH,
+        (secure_store, 'MASTER_KEY_PATH'): secure_store.MASTER_KEY_PATH,
+        (pqc_envelope, 'DATA_DIR'): pqc_envelope.DATA_DIR,
+        (pqc_envelope, 'PUB_PATH'): pqc_envelope.PUB_PATH,
+        (pqc_envelope, 'PRIV_PATH'): pqc_envelope.PRIV_PATH,
+        (pqc_envelope, 'ALG_PATH'): pqc_envelope.ALG_PATH,
+    }
+    with tempfile.TemporaryDirectory(prefix='pqc-bench-') as d:
+        secure_store.DATA_DIR = d
+        secure_store.ENC_PATH = os.path.join(d, 'users.enc')
+        secure_store.MASTER_KEY_PATH = os.path.join(d, 'master.key')
+        pqc_envelope.DATA_DIR = d
+        pqc_envelope.PUB_PATH = os.path.join(d, 'kem_pub.bin')
+        pqc_envelope.PRIV_PATH = os.path.join(d, 'kem_priv.bin')
+        pqc_envelope.ALG_PATH = os.path.join(d, 'kem_alg.txt')
+        _drop_key_caches()
+        try:
+            yield d
+        finally:
+            for (mod, name), value in saved.items():
+                setattr(mod, name, value)
+            _drop_key_caches()
+
+
+def kem_mechanisms() -> List[str]:
+    """Every mechanism _select_alg() could return on this host, preferred first."""
+    if not pqc_envelope.has_pqc():
+        return []
+    enabled = list(pqc_envelope._enabled_mechanisms())
+    names = [n for n in pqc_envelope.ALG_CANDIDATES if n in enabled]
+    names += sorted(n for n in enabled if ('KEM' in n or 'Kyber' in n) and n not in names)
+    return names
+
+
+def bench_kem(repeat: int = 50) -> Dict:
+    if not pqc_envelope.has_pqc():
+        return {'skipped': 'liboqs (oqs) not available'}
+    oqs = pqc_envelope.oqs
+    out: Dict[str, Dict] = {'selected': pqc_envelope._select_alg(), 'mechanisms': {}}
+    for alg in kem_mechanisms():
+        try:
+            with oqs.KeyEncapsulation(alg) as kem:
+                pub = kem.generate_keypair()
+                priv = kem.export_secret_key()
+                keygen = _time(kem.generate_keypair, repeat)
+            with oqs.KeyEncapsulation(alg) as enc:
+                ct, _ss = enc.encap_secret(pub)
+                encap = _time(lambda: enc.encap_secret(pub), repeat)
+            with oqs.KeyEncapsulation(alg, secret_key=priv) as dec:
+                decap = _time(lambda: dec.decap_secret(ct), repeat)
+            out['mechanisms'][alg] = {
+                'public_key_bytes': len(pub), 'ciphertext_bytes': len(ct),
+                'keygen': keygen, 'encap': encap, 'decap': decap,
+            }
+        except Exception as e:
+            out['mechanisms'][alg] = {'error': f'{type(e).__name__}: {e}'}
+    return out
+
+
+def bench_hkdf(repeat: int = 2000) -> Dict:
+    if not secure_store.HAS_CRYPTO:
+        return {'skipped': 'cryptography not available'}
+    ikm = os.urandom(32)
+    return {'sha256_32B': _time(lambda: secure_store._hkdf_sha256(ikm, info=b'users-store-pqc'), repeat)}
+
+
+def bench_aesgcm(max_bytes: int = 1 << 30) -> Dict:
+    if not secure_store.HAS_CRYPTO:
+        return {'skipped': 'cryptography not available'}
+    aead = secure_store.AESGCM(os.urandom(32))
+    nonce = os.urandom(12)
+    out: Dict[str, Dict] = {}
+    for size in AES_SIZES:
+        if size > max_bytes:
+            continue
+        data = os.urandom(size) if size <= (1 << 24) else bytes(size)
+        ct = aead.encrypt(nonce, data, None)
+        reps = _repeat_for(size)
+        enc = _time(lambda: aead.encrypt(nonce, data, None), reps)
+        dec = _time(lambda: aead.decrypt(nonce, ct, None), reps)
+        out[str(size)] = {
+            'encrypt': enc, 'decrypt': dec,
+            'encrypt_mb_s': size / enc['median_us'],
+            'decrypt_mb_s': size / dec['median_us'],
+        }
+        del data, ct
+    return out
+
+
+def bench_pbkdf2(rounds_list=PBKDF2_ROUNDS, repeat: int = 5) -> Dict:
+    salt = os.urandom(16)
+    return {str(r): _time(lambda: auth_store.hash_password('benchmark-pw', salt=salt, rounds=r), repeat)
+            for r in rounds_list}
+
+
+def _fake_users(n: int) -> Dict:
+    rec = {'salt': '00' * 16, 'rounds': auth_store.DEFAULT_ROUNDS, 'hash': '11' * 32}
+    return {'users': {f'user{i:07d}': dict(rec) for i in range(n)}}
+
+
+def bench_store(user_counts=STORE_USER_COUNTS, repeat: int = 10) -> Dict:
+    if not secure_store.HAS_CRYPTO:
+        return {'skipped': 'cryptography not available'}
+    out: Dict[str, Dict] = {'pqc': pqc_envelope.has_pqc()}
+    saved_mode = secure_store.ENVELOPE_MODE
+    try:
+        for mode in ('dek', 'per-write'):
+            secure_store.ENVELOPE_MODE = mode
+            by_count: Dict[str, Dict] = {}
+            with _scratch_data_dir():
+                for n in user_counts:
+                    users = _fake_users(n)
+                    save = _time(lambda: secure_store.save_users_secure(users), repeat)
+                    load = _time(secure_store.load_users_secure, repeat)
+                    by_count[str(n)] = {'save': save, 'load': load,
+                                        'file_bytes': os.path.getsize(secure_store.ENC_PATH)}
+            out[mode] = by_count
+    finally:
+        secure_store.ENVELOPE_MODE = saved_mode
+    return out
+
+
+def _library_versions() -> Dict[str, Optional[str]]:
+    versions: Dict[str, Optional[str]] = {}
+    try:
+        import cryptography  # type: ignore
+        versions['cryptography'] = cryptography.__version__
+    except Exception:
+        versions['cryptography'] = None
+    try:
+        versions['oqs'] = pqc_envelope.oqs.oqs_version() if pqc_envelope.has_pqc() else None
+    except Exception:
+        versions['oqs'] = 'unknown'
+    try:
+        import ssl
+        versions['openssl'] = ssl.OPENSSL_VERSION
+    except Exception:
+        versions['openssl'] = None
+    return versions
+
+
+def run(sections=SECTIONS, quick: bool = False, aes_max_bytes: int = 1 << 30) -> Dict:
+    """Run the selected sections. quick=True trims repeats/sizes for smoke runs."""
+    result: Dict = {
+        'schema': SCHEMA_VERSION,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'host': {
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'python': sys.version.split()[0],
+            'cpu_count': os.cpu_count(),
+        },
+        'libraries': _library_versions(),
+        'results': {},
+    }
+    with _scratch_data_dir():
+        for name in sections:
+            if name == 'kem':
+                r = bench_kem(repeat=5 if quick else 50)
+            elif name == 'hkdf':
+                r = bench_hkdf(repeat=100 if quick else 2000)
+            elif name == 'aesgcm':
+                r = bench_aesgcm(max_bytes=min(aes_max_bytes, 1 << 20) if quick else aes_max_bytes)
+            elif name == 'pbkdf2':
+                r = bench_pbkdf2(rounds_list=(10_000,) if quick else PBKDF2_ROUNDS, repeat=2 if quick else 5)
+            elif name == 'store':
+                r = bench_store(user_counts=(10, 100) if quick else STORE_USER_COUNTS, repeat=2 if quick else 10)
+            else:
+                raise ValueError(f'Unknown benchmark section: {name}')
+            result['results'][name] = r
+    return result
+
+
+def main(argv=None) -> int:
+    import argparse
+    ap = argparse.ArgumentParser(description='Benchmark lib crypto building blocks (JSON output)')
+    ap.add_argument('--sections', default=','.join(SECTIONS), help='Comma-separated subset of: ' + ', '.join(SECTIONS))
+    ap.add_argument('--quick', action='store_true', help='Small sizes/repeats for a smoke run')
+    ap.add_argument('--aes-max-mb', type=int, default=1024, help='Largest AES-GCM buffer in MiB (default: 1024)')
+    ap.add_argument('--out', default=None, help='Write JSON here instead of stdout')
+    args = ap.parse_args(argv)
+    sections = [s.strip() for s in args.sections.split(',') if s.strip()]
+    result = run(sections, quick=args.quick, aes_max_bytes=args.aes_max_mb << 20)
+    text = json.dumps(result, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    return 0
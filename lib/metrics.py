@@ -0,0 +1,273 @@
+"""
+In-process runtime metrics: counters and fixed-bucket histograms.
+
+- counter(name, help, labels) / histogram(name, help, labels, buckets)
+  return a process-wide metric (get-or-create, so modules can declare
+  them at import time). Updates are one lock + one add (plus a bisect for
+  histograms); disable() turns them into an early return.
+- render_prometheus(): Prometheus text exposition format (0.0.4).
+- write_prometheus(path): atomic file export, e.g. for node_exporter's
+  textfile collector.
+- serve_http(port): /metrics on a localhost HTTP endpoint (daemon thread).
+- snapshot(): plain dict of every series, for tests, logs and the GUI.
+- start_from_env(): PQC_METRICS_FILE (written at exit) and
+  PQC_METRICS_PORT (HTTP endpoint) for the CLI and GUI entry points.
+
+Label values are passed as keyword arguments and must match the names
+declared on the metric; unknown labels raise ValueError.
+"""
+from __future__ import annotations
+import os
+import time
+import atexit
+import bisect
+import threading
+from typing import Any, Dict, List, Sequence, Tuple
+
+from .store_io import atomic_write
+
+# seconds; covers a cached AES-GCM open (sub-ms) up to a slow PBKDF2 login
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+ENABLED = os.environ.get('PQC_METRICS', '1') != '0'
+
+
+def enable() -> None:
+    global ENABLED
+    ENABLED = True
+
+
+def disable() -> None:
+    global ENABLED
+    ENABLED = False
+
+
+def _escape(value: str) -> str:
+    return value.replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _fmt(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.help = help
+        self.label_names = tuple(labels)
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, Any]) -> Tuple[str, ...]:
+        try:
+            if len(labels) == len(self.label_names):
+                return tuple([str(labels[n]) for n in self.label_names])
+        except KeyError:
+            pass
+        raise ValueError(f'{self.name} expects labels {self.label_names}, got {tuple(labels)}')
+
+    def _labels(self, key: Tuple[str, ...], extra: str = '') -> str:
+        parts = [f'{n}="{_escape(v)}"' for n, v in zip(self.label_names, key)]
+        if extra:
+            parts.append(extra)
+        return '{' + ','.join(parts) + '}' if parts else ''
+
+
+class Counter(_Metric):
+    kind = 'counter'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = ()):
+        super().__init__(name, help, labels)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, amount: float = 1.0, **labels: Any) -> None:
+        if not ENABLED:
+            return
+        key = self._key(labels) if self.label_names or labels else ()
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, **labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def _render(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f'{self.name}_total{self._labels(k)} {_fmt(v)}' for k, v in items]
+
+    def _snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {','.join(k): v for k, v in sorted(self._values.items())}
+
+    def _reset(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+
+class _Timer:
+    __slots__ = ('_hist', '_labels', '_t0')
+
+    def __init__(self, hist: 'Histogram', labels: Dict[str, Any]):
+        self._hist = hist
+        self._labels = labels
+
+    def __enter__(self) -> '_Timer':
+        self._t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self._hist.observe(time.perf_counter() - self._t0, **self._labels)
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, help: str, labels: Sequence[str] = (), buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, help, labels)
+        self.buckets = tuple(sorted(float(b) for b in buckets))
+        # per label set: [count per bucket (non-cumulative, last = +Inf), sum, count]
+        self._series: Dict[Tuple[str, ...], List[Any]] = {}
+
+    def observe(self, value: float, **labels: Any) -> None:
+        if not ENABLED:
+            return
+        key = self._key(labels) if self.label_names or labels else ()
+        i = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            s = self._series.get(key)
+            if s is None:
+                s = self._series[key] = [[0] * (len(self.buckets) + 1), 0.0, 0]
+            s[0][i] += 1
+            s[1] += value
+            s[2] += 1
+
+    def time(self, **labels: Any) -> _Timer:
+        """Context manager observing the elapsed wall time of its block."""
+        return _Timer(self, labels)
+
+    def _render(self) -> List[str]:
+        with self._lock:
+            items = sorted((k, ([*s[0]], s[1], s[2])) for k, s in self._series.items())
+        out = []
+        for key, (counts, total, count) in items:
+            acc = 0
+            for bound, c in zip(self.buckets + (float('inf'),), counts):
+                acc += c
+                le = 'le="%s"' % _fmt(bound)
+                out.append(f'{self.name}_bucket{self._labels(key, le)} {acc}')
+            out.append(f'{self.name}_sum{self._labels(key)} {_fmt(total)}')
+            out.append(f'{self.name}_count{self._labels(key)} {count}')
+        return out
+
+    def _snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            return {','.join(k): {'count': s[2], 'sum': s[1],
+                                  'buckets': dict(zip([_fmt(b) for b in self.buckets] + ['+Inf'], s[0]))}
+                    for k, s in sorted(self._series.items())}
+
+    def _reset(self) -> None:
+        with self._lock:
+            self._series.clear()
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._metrics: Dict[str, _Metric] = {}
+
+    def _get(self, cls, name: str, help: str, labels: Sequence[str], **kw: Any):
+        with self._lock:
+            m = self._metrics.get(name)
+            if m is None:
+                m = self._metrics[name] = cls(name, help, labels, **kw)
+            elif not isinstance(m, cls) or m.label_names != tuple(labels):
+                raise ValueError(f'metric {name} already registered with a different type or labels')
+            return m
+
+    def counter(self, name: str, help: str, labels: Sequence[str] = ()) -> Counter:
+        return self._get(Counter, name, help, labels)
+
+    def histogram(self, name: str, help: str, labels: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get(Histogram, name, help, labels, buckets=buckets)
+
+    def render_prometheus(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: m.name)
+        lines = []
+        for m in metrics:
+            lines.append(f'# HELP {m.name} {m.help}')
+            lines.append(f'# TYPE {m.name} {m.kind}')
+            lines.extend(m._render())
+        return '\n'.join(lines) + '\n'
+
+    def snapshot(self) -> Dict[str, Any]:
+        with self._lock:
+            metrics = list(self._metrics.values())
+        return {m.name: {'type': m.kind, 'labels': list(m.label_names), 'series': m._snapshot()} for m in metrics}
+
+    def reset(self) -> None:
+        """Zero every series (metric definitions stay registered)."""
+        with self._lock:
+            metrics = list(self._metrics.values())
+        for m in metrics:
+            m._reset()
+
+
+REGISTRY = Registry()
+counter = REGISTRY.counter
+histogram = REGISTRY.histogram
+render_prometheus = REGISTRY.render_prometheus
+snapshot = REGISTRY.snapshot
+reset = REGISTRY.reset
+
+
+def write_prometheus(path: str, registry: Registry = REGISTRY) -> None:
+    """Write the text format to path atomically (readers never see a partial file)."""
+    atomic_write(path, registry.render_prometheus().encode('utf-8'), mode=0o644, sync=False)
+
+
+def serve_http(port: int = 9464, host: str = '127.0.0.1', registry: Registry = REGISTRY) -> 'ThreadingHTTPServer':
+    """Serve /metrics on host:port from a daemon thread; returns the server (call shutdown() to stop)."""
+    from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer  # only loaded when serving
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?', 1)[0] not in ('/metrics', '/'):
+                self.send_error(404)
+                return
+            body = registry.render_prometheus().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):  # keep scrapes out of stderr
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True).start()
+    return server
+
+
+_STARTED = False
+
+
+def start_from_env() -> None:
+    """PQC_METRICS_FILE: write the text format there at exit.
+    PQC_METRICS_PORT: serve /metrics on 127.0.0.1:<port>. Idempotent."""
+    global _STARTED
+    if _STARTED:
+        return
+    _STARTED = True
+    path = os.environ.get('PQC_METRICS_FILE')
+    if path:
+        atexit.register(write_prometheus, path)
+    port = os.environ.get('PQC_METRICS_PORT')
+    if port:
+        serve_http(int(port))
@@ -0,0 +1,153 @@
+"""
+Multi-recipient PQC envelope: encrypt once, KEM-wrap the key per recipient.
+
+The payload is sealed a single time under a random 32-byte data-encryption
+key (DEK). For every recipient public key the DEK is wrapped with
+AES-256-GCM under HKDF(KEM shared secret). All encapsulations share one
+KEM context (pqc_envelope.encapsulate_many). Payload cost does not depend
+on the number of recipients; each extra recipient adds one encapsulation
+and one 48-byte wrap.
+
+Format:
+  magic: b'PQM1' (4)
+  alg_len: 1 byte
+  alg_name: bytes
+  count: 2 bytes big-endian
+  ct_len: 2 bytes big-endian (same for every recipient of one mechanism)
+  index: count x (recipient_id 8 bytes, slot 2 bytes big-endian), sorted by id
+  slots: count x (kem_ct ct_len bytes, wrapped_dek 48 bytes)
+  nonce: 12 bytes
+  ciphertext || tag: rest (AAD = SHA-256 of everything before nonce)
+
+recipient_id is the first 8 bytes of SHA-256(public key). A reader
+binary-searches the index for its id and decapsulates exactly one slot.
+Each KEK is fresh per encapsulation, so the DEK wrap uses an all-zero
+nonce with AAD = alg || recipient_id.
+"""
+from __future__ import annotations
+import struct
+import hashlib
+import secrets
+from typing import Optional, Sequence, Tuple
+
+from . import pqc_envelope
+from .secure_store import AESGCM, HAS_CRYPTO, _hkdf_sha256
+
+MULTI_MAGIC = b'PQM1'
+RECIPIENT_ID_LEN = 8
+WRAPPED_LEN = 32 + 16
+_INDEX_ENTRY = struct.Struct('>8sH')
+_WRAP_NONCE = bytes(12)
+
+
+def recipient_id(public_key: bytes) -> bytes:
+    return hashlib.sha256(public_key).digest()[:RECIPIENT_ID_LEN]
+
+
+def _kek(ss: bytes, rid: bytes) -> bytes:
+    return _hkdf_sha256(ss, info=b'multi-envelope-wrap', salt=rid)
+
+
+def _require() -> None:
+    if not HAS_CRYPTO:
+        raise RuntimeError('cryptography not available')
+    if not pqc_envelope.has_pqc():
+        raise ImportError('liboqs (pyoqs) not available')
+
+
+def seal_for(public_keys: Sequence[bytes], plaintext: bytes, alg: Optional[str] = None,
+             aad: bytes = b'') -> bytes:
+    """Seal plaintext so that holders of any of the given KEM public keys can open it."""
+    _require()
+    if not public_keys:
+        raise ValueError('at least one recipient required')
+    if len(public_keys) > 0xFFFF:
+        raise ValueError('too many recipients')
+    ids = [recipient_id(pub) for pub in public_keys]
+    if len(set(ids)) != len(ids):
+        raise ValueError('duplicate recipient public key')
+    encs, alg = pqc_envelope.encapsulate_many(public_keys, alg)
+    ct_len = len(encs[0][0])
+    if any(len(ct) != ct_len for ct, _ss in encs):
+        raise ValueError('recipients must share one KEM mechanism')
+    dek = secrets.token_bytes(32)
+    alg_b = alg.encode('utf-8')
+    slots = []
+    for rid, (ct, ss) in zip(ids, encs):
+        slots.append(ct + AESGCM(_kek(ss, rid)).encrypt(_WRAP_NONCE, dek, alg_b + rid))
+    order = sorted(range(len(ids)), key=lambda i: ids[i])
+    index = b''.join(_INDEX_ENTRY.pack(ids[i], i) for i in order)
+    header = (MULTI_MAGIC + bytes([len(alg_b)]) + alg_b + struct.pack('>HH', len(ids), ct_len)
+              + index + b''.join(slots))
+    nonce = secrets.token_bytes(12)
+    body = AESGCM(dek).encrypt(nonce, plaintext, hashlib.sha256(header).digest() + aad)
+    return header + nonce + body
+
+
+def _parse(mv: memoryview) -> Tuple[str, int, int, int, int]:
+    """(alg, count, ct_len, index_offset, header_end)."""
+    if mv[:4] != MULTI_MAGIC:
+        raise ValueError('Not a PQM1 envelope')
+    p = 4
+    alg_len = mv[p]
+    p += 1
+    alg = str(mv[p:p + alg_len], 'utf-8')
+    p += alg_len
+    count, ct_len = struct.unpack_from('>HH', mv, p)
+    p += 4
+    index_off = p
+    header_end = index_off + count * _INDEX_ENTRY.size + count * (ct_len + WRAPPED_LEN)
+    return alg, count, ct_len, index_off, header_end
+
+
+def _find_slot(mv: memoryview, count: int, index_off: int, rid: bytes) -> int:
+    lo, hi = 0, count
+    while lo < hi:
+        mid = (lo + hi) // 2
+        entry_id, slot = _INDEX_ENTRY.unpack_from(mv, index_off + mid * _INDEX_ENTRY.size)
+        if entry_id == rid:
+            return slot
+        if entry_id < rid:
+            lo = mid + 1
+        else:
+            hi = mid
+    raise KeyError('not a recipient of this envelope')
+
+
+def recipients(blob: bytes) -> Sequence[bytes]:
+    """Recipient ids listed in an envelope's index."""
+    mv = memoryview(blob)
+    _alg, count, _ct_len, index_off, _end = _parse(mv)
+    return [bytes(mv[index_off + i * _INDEX_ENTRY.size:index_off + i * _INDEX_ENTRY.size + RECIPIENT_ID_LEN])
+            for i in range(count)]
+
+
+def open_as(blob: bytes, public_key: bytes, secret_key: Optional[bytes] = None, aad: bytes = b'') -> bytes:
+    """Open an envelope as the holder of public_key.
+
+    secret_key=None means the local keypair from pqc_envelope (cached KEM).
+    """
+    _require()
+    mv = memoryview(blob)
+    alg, count, ct_len, index_off, header_end = _parse(mv)
+    rid = recipient_id(public_key)
+    slot = _find_slot(mv, count, index_off, rid)
+    p = index_off + count * _INDEX_ENTRY.size + slot * (ct_len + WRAPPED_LEN)
+    ct = bytes(mv[p:p + ct_len])
+    wrapped = bytes(mv[p + ct_len:p + ct_len + WRAPPED_LEN])
+    if secret_key is None:
+        ss, local_alg = pqc_envelope.decapsulate(ct)
+        if local_alg != alg:
+            raise ValueError(f'envelope uses {alg}, local key is {local_alg}')
+    else:
+        ss = pqc_envelope.decapsulate_with(secret_key, ct, alg)
+    dek = AESGCM(_kek(ss, rid)).decrypt(_WRAP_NONCE, wrapped, alg.encode('utf-8') + rid)
+    header_digest = hashlib.sha256(mv[:header_end]).digest()
+    nonce = bytes(mv[header_end:header_end + 12])
+    return AESGCM(dek).decrypt(nonce, bytes(mv[header_end + 12:]), header_digest + aad)
+
+
+def open_for_self(blob: bytes, aad: bytes = b'') -> bytes:
+    """Open an envelope with the local static keypair."""
+    pub, _priv, _alg = pqc_envelope.ensure_keys()
+    return open_as(blob, pub, aad=aad)
@@ -0,0 +1,264 @@
+"""
+Repeated-run benchmark for the native pqc_core / pqc_embedded binaries.
+
+Each round starts `parallel` instances of a target at once (optionally
+pinned round-robin to `cpus`) and reaps them with wait4(), so every
+sample carries the kernel's accounting for exactly that child:
+
+  wall_us      spawn -> exit, measured in this process
+  user_us / sys_us / cpu_us   ru_utime, ru_stime and their sum
+  max_rss_kib  ru_maxrss (normalized to KiB; macOS reports bytes)
+
+On Linux the kernel folds the parent's high-water mark into a child's
+ru_maxrss at exec (posix_spawn/fork share or copy the harness's address
+space until then), so max_rss_kib never drops below the harness's own
+peak RSS; that floor is recorded as host.rss_floor_kib. On macOS the
+value is the binary's own peak.
+
+Warm-up rounds run first and are discarded. Output is a JSON-serializable
+dict with host metadata, per-target distributions, the raw samples and,
+when both are measured, embedded/core ratios of the medians:
+
+  cli pqc bench --repeat 50 --warmup 5 --parallel 2 --cpus 2,3 --out native.json
+
+Pinning uses sched_setaffinity (Linux). The harness pins itself before
+each spawn so the child inherits the mask from its first instruction,
+then restores its own mask. Where the call does not exist (macOS) the
+runs are unpinned and the result says so.
+
+Children are started with posix_spawn, stdout/stderr go to /dev/null so
+terminal I/O is not part of the measurement. Reaping uses wait4(-1), so
+call this from a process that has no other children to wait for (the CLI).
+"""
+from __future__ import annotations
+import os
+import sys
+import json
+import time
+import threading
+from collections.abc import Sequence
+
+# cli/main.py imports this module to build its parser, so keep module import
+# cheap: platform, resource and statistics are imported where used,
+# and annotations use builtin generics instead of typing
+
+SCHEMA_VERSION = 1
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+# name -> candidate paths relative to the project root (CMake build dir first)
+TARGETS = {
+    'core-test': ('pqc_core/build/test', 'pqc_core/test'),
+    'core-example': ('pqc_core/build/example', 'pqc_core/example'),
+    'embedded': ('pqc_embedded/build/embedded_demo', 'pqc_embedded/embedded_demo'),
+}
+# (embedded target, baseline) pairs reported as ratios of medians
+COMPARISONS = (('embedded', 'core-example'), ('embedded', 'core-test'))
+DEFAULT_TIMEOUT = 60.0
+
+HAS_AFFINITY = hasattr(os, 'sched_setaffinity')
+
+
+def resolve_target(name: str, root: str = ROOT) -> str:
+    """Path of the first existing executable for a target name (or a path given directly)."""
+    candidates = TARGETS.get(name, (name,))
+    for rel in candidates:
+        path = rel if os.path.isabs(rel) else os.path.join(root, rel)
+        if os.path.isfile(path) and os.access(path, os.X_OK):
+            return path
+    raise FileNotFoundError(f'{name}: no executable at {", ".join(candidates)} (run `cli pqc build` first)')
+
+
+def _distribution(values: Sequence[float]) -> dict:
+    import statistics
+    s = sorted(values)
+    return {
+        'n': len(s),
+        'min': s[0],
+        'median': statistics.median(s),
+        'mean': statistics.fmean(s),
+        'stdev': statistics.stdev(s) if len(s) > 1 else 0.0,
+        'p95': s[min(len(s) - 1, int(round(0.95 * (len(s) - 1))))],
+        'max': s[-1],
+    }
+
+
+def _maxrss_kib(ru) -> int:
+    return ru.ru_maxrss // 1024 if sys.platform == 'darwin' else ru.ru_maxrss
+
+
+def _spawn(path: str, argv: Sequence[str], cpu: int | None) -> int:
+    devnull = [(os.POSIX_SPAWN_OPEN, fd, os.devnull, os.O_WRONLY, 0) for fd in (1, 2)]
+    if cpu is None or not HAS_AFFINITY:
+        return os.posix_spawn(path, [path, *argv], os.environ, file_actions=devnull)
+    saved = os.sched_getaffinity(0)
+    os.sched_setaffinity(0, {cpu})
+    try:
+        return os.posix_spawn(path, [path, *argv], os.environ, file_actions=devnull)
+    finally:
+        os.sched_setaffinity(0, saved)
+
+
+def _kill_overdue(pids: dict[int, float], timeout: float, stop: threading.Event) -> None:
+    while not stop.wait(min(1.0, timeout / 4)):
+        now = time.perf_counter()
+        for pid, start in list(pids.items()):
+            if now - start > timeout:
+                try:
+                    os.kill(pid, 9)
+                except ProcessLookupError:
+                    pass
+
+
+def run_round(path: str, parallel: int = 1, cpus: Sequence[int] = (), argv: Sequence[str] = (),
+              timeout: float = DEFAULT_TIMEOUT) -> list[dict]:
+    """Start `parallel` instances together and return one sample per instance."""
+    running: dict[int, float] = {}
+    slot: dict[int, int] = {}
+    for i in range(parallel):
+        cpu = cpus[i % len(cpus)] if cpus else None
+        start = time.perf_counter()
+        pid = _spawn(path, argv, cpu)
+        running[pid] = start
+        slot[pid] = i
+    stop = threading.Event()
+    watchdog = threading.Thread(target=_kill_overdue, args=(running, timeout, stop), daemon=True)
+    watchdog.start()
+    samples: list[dict | None] = [None] * parallel
+    try:
+        while running:
+            pid, status, ru = os.wait4(-1, 0)
+            end = time.perf_counter()
+            start = running.pop(pid, None)
+            if start is None:
+                continue  # not ours
+            user, sys_ = ru.ru_utime, ru.ru_stime
+            samples[slot[pid]] = {
+                'instance': slot[pid],
+                'cpu': cpus[slot[pid] % len(cpus)] if cpus and HAS_AFFINITY else None,
+                'exit': os.waitstatus_to_exitcode(status),
+                'wall_us': (end - start) * 1e6,
+                'user_us': user * 1e6,
+                'sys_us': sys_ * 1e6,
+                'cpu_us': (user + sys_) * 1e6,
+                'max_rss_kib': _maxrss_kib(ru),
+            }
+    finally:
+        stop.set()
+        for pid in running:  # interrupted: do not leave instances behind
+            try:
+                os.kill(pid, 9)
+                os.waitpid(pid, 0)
+            except (ProcessLookupError, ChildProcessError):
+                pass
+    return [s for s in samples if s is not None]
+
+
+def bench_target(path: str, repeat: int = 20, warmup: int = 2, parallel: int = 1,
+                 cpus: Sequence[int] = (), argv: Sequence[str] = (), timeout: float = DEFAULT_TIMEOUT) -> dict:
+    for _ in range(warmup):
+        run_round(path, parallel, cpus, argv, timeout)
+    samples: list[dict] = []
+    for r in range(repeat):
+        for s in run_round(path, parallel, cpus, argv, timeout):
+            s['round'] = r
+            samples.append(s)
+    ok = [s for s in samples if s['exit'] == 0]
+    out: dict = {'path': path, 'runs': len(samples), 'failures': len(samples) - len(ok), 'samples': samples}
+    if ok:
+        out['distributions'] = {key: _distribution([s[key] for s in ok])
+                                for key in ('wall_us', 'user_us', 'sys_us', 'cpu_us', 'max_rss_kib')}
+    return out
+
+
+def _comparisons(results: dict[str, dict]) -> dict[str, dict]:
+    out = {}
+    for name, base in COMPARISONS:
+        a = results.get(name, {}).get('distributions')
+        b = results.get(base, {}).get('distributions')
+        if a and b:
+            out[f'{name}/{base}'] = {key: a[key]['median'] / b[key]['median'] if b[key]['median'] else None
+                                     for key in ('wall_us', 'cpu_us', 'max_rss_kib')}
+    return out
+
+
+def run(targets: Sequence[str] = tuple(TARGETS), repeat: int = 20, warmup: int = 2, parallel: int = 1,
+        cpus: Sequence[int] = (), argv: Sequence[str] = (), timeout: float = DEFAULT_TIMEOUT,
+        root: str = ROOT) -> dict:
+    """Benchmark each target; a missing binary is reported under its name, not fatal."""
+    if repeat < 1 or parallel < 1 or warmup < 0:
+        raise ValueError('repeat and parallel must be >= 1, warmup >= 0')
+    import platform
+    import resource
+    result: dict = {
+        'schema': SCHEMA_VERSION,
+        'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+        'host': {
+            'platform': platform.platform(),
+            'machine': platform.machine(),
+            'python': sys.version.split()[0],
+            'cpu_count': os.cpu_count(),
+            'rss_floor_kib': _maxrss_kib(resource.getrusage(resource.RUSAGE_SELF)) if sys.platform.startswith('linux') else 0,
+        },
+        'config': {
+            'repeat': repeat, 'warmup': warmup, 'parallel': parallel, 'argv': list(argv), 'timeout_s': timeout,
+            'cpus': list(cpus), 'pinned': bool(cpus) and HAS_AFFINITY,
+        },
+        'results': {},
+    }
+    for name in targets:
+        try:
+            path = resolve_target(name, root)
+        except FileNotFoundError as e:
+            result['results'][name] = {'skipped': str(e)}
+            continue
+        try:
+            result['results'][name] = bench_target(path, repeat, warmup, parallel, cpus, argv, timeout)
+        except OSError as e:  # e.g. wrong architecture / not executable on this host
+            result['results'][name] = {'path': path, 'error': f'{type(e).__name__}: {e}'}
+    result['comparisons'] = _comparisons(result['results'])
+    return result
+
+
+def parse_cpus(spec: str | None) -> list[int]:
+    """'0,2-3' -> [0, 2, 3]."""
+    cpus: list[int] = []
+    for part in (spec or '').split(','):
+        part = part.strip()
+        if not part:
+            continue
+        lo, _, hi = part.partition('-')
+        cpus.extend(range(int(lo), int(hi or lo) + 1))
+    return cpus
+
+
+def add_arguments(ap) -> None:
+    # the single definition of the bench options, shared by main() and `cli pqc bench`
+    ap.add_argument('--targets', default=','.join(TARGETS),
+                    help='Comma-separated targets (' + ', '.join(TARGETS) + ') or executable paths')
+    ap.add_argument('--repeat', type=int, default=20, help='Measured rounds per target (default: 20)')
+    ap.add_argument('--warmup', type=int, default=2, help='Discarded rounds before measuring (default: 2)')
+    ap.add_argument('--parallel', type=int, default=1, help='Instances started together per round (default: 1)')
+    ap.add_argument('--cpus', default=None, help="Pin instances round-robin to these CPUs, e.g. '2,3' or '0-3' (Linux)")
+    ap.add_argument('--timeout', type=float, default=DEFAULT_TIMEOUT, help='Kill an instance after this many seconds')
+    ap.add_argument('--out', default=None, help='Write JSON here instead of stdout')
+
+
+def run_cli(args, root: str = ROOT) -> int:
+    targets = [t.strip() for t in args.targets.split(',') if t.strip()]
+    result = run(targets, repeat=args.repeat, warmup=args.warmup, parallel=args.parallel,
+                 cpus=parse_cpus(args.cpus), timeout=args.timeout, root=root)
+    text = json.dumps(result, indent=2, sort_keys=True)
+    if args.out:
+        with open(args.out, 'w', encoding='utf-8') as f:
+            f.write(text + '\n')
+    else:
+        print(text)
+    measured = [r for r in result['results'].values() if 'distributions' in r]
+    return 0 if measured else 1
+
+
+def main(argv=None, root: str = ROOT) -> int:
+    import argparse
+    ap = argparse.ArgumentParser(description='Benchmark the native pqc_core / pqc_embedded binaries (JSON output)')
+    add_arguments(ap)
+    args = ap.parse_args(argv)
+    return run_cli(args, root)
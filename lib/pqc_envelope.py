@@ -2,18 +2,26 @@
 PQC envelope for local data-at-rest key protection.
 
 - Tries to use liboqs (Kyber512 / ML-KEM-512) if available.
-- Stores static KEM keypair under data/: kem_pub.bin, kem_priv.bin
+- Stores static KEM keypair under data/: kem_pub.bin, kem_priv.bin, and the
+  mechanism name in kem_alg.txt
+- Keeps the mechanism list, keypair and initialized KEM objects cached
+  in-process; they are reloaded when the key files change on disk
 - Provides: ensure_keys(), encapsulate_for_self() -> (ct, ss), decapsulate(ct) -> ss
 
 If liboqs is unavailable, raises ImportError so caller can fallback.
 """
 from __future__ import annotations
 import os
-from typing import Tuple
+import time
+import threading
+from typing import Any, List, Optional, Sequence, Tuple
+
+from . import metrics
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
 PUB_PATH = os.path.join(DATA_DIR, 'kem_pub.bin')
 PRIV_PATH = os.path.join(DATA_DIR, 'kem_priv.bin')
+ALG_PATH = os.path.join(DATA_DIR, 'kem_alg.txt')
 ALG_CANDIDATES = (
     'Kyber512',        # old naming sometimes used
     'ML-KEM-512',      # NIST name in liboqs recent builds
@@ -26,42 +34,110 @@ except Exception:
     oqs = None  # type: ignore
     _HAS_OQS = False
 
+# In-process caches (guarded by _LOCK; oqs objects are not shared across threads unlocked)
+_LOCK = threading.RLock()
+_MECHANISMS: Optional[Tuple[str, ...]] = None
+_KEYS: Optional[Tuple[bytes, bytes, str, Tuple]] = None  # (pub, priv, alg, file stamps)
+_ENCAP_KEM: Any = None
+_DECAP_KEM: Any = None
+
+_KEM_OPS = metrics.counter('pqc_kem_ops', 'KEM operations (keygen/encap/decap) by algorithm', ('op', 'alg'))
+_KEM_SECONDS = metrics.histogram('pqc_kem_seconds', 'Time spent inside liboqs per KEM operation', ('op',))
+
+
+def _enabled_mechanisms() -> Tuple[str, ...]:
+    global _MECHANISMS
+    if _MECHANISMS is None:
+        _MECHANISMS = tuple(oqs.get_enabled_kem_mechanisms())
+    return _MECHANISMS
+
 
 def _select_alg() -> str:
     assert _HAS_OQS
-    available = set(oqs.get_enabled_kem_mechanisms())
+    available = set(_enabled_mechanisms())
     for name in ALG_CANDIDATES:
         if name in available:
             return name
     # pick any Kyber-like
-    for name in available:
+    for name in sorted(available):
         if 'KEM' in name or 'Kyber' in name:
             return name
     raise RuntimeError('No suitable PQC KEM found in liboqs')
 
 
-def ensure_keys() -> Tuple[bytes, bytes, str]:
-    """Load or create local static KEM keypair. Returns (pub, priv, alg)."""
-    if not _HAS_OQS:
-        raise ImportError('liboqs (pyoqs) not available')
-    os.makedirs(DATA_DIR, exist_ok=True)
-    if os.path.exists(PUB_PATH) and os.path.exists(PRIV_PATH):
-        with open(PUB_PATH, 'rb') as f:
-            pub = f.read()
-        with open(PRIV_PATH, 'rb') as f:
-            priv = f.read()
-        # alg hint stored at beginning of pub as ASCII? keep external file later if needed
-        alg = _select_alg()
-        return pub, priv, alg
-    # create new
+def _infer_alg(pub: bytes, priv: bytes) -> str:
+    """Best match for a keypair written before the algorithm was recorded."""
+    preferred = _select_alg()
+    names = [preferred] + [n for n in _enabled_mechanisms() if n != preferred]
+    for name in names:
+        if not ('KEM' in name or 'Kyber' in name):
+            continue
+        try:
+            with oqs.KeyEncapsulation(name) as kem:
+                d = kem.details
+        except Exception:
+            continue
+        if d.get('length_public_key') == len(pub) and d.get('length_secret_key') == len(priv):
+            return name
+    return preferred
+
+
+def _stamp(path: str) -> Tuple[int, int]:
+    st = os.stat(path)
+    return st.st_mtime_ns, st.st_size
+
+
+def _free_cached() -> None:
+    global _KEYS, _ENCAP_KEM, _DECAP_KEM
+    for kem in (_ENCAP_KEM, _DECAP_KEM):
+        if kem is not None:
+            try:
+                kem.free()
+            except Exception:
+                pass
+    _KEYS = _ENCAP_KEM = _DECAP_KEM = None
+
+
+def reset_cache() -> None:
+    """Drop cached mechanism list, keypair and KEM objects (e.g. after key rotation)."""
+    global _MECHANISMS
+    with _LOCK:
+        _free_cached()
+        _MECHANISMS = None
+
+
+def _write_alg(alg: str) -> None:
+    with open(ALG_PATH, 'w', encoding='utf-8') as f:
+        f.write(alg + '\n')
+
+
+def _load_keys() -> Tuple[bytes, bytes, str]:
+    with open(PUB_PATH, 'rb') as f:
+        pub = f.read()
+    with open(PRIV_PATH, 'rb') as f:
+        priv = f.read()
+    alg = ''
+    if os.path.exists(ALG_PATH):
+        with open(ALG_PATH, 'r', encoding='utf-8') as f:
+            alg = f.read().strip()
+    if not alg:
+        # keys from an older version: work out the algorithm once and record it
+        alg = _infer_alg(pub, priv)
+        _write_alg(alg)
+    return pub, priv, alg
+
+
+def _create_keys() -> Tuple[bytes, bytes, str]:
     alg = _select_alg()
-    with oqs.KeyEncapsulation(alg) as kem:
+    with oqs.KeyEncapsulation(alg) as kem, _KEM_SECONDS.time(op='keygen'):
         pub = kem.generate_keypair()
         priv = kem.export_secret_key()
+    _KEM_OPS.inc(op='keygen', alg=alg)
     with open(PUB_PATH, 'wb') as f:
         f.write(pub)
     with open(PRIV_PATH, 'wb') as f:
         f.write(priv)
+    _write_alg(alg)
     try:
         os.chmod(PUB_PATH, 0o644)
         os.chmod(PRIV_PATH, 0o600)
@@ -70,27 +146,95 @@ def ensure_keys() -> Tuple[bytes, bytes, str]:
     return pub, priv, alg
 
 
+def _current_stamp() -> Tuple:
+    try:
+        return _stamp(PUB_PATH), _stamp(PRIV_PATH), _stamp(ALG_PATH)
+    except OSError:
+        return ()
+
+
+def _ensure_keys_locked() -> Tuple[bytes, bytes, str]:
+    global _KEYS
+    stamp = _current_stamp()
+    if _KEYS is not None and stamp and _KEYS[3] == stamp:
+        return _KEYS[0], _KEYS[1], _KEYS[2]
+    _free_cached()
+    os.makedirs(DATA_DIR, exist_ok=True)
+    if os.path.exists(PUB_PATH) and os.path.exists(PRIV_PATH):
+        pub, priv, alg = _load_keys()
+    else:
+        pub, priv, alg = _create_keys()
+    _KEYS = (pub, priv, alg, _current_stamp())
+    return pub, priv, alg
+
+
+def ensure_keys() -> Tuple[bytes, bytes, str]:
+    """Load or create local static KEM keypair. Returns (pub, priv, alg).
+
+    Cached in-process; the files are only re-read when their mtime/size change.
+    """
+    if not _HAS_OQS:
+        raise ImportError('liboqs (pyoqs) not available')
+    with _LOCK:
+        return _ensure_keys_locked()
+
+
 def encapsulate_for_self() -> Tuple[bytes, bytes, str]:
     """Encapsulate to our own public key. Returns (ct, shared_secret, alg)."""
+    global _ENCAP_KEM
     if not _HAS_OQS:
         raise ImportError('liboqs (pyoqs) not available')
-    pub, _priv, alg = ensure_keys()
-    with oqs.KeyEncapsulation(alg) as kem:
-        kem.import_public_key(pub)
-        ct, ss = kem.encap_secret()
-        return ct, ss, alg
+    with _LOCK:
+        pub, _priv, alg = _ensure_keys_locked()
+        if _ENCAP_KEM is None:
+            _ENCAP_KEM = oqs.KeyEncapsulation(alg)
+        with _KEM_SECONDS.time(op='encap'):
+            ct, ss = _ENCAP_KEM.encap_secret(pub)
+    _KEM_OPS.inc(op='encap', alg=alg)
+    return ct, ss, alg
 
 
 def decapsulate(ciphertext: bytes) -> Tuple[bytes, str]:
     """Decapsulate ciphertext with our private key. Returns (shared_secret, alg)."""
+    global _DECAP_KEM
+    if not _HAS_OQS:
+        raise ImportError('liboqs (pyoqs) not available')
+    with _LOCK:
+        _pub, priv, alg = _ensure_keys_locked()
+        if _DECAP_KEM is None:
+            _DECAP_KEM = oqs.KeyEncapsulation(alg, secret_key=priv)
+        with _KEM_SECONDS.time(op='decap'):
+            ss = _DECAP_KEM.decap_secret(ciphertext)
+    _KEM_OPS.inc(op='decap', alg=alg)
+    return ss, alg
+
+
+def encapsulate_many(public_keys: Sequence[bytes], alg: Optional[str] = None) -> Tuple[List[Tuple[bytes, bytes]], str]:
+    """Encapsulate to each public key with one KEM context. Returns ([(ct, ss), ...], alg).
+
+    alg defaults to the local keypair's algorithm; all keys must use it.
+    """
     if not _HAS_OQS:
         raise ImportError('liboqs (pyoqs) not available')
-    pub, priv, alg = ensure_keys()
+    if alg is None:
+        alg = ensure_keys()[2]
     with oqs.KeyEncapsulation(alg) as kem:
-        kem.import_public_key(pub)
-        kem.import_secret_key(priv)
+        out = []
+        for pub in public_keys:
+            with _KEM_SECONDS.time(op='encap'):
+                out.append(kem.encap_secret(pub))
+    _KEM_OPS.inc(len(out), op='encap', alg=alg)
+    return out, alg
+
+
+def decapsulate_with(secret_key: bytes, ciphertext: bytes, alg: str) -> bytes:
+    """Decapsulate with an explicit secret key (not the local keypair)."""
+    if not _HAS_OQS:
+        raise ImportError('liboqs (pyoqs) not available')
+    with oqs.KeyEncapsulation(alg, secret_key=secret_key) as kem, _KEM_SECONDS.time(op='decap'):
         ss = kem.decap_secret(ciphertext)
-        return ss, alg
+    _KEM_OPS.inc(op='decap', alg=alg)
+    return ss
 
 
 def has_pqc() -> bool:
@@ -0,0 +1,321 @@
+"""
+Batched NumPy port of the pqc_core polynomial routines (N=256, q=3329).
+
+Every function works on arrays of shape (..., 256), so thousands of
+polynomials are processed in one call as vectorized array operations
+instead of one polynomial at a time.
+
+The routines follow what pqc_core/libpqc_core.a actually does (read from
+its ntt.o, poly.o and reduce.o), including the order of reductions:
+
+- reduce: pqc_mul_mod and pqc_barrett_reduce both return the canonical
+  representative in [0, q); there is no Montgomery form anywhere
+- ntt / intt: full 8-layer cyclic transform of length 256 with the root
+  g^13 (g = smallest generator of Z_q^*, i.e. 3, root = 3061); Cooley-Tukey
+  layers len = 1..128 forward, Gentleman-Sande len = 128..1 inverse, twiddles
+  restarting at 1 in every block, and a final multiply by 256^-1. Neither
+  direction permutes into bit-reversed order, so intt(ntt(a)) == a mod q but
+  intt(pointwise_mul(ntt(a), ntt(b))) is *not* a ring product
+- pointwise_mul: coefficient-wise a*b mod q
+- mul_schoolbook: the product pqc_core's KEM uses, a*b mod (X^256 - 1, q)
+  summed in a wrapping int32 accumulator before the reduction
+- uniform / noise_small / noise_cbd2: samplers driven by pqc_core's
+  internal xorshift generator (state seeded 0x12345678, 0xdeadbeef; one
+  32-bit word per coefficient). noise_small keeps 2+2 bits of each word
+  (CBD eta=2); noise_cbd2 keeps 4+4 bits, so despite its name it samples
+  from [-4, 4]. Results are canonical, like the C code stores them.
+  The generator's state map has order 32, so from any state the stream
+  repeats every 32 words and each sampled polynomial is one 32-coefficient
+  pattern repeated 8 times; use sample_cbd2() with a numpy Generator when
+  statistics need fresh randomness.
+
+The C generator is one global stream; the samplers here take and return
+its state explicitly so consecutive calls can be chained in the same order
+as the C calls.
+
+Validation: self_check() compares the vectorized code against scalar
+transliterations of the disassembled C loops, against exact cyclic
+multiplication and against the ntt/intt round trip. check_kat(path) replays
+vectors produced by a program linked against pqc_core/libpqc_core.a. The
+shipped objects are Mach-O, so such vectors have to be dumped on the macOS
+build host. Format: a JSON list of {"op": ..., "a": [...], "b": [...],
+"state": [s0, s1], "out": [...]}, where "b" is used by the two-operand ops
+and "state" by the samplers.
+"""
+from __future__ import annotations
+import json
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+
+N = 256
+Q = 3329
+SEED = (0x12345678, 0xDEADBEEF)   # s0, s1 in poly.o's __data
+GOLDEN = 0x9E3779B9
+PERIOD = 32                       # order of the xorshift state map: every state recurs after 32 words
+_BARRETT_V = 20159                # floor(2^26 / q) + 1, as in reduce.o
+
+
+def _generator() -> int:
+    # pqc_ntt/pqc_intt search 2..q-1 for g with g^((q-1)/2) != 1 and g^256 != 1 (fallback 17)
+    return next((g for g in range(2, Q) if pow(g, (Q - 1) // 2, Q) != 1 and pow(g, 256, Q) != 1), 17)
+
+
+ROOT = pow(_generator(), 13, Q)   # primitive 256th root of unity
+INV_ROOT = pow(ROOT, -1, Q)
+INV_N = pow(N, -1, Q)
+
+
+def barrett_reduce(a) -> np.ndarray:
+    """Canonical representative in [0, q) of each int32 value, as pqc_barrett_reduce computes it."""
+    a = np.asarray(a, dtype=np.int64)
+    r = a - ((a * _BARRETT_V) >> 26) * Q
+    r = np.where(r < 0, r + Q, r)
+    return np.where(r >= Q, r - Q, r)
+
+
+def mul_mod(a, b) -> np.ndarray:
+    """a*b mod q, canonical (pqc_mul_mod: exact remainder, then Barrett)."""
+    return np.mod(np.asarray(a, dtype=np.int64) * np.asarray(b, dtype=np.int64), Q)
+
+
+def _as_batch(a) -> np.ndarray:
+    # the C routines take int16_t *, so inputs wrap like a store into int16
+    a = np.asarray(a).astype(np.int16).astype(np.int64)
+    if a.ndim == 0 or a.shape[-1] != N:
+        raise ValueError(f'last axis must have {N} coefficients, got {a.shape}')
+    return a
+
+
+def _twiddles(root: int, length: int) -> np.ndarray:
+    wlen = pow(root, N // (2 * length), Q)
+    return np.array([pow(wlen, j, Q) for j in range(length)], dtype=np.int64)
+
+
+def ntt(a) -> np.ndarray:
+    """Forward transform of every polynomial in a (shape (..., 256)), as pqc_ntt."""
+    r = _as_batch(a)
+    lead = r.shape[:-1]
+    length = 1
+    while length <= 128:
+        v = r.reshape(lead + (N // (2 * length), 2, length))
+        lo = v[..., 0, :]
+        t = mul_mod(_twiddles(ROOT, length), v[..., 1, :])
+        r = np.stack([barrett_reduce(lo + t), barrett_reduce(lo - t)], axis=-2).reshape(lead + (N,))
+        length <<= 1
+    return r.astype(np.int16)
+
+
+def intt(a) -> np.ndarray:
+    """Inverse transform (including the 256^-1 scaling), as pqc_intt."""
+    r = _as_batch(a)
+    lead = r.shape[:-1]
+    length = 128
+    while length >= 1:
+        v = r.reshape(lead + (N // (2 * length), 2, length))
+        lo, hi = v[..., 0, :], v[..., 1, :]
+        d = barrett_reduce(mul_mod(_twiddles(INV_ROOT, length), lo - hi))
+        r = np.stack([barrett_reduce(lo + hi), d], axis=-2).reshape(lead + (N,))
+        length >>= 1
+    return barrett_reduce(mul_mod(r, INV_N)).astype(np.int16)
+
+
+def pointwise_mul(a, b) -> np.ndarray:
+    """Coefficient-wise product mod q, as poly_pointwise_mul."""
+    return barrett_reduce(mul_mod(_as_batch(a), _as_batch(b))).astype(np.int16)
+
+
+def mul_schoolbook(a, b) -> np.ndarray:
+    """a*b mod (X^256 - 1, q), as poly_mul_schoolbook (int32 accumulator, wraps on overflow)."""
+    a, b = np.broadcast_arrays(_as_batch(a), _as_batch(b))
+    acc = np.zeros(a.shape, dtype=np.int64)
+    for i in range(N):
+        acc += a[..., i:i + 1] * np.roll(b, i, axis=-1)
+    acc = ((acc + (1 << 31)) & 0xFFFFFFFF) - (1 << 31)
+    return np.mod(acc, Q).astype(np.int16)
+
+
+# ----------------------------- xorshift stream ----------------------------- #
+
+def _rotl(x: np.ndarray, k: int) -> np.ndarray:
+    return (x << np.uint32(k)) | (x >> np.uint32(32 - k))
+
+
+def _step(s0: np.ndarray, s1: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    a = _rotl(s1, 13) ^ s0
+    n0 = _rotl(a, 17) ^ s1
+    n1 = _rotl(n0, 5) ^ a
+    return n0, n1, a + np.uint32(GOLDEN)
+
+
+def prng_words(count: int, state: Tuple[int, int] = SEED) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """Next count*256 words of pqc_core's generator, shape (count, 256) uint32, and the state after them."""
+    s0, s1 = np.array([state[0]], dtype=np.uint32), np.array([state[1]], dtype=np.uint32)
+    cycle = np.empty(PERIOD, dtype=np.uint32)
+    for j in range(PERIOD):
+        s0, s1, cycle[j:j + 1] = _step(s0, s1)
+    # the state map has order PERIOD, so every 256-word block starts from the same state
+    return np.tile(cycle, (count, N // PERIOD)), state
+
+
+def _bits(words: np.ndarray, lo: int, n: int) -> np.ndarray:
+    return sum(((words >> np.uint32(lo + i)) & np.uint32(1)).astype(np.int64) for i in range(n))
+
+
+def cbd2(words) -> np.ndarray:
+    """poly_noise_cbd2's map of generator words to coefficients: popcount(w & 0xf) - popcount(w >> 4 & 0xf) mod q."""
+    w = np.asarray(words, dtype=np.uint32)
+    return barrett_reduce(_bits(w, 0, 4) - _bits(w, 4, 4)).astype(np.int16)
+
+
+def uniform(count: int, state: Tuple[int, int] = SEED) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """count polynomials as poly_uniform draws them (word mod q), and the next state."""
+    words, state = prng_words(count, state)
+    return (words % np.uint32(Q)).astype(np.int16), state
+
+
+def noise_small(count: int, state: Tuple[int, int] = SEED) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """count polynomials as poly_noise_small draws them (CBD eta=2 from bits 0..3), and the next state."""
+    words, state = prng_words(count, state)
+    return barrett_reduce(_bits(words, 0, 2) - _bits(words, 2, 2)).astype(np.int16), state
+
+
+def noise_cbd2(count: int, state: Tuple[int, int] = SEED) -> Tuple[np.ndarray, Tuple[int, int]]:
+    """count polynomials as poly_noise_cbd2 draws them, and the next state."""
+    words, state = prng_words(count, state)
+    return cbd2(words), state
+
+
+def sample_cbd2(count: int, rng: Optional[np.random.Generator] = None) -> np.ndarray:
+    """count polynomials with poly_noise_cbd2's distribution from fresh randomness (default: new Generator)."""
+    rng = rng if rng is not None else np.random.default_rng()
+    return cbd2(rng.integers(0, 1 << 32, size=(count, N), dtype=np.uint32))
+
+
+# ----------------------------- validation ----------------------------- #
+
+def _i16(x: int) -> int:
+    x &= 0xFFFF
+    return x - 0x10000 if x >= 0x8000 else x
+
+
+def _ref_barrett(a: int) -> int:
+    r = a - ((a * _BARRETT_V) >> 26) * Q
+    if r < 0:
+        r += Q
+    if r >= Q:
+        r -= Q
+    return r
+
+
+def _ref_mul_mod(a: int, b: int) -> int:
+    p = a * b
+    r = abs(p) % Q  # C remainder: sign of the dividend
+    return _ref_barrett(-r if p < 0 else r)
+
+
+def ref_ntt(a: List[int]) -> List[int]:
+    """Scalar transliteration of pqc_ntt (slow; for validation)."""
+    r = [_i16(x) for x in a]
+    length = 1
+    while length <= 128:
+        wlen = pow(ROOT, N // (2 * length), Q)
+        for start in range(0, N, 2 * length):
+            w = 1
+            for j in range(start, start + length):
+                u = r[j]
+                t = _ref_mul_mod(w, r[j + length])
+                r[j] = _ref_barrett(u + t)
+                r[j + length] = _ref_barrett(u - t)
+                w = _ref_mul_mod(w, wlen)
+        length <<= 1
+    return r
+
+
+def ref_intt(a: List[int]) -> List[int]:
+    """Scalar transliteration of pqc_intt."""
+    r = [_i16(x) for x in a]
+    length = 128
+    while length >= 1:
+        wlen = pow(INV_ROOT, N // (2 * length), Q)
+        for start in range(0, N, 2 * length):
+            w = 1
+            for j in range(start, start + length):
+                u, v = r[j], r[j + length]
+                r[j] = _ref_barrett(u + v)
+                r[j + length] = _ref_barrett(_ref_mul_mod(w, u - v))
+                w = _ref_mul_mod(w, wlen)
+        length >>= 1
+    return [_ref_barrett(_ref_mul_mod(x, INV_N)) for x in r]
+
+
+def ref_cyclic_mul(a: List[int], b: List[int]) -> List[int]:
+    """Exact a*b mod (X^256 - 1, q) with unbounded integers, canonical."""
+    out = [0] * N
+    for i, ai in enumerate(a):
+        for j, bj in enumerate(b):
+            out[(i + j) % N] += _i16(ai) * _i16(bj)
+    return [x % Q for x in out]
+
+
+def ref_prng(count: int, state: Tuple[int, int] = SEED) -> Tuple[List[int], Tuple[int, int]]:
+    """Scalar transliteration of the generator step shared by the poly.o samplers."""
+    rotl = lambda x, k: ((x << k) | (x >> (32 - k))) & 0xFFFFFFFF  # noqa: E731
+    s0, s1 = state
+    out = []
+    for _ in range(count):
+        a = rotl(s1, 13) ^ s0
+        s0 = rotl(a, 17) ^ s1
+        s1 = rotl(s0, 5) ^ a
+        out.append((a + GOLDEN) & 0xFFFFFFFF)
+    return out, (s0, s1)
+
+
+def self_check(batch: int = 8, seed: int = 0) -> Dict[str, bool]:
+    """Compare the vectorized engine with the scalar references."""
+    rng = np.random.default_rng(seed)
+    a = rng.integers(-(1 << 15), 1 << 15, size=(batch, N), dtype=np.int16)
+    b = rng.integers(0, Q, size=(batch, N), dtype=np.int16)
+    small = rng.integers(-4, 5, size=(batch, N), dtype=np.int16)
+    fa = ntt(a)
+    words, state = prng_words(3, (12345, 67890))
+    ref_words, ref_state = ref_prng(3 * N, (12345, 67890))
+    return {
+        'root': ROOT == 3061 and pow(ROOT, 128, Q) == Q - 1,
+        'ntt': all(fa[i].tolist() == ref_ntt(a[i].tolist()) for i in range(batch)),
+        'intt': all(intt(fa)[i].tolist() == ref_intt(fa[i].tolist()) for i in range(batch)),
+        'roundtrip': np.array_equal(intt(fa), np.mod(a.astype(np.int64), Q)),
+        'pointwise_mul': np.array_equal(pointwise_mul(a, b), np.mod(a.astype(np.int64) * b, Q)),
+        'mul_schoolbook': all(mul_schoolbook(small, b)[i].tolist() == ref_cyclic_mul(small[i].tolist(), b[i].tolist())
+                              for i in range(min(batch, 2))),
+        'prng': words.ravel().tolist() == ref_words and state == ref_state and ref_prng(PERIOD, SEED)[1] == SEED,
+        'noise_cbd2': np.array_equal(noise_cbd2(3, (12345, 67890))[0], cbd2(np.array(ref_words).reshape(3, N))),
+    }
+
+
+def check_kat(path: str) -> Dict[str, int]:
+    """Replay known-answer vectors from a JSON file; returns {'passed': n, 'failed': m}."""
+    with open(path, 'r', encoding='utf-8') as f:
+        vectors = json.load(f)
+    samplers = {'uniform': uniform, 'noise_small': noise_small, 'noise_cbd2': noise_cbd2}
+    passed = failed = 0
+    for v in vectors:
+        op = v['op']
+        if op == 'ntt':
+            got = ntt(v['a'])
+        elif op == 'intt':
+            got = intt(v['a'])
+        elif op == 'pointwise_mul':
+            got = pointwise_mul(v['a'], v['b'])
+        elif op == 'mul_schoolbook':
+            got = mul_schoolbook(v['a'], v['b'])
+        elif op in samplers:
+            got = samplers[op](1, tuple(v['state']))[0][0]
+        else:
+            raise ValueError(f'Unknown KAT op: {op}')
+        # pqc_core stores canonical values, so compare exactly
+        if np.array_equal(got.astype(np.int64), np.asarray(v['out'], dtype=np.int64)):
+            passed += 1
+        else:
+            failed += 1
+    return {'passed': passed, 'failed': failed}
@@ -3,7 +3,9 @@ Secure store for users dict with optional PQC protection.
 
 If liboqs is available, generate a one-time shared secret via KEM
 (encapsulate to local static public key) and derive an AES-256-GCM key
-from it to encrypt the JSON. Store alongside the KEM ciphertext.
+from it to encrypt the users dict. Store alongside the KEM ciphertext.
+The plaintext is the binary record codec from lib.user_codec; stores
+written with JSON plaintext by older versions are still read.
 
 Format (users.enc):
   magic: b'PQC1' (4)
@@ -19,40 +21,86 @@ Format (users.enc):
 If liboqs is not available, fallback to AES-256-GCM with a locally
 stored master key (data/master.key, 32 bytes). This still gives strong
 at-rest encryption, just not PQC-derived.
+
+Cached data-encryption key mode (default, PQC_STORE_ENVELOPE=dek):
+a random 32-byte DEK is KEM-wrapped once and reused for up to
+DEK_MAX_WRITES saves or DEK_MAX_AGE seconds, so the KEM leaves the
+per-write path. A DEK is only ever used for writing by the process that
+created it, and its nonces are a per-DEK counter, so nonces never repeat.
+A forked child drops the inherited DEK (and any prefetch in flight) and
+wraps its own, so parent and child never share a (DEK, counter) pair.
+The next DEK is wrapped on a background thread before the current one
+runs out. Readers cache unwrapped DEKs by header, so repeated loads skip
+decapsulation too. PQC_STORE_ENVELOPE=per-write restores the PQC1
+one-encapsulation-per-save behaviour.
+
+Format (users.enc, DEK mode):
+  magic: b'PQD1' (4)
+  alg_len: 1 byte (0 means DEK wrapped under the fallback master key)
+  alg_name: bytes
+  ct_len: 2 bytes big-endian
+  kem_ct: bytes
+  dek_id: 8 bytes
+  wrap_nonce: 12 bytes
+  wrapped_len: 1 byte (48)
+  wrapped_dek: AES-GCM(KEK, DEK), KEK = HKDF(shared secret or master key)
+  nonce: 12 bytes (per-DEK counter, big-endian)
+  tag: 16 bytes
+  ciphertext: rest (AAD = everything before nonce)
 """
 from __future__ import annotations
 import os
-import json
+import time
 import struct
-from typing import Dict, Tuple
+import secrets
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
 
 try:
     from cryptography.hazmat.primitives.ciphers.aead import AESGCM  # type: ignore
     from cryptography.hazmat.primitives import hashes  # type: ignore
     from cryptography.hazmat.primitives.kdf.hkdf import HKDF  # type: ignore
+    from cryptography.exceptions import InvalidTag  # type: ignore
     HAS_CRYPTO = True
 except Exception:  # ImportError or environment issues
     AESGCM = None  # type: ignore
     hashes = None  # type: ignore
     HKDF = None  # type: ignore
+    InvalidTag = ValueError  # type: ignore
     HAS_CRYPTO = False
 
-from . import pqc_envelope
+from . import metrics, pqc_envelope
+from .store_io import atomic_write
+from .user_codec import decode_users, encode_payload
 
 DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(__file__)), 'data')
 ENC_PATH = os.path.join(DATA_DIR, 'users.enc')
 MASTER_KEY_PATH = os.path.join(DATA_DIR, 'master.key')
 MAGIC = b'PQC1'
+DEK_MAGIC = b'PQD1'
+SPOOL_MAGIC = b'PQS1'
+ENVELOPE_MODE = os.environ.get('PQC_STORE_ENVELOPE', 'dek')  # 'dek' or 'per-write'
+DEK_MAX_WRITES = int(os.environ.get('PQC_STORE_DEK_MAX_WRITES', '1000'))
+DEK_MAX_AGE = float(os.environ.get('PQC_STORE_DEK_MAX_AGE', '3600'))
+# Start wrapping the next DEK in the background at this fraction of either limit
+DEK_PREFETCH_AT = 0.9
+_OPEN_DEK_CACHE_SIZE = 16
+
+_SAVE_SECONDS = metrics.histogram('pqc_secure_store_save_seconds', 'save_users_secure duration (encode + seal + atomic write)', ('format',))
+_LOAD_SECONDS = metrics.histogram('pqc_secure_store_load_seconds', 'load_users_secure duration (read + open + decode)', ('format',))
+_DEK_WRAPS = metrics.counter('pqc_secure_store_dek_wraps', 'Data-encryption keys generated and wrapped', ('kek',))
+_DEK_OPENS = metrics.counter('pqc_secure_store_dek_opens', 'DEK lookups when reading PQD1 stores', ('result',))
 
 
 def _ensure_data_dir():
     os.makedirs(DATA_DIR, exist_ok=True)
 
 
-def _hkdf_sha256(key_material: bytes, info: bytes = b'users-store') -> bytes:
+def _hkdf_sha256(key_material: bytes, info: bytes = b'users-store', salt: bytes = None) -> bytes:
     if not HAS_CRYPTO:
         raise RuntimeError('cryptography not available for HKDF')
-    hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=None, info=info)
+    hkdf = HKDF(algorithm=hashes.SHA256(), length=32, salt=salt, info=info)
     return hkdf.derive(key_material)
 
 
@@ -90,16 +138,177 @@ def _aesgcm_decrypt(key: bytes, nonce: bytes, tag: bytes, ciphertext: bytes, aad
     if not HAS_CRYPTO:
         raise RuntimeError('cryptography not available for AES-GCM')
     aesgcm = AESGCM(key)
-    ct = ciphertext + tag
-    return aesgcm.decrypt(nonce, ct, aad)
+    # single copy: ciphertext || tag is the layout AESGCM expects
+    ct = bytearray(ciphertext)
+    ct += tag
+    return aesgcm.decrypt(nonce, bytes(ct), aad)
+
+
+class _Dek:
+    __slots__ = ('key', 'header', 'created', 'uses', 'pid')
+
+    def __init__(self, key: bytes, header: bytes):
+        self.key = key
+        self.header = header
+        self.created = time.monotonic()
+        self.uses = 0
+        self.pid = os.getpid()
+
+
+def _dek_kek(alg: str, ikm: bytes) -> bytes:
+    info = b'users-store-dek-wrap' if alg else b'users-store-dek-wrap-fallback'
+    return _hkdf_sha256(ikm, info=info)
+
+
+def _new_dek() -> _Dek:
+    """Generate a DEK and wrap it (one KEM encapsulation)."""
+    if pqc_envelope.has_pqc():
+        ct_kem, ss, alg = pqc_envelope.encapsulate_for_self()
+        kek = _dek_kek(alg, ss)
+    else:
+        ct_kem, alg = b'', ''
+        kek = _dek_kek('', _get_fallback_master_key())
+    alg_b = alg.encode('utf-8')
+    dek = secrets.token_bytes(32)
+    dek_id = secrets.token_bytes(8)
+    prefix = DEK_MAGIC + bytes([len(alg_b)]) + alg_b + struct.pack('>H', len(ct_kem)) + ct_kem + dek_id
+    wrap_nonce = secrets.token_bytes(12)
+    wrapped = AESGCM(kek).encrypt(wrap_nonce, dek, prefix)
+    header = prefix + wrap_nonce + bytes([len(wrapped)]) + wrapped
+    _remember_open_dek(header, dek)
+    _DEK_WRAPS.inc(kek='kem' if alg else 'master_key')
+    return _Dek(dek, header)
+
+
+class _DekManager:
+    """Hands out (DEK, nonce counter) pairs, rotating and prefetching as needed."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._cur: Optional[_Dek] = None
+        self._next: Optional[_Dek] = None
+        self._prefetching = False
+
+    def _exhausted(self, d: _Dek, frac: float = 1.0) -> bool:
+        return d.uses >= DEK_MAX_WRITES * frac or time.monotonic() - d.created >= DEK_MAX_AGE * frac
+
+    def acquire(self) -> Tuple[_Dek, int]:
+        pid = os.getpid()
+        with self._lock:
+            if self._cur is None or self._cur.pid != pid or self._exhausted(self._cur):
+                nxt, self._next = self._next, None
+                if nxt is None or nxt.pid != pid:
+                    nxt = _new_dek()
+                nxt.created = time.monotonic()
+                self._cur = nxt
+            d = self._cur
+            counter = d.uses
+            d.uses += 1
+            if self._next is None and not self._prefetching and self._exhausted(d, DEK_PREFETCH_AT):
+                self._prefetching = True
+                threading.Thread(target=self._prefetch, name='dek-prefetch', daemon=True).start()
+            return d, counter
+
+    def _prefetch(self) -> None:
+        try:
+            d = _new_dek()
+        except Exception:
+            d = None  # acquire() will wrap synchronously
+        with self._lock:
+            self._next = d
+            self._prefetching = False
+
+    def rotate(self) -> None:
+        """Retire the current (and any prefetched) DEK; the next save wraps a fresh one."""
+        with self._lock:
+            self._cur = None
+            self._next = None
+
+    def _after_fork(self) -> None:
+        # the child must not continue the parent's nonce sequence; the lock may
+        # have been held and the prefetch thread does not exist here
+        self._lock = threading.Lock()
+        self._cur = None
+        self._next = None
+        self._prefetching = False
+
+
+_DEKS = _DekManager()
+_OPEN_DEKS: 'OrderedDict[bytes, bytes]' = OrderedDict()
+_OPEN_DEKS_LOCK = threading.Lock()
+
+
+def _remember_open_dek(header: bytes, dek: bytes) -> None:
+    with _OPEN_DEKS_LOCK:
+        _OPEN_DEKS[header] = dek
+        _OPEN_DEKS.move_to_end(header)
+        while len(_OPEN_DEKS) > _OPEN_DEK_CACHE_SIZE:
+            _OPEN_DEKS.popitem(last=False)
+
+
+def _reset_after_fork() -> None:
+    global _OPEN_DEKS_LOCK
+    _OPEN_DEKS_LOCK = threading.Lock()
+    _DEKS._after_fork()
+
+
+if hasattr(os, 'register_at_fork'):
+    os.register_at_fork(after_in_child=_reset_after_fork)
+
+
+def rotate_dek() -> None:
+    """Force a new DEK (and KEM wrap) for the next save."""
+    _DEKS.rotate()
+
+
+def _seal_with_dek(plaintext: bytes) -> bytes:
+    d, counter = _DEKS.acquire()
+    nonce = counter.to_bytes(12, 'big')
+    ct = AESGCM(d.key).encrypt(nonce, plaintext, d.header)
+    return d.header + nonce + ct[-16:] + ct[:-16]
+
+
+def _open_with_dek(mv: memoryview) -> bytes:
+    p = 4
+    alg_len = mv[p]
+    p += 1
+    alg = str(mv[p:p+alg_len], 'utf-8')
+    p += alg_len
+    (ct_len,) = struct.unpack_from('>H', mv, p); p += 2
+    ct_kem = bytes(mv[p:p+ct_len]); p += ct_len
+    p += 8  # dek_id
+    prefix_end = p
+    wrap_nonce = bytes(mv[p:p+12]); p += 12
+    wrapped_len = mv[p]; p += 1
+    wrapped = bytes(mv[p:p+wrapped_len]); p += wrapped_len
+    header = bytes(mv[:p])
+    with _OPEN_DEKS_LOCK:
+        dek = _OPEN_DEKS.get(header)
+    _DEK_OPENS.inc(result='miss' if dek is None else 'hit')
+    if dek is None:
+        if alg:
+            if not pqc_envelope.has_pqc():
+                raise RuntimeError('PQC-protected users.enc present but liboqs is not available')
+            ss, _ = pqc_envelope.decapsulate(ct_kem)
+            kek = _dek_kek(alg, ss)
+        else:
+            kek = _dek_kek('', _get_fallback_master_key())
+        dek = AESGCM(kek).decrypt(wrap_nonce, wrapped, header[:prefix_end])
+        _remember_open_dek(header, dek)
+    nonce = bytes(mv[p:p+12]); p += 12
+    tag = mv[p:p+16]; p += 16
+    return _aesgcm_decrypt(dek, nonce, tag, mv[p:], aad=header)
 
 
 def save_users_secure(obj: Dict) -> None:
     _ensure_data_dir()
     if not HAS_CRYPTO:
         raise RuntimeError('cryptography not available')
-    plaintext = json.dumps(obj, indent=2).encode('utf-8')
-    if pqc_envelope.has_pqc():
+    t0 = time.perf_counter()
+    plaintext = encode_payload(obj)
+    if ENVELOPE_MODE == 'dek':
+        blob = _seal_with_dek(plaintext)
+    elif pqc_envelope.has_pqc():
         ct_kem, ss, alg = pqc_envelope.encapsulate_for_self()
         key = _hkdf_sha256(ss, info=b'users-store-pqc')
         nonce, tag, ciphertext = _aesgcm_encrypt(key, plaintext, aad=alg.encode('utf-8'))
@@ -111,14 +320,9 @@ def save_users_secure(obj: Dict) -> None:
         nonce, tag, ciphertext = _aesgcm_encrypt(key, plaintext, aad=b'fallback')
         header = MAGIC + b'\x00'  # alg_len=0 means fallback
         blob = header + bytes([len(nonce)]) + nonce + tag + ciphertext
-    flags = os.O_WRONLY | os.O_CREAT | os.O_TRUNC
-    fd = os.open(ENC_PATH, flags, 0o600)
-    with os.fdopen(fd, 'wb') as f:
-        f.write(blob)
-    try:
-        os.chmod(ENC_PATH, 0o600)
-    except Exception:
-        pass
+    # temp file + fsync + rename: concurrent readers never see a torn store
+    atomic_write(ENC_PATH, blob, mode=0o600)
+    _SAVE_SECONDS.observe(time.perf_counter() - t0, format=blob[:4].decode('ascii'))
 
 
 def load_users_secure() -> Dict:
@@ -128,23 +332,39 @@ def load_users_secure() -> Dict:
     if not HAS_CRYPTO:
         # Encrypted file present but we can't decrypt
         raise RuntimeError('Encrypted users.enc present but cryptography is not available')
+    t0 = time.perf_counter()
     with open(ENC_PATH, 'rb') as f:
         data = f.read()
+    users = _open_store(data)
+    fmt = data[:4] if data[:4] in (MAGIC, DEK_MAGIC) else b'none'
+    _LOAD_SECONDS.observe(time.perf_counter() - t0, format=fmt.decode('ascii'))
+    return users
+
+
+def _open_store(data: bytes) -> Dict:
+    if data.startswith(DEK_MAGIC):
+        plaintext = _open_with_dek(memoryview(data))
+        try:
+            return decode_users(plaintext)
+        except Exception:
+            return {"users": {}}
     if not data.startswith(MAGIC):
         # legacy or corrupt: ignore
         return {"users": {}}
+    # Parse header in place; only the AES-GCM input is materialized
+    mv = memoryview(data)
     p = 4
-    alg_len = data[p]
+    alg_len = mv[p]
     p += 1
     if alg_len > 0:
-        alg = data[p:p+alg_len].decode('utf-8')
+        alg = str(mv[p:p+alg_len], 'utf-8')
         p += alg_len
-        (ct_len,) = struct.unpack('>H', data[p:p+2]); p += 2
-        ct_kem = data[p:p+ct_len]; p += ct_len
-        nonce_len = data[p]; p += 1
-        nonce = data[p:p+nonce_len]; p += nonce_len
-        tag = data[p:p+16]; p += 16
-        ciphertext = data[p:]
+        (ct_len,) = struct.unpack_from('>H', mv, p); p += 2
+        ct_kem = bytes(mv[p:p+ct_len]); p += ct_len
+        nonce_len = mv[p]; p += 1
+        nonce = bytes(mv[p:p+nonce_len]); p += nonce_len
+        tag = mv[p:p+16]; p += 16
+        ciphertext = mv[p:]
         # derive key
         if not pqc_envelope.has_pqc():
             # library missing → cannot open PQC-protected store
@@ -153,14 +373,43 @@ def load_users_secure() -> Dict:
         key = _hkdf_sha256(ss, info=b'users-store-pqc')
         plaintext = _aesgcm_decrypt(key, nonce, tag, ciphertext, aad=alg.encode('utf-8'))
     else:
-        nonce_len = data[p]; p += 1
-        nonce = data[p:p+nonce_len]; p += nonce_len
-        tag = data[p:p+16]; p += 16
-        ciphertext = data[p:]
+        nonce_len = mv[p]; p += 1
+        nonce = bytes(mv[p:p+nonce_len]); p += nonce_len
+        tag = mv[p:p+16]; p += 16
+        ciphertext = mv[p:]
         mk = _get_fallback_master_key()
         key = _hkdf_sha256(mk, info=b'users-store-fallback')
         plaintext = _aesgcm_decrypt(key, nonce, tag, ciphertext, aad=b'fallback')
     try:
-        return json.loads(plaintext.decode('utf-8'))
+        return decode_users(plaintext)
     except Exception:
         return {"users": {}}
+
+
+def _spool_key() -> bytes:
+    # derived from the same root secret that protects users.enc, so the
+    # spool is readable by exactly the processes that can open the store
+    if pqc_envelope.has_pqc():
+        _pub, priv, _alg = pqc_envelope.ensure_keys()
+        return _hkdf_sha256(priv, info=b'users-spool-pqc')
+    return _hkdf_sha256(_get_fallback_master_key(), info=b'users-spool-fallback')
+
+
+def seal_spool(data: bytes) -> bytes:
+    """Encrypt a group-commit spool/result entry: magic | nonce (12) | AES-GCM(ct + tag)."""
+    if not HAS_CRYPTO:
+        raise RuntimeError('cryptography not available')
+    nonce = secrets.token_bytes(12)
+    return SPOOL_MAGIC + nonce + AESGCM(_spool_key()).encrypt(nonce, data, SPOOL_MAGIC)
+
+
+def open_spool(blob: bytes) -> bytes:
+    """Inverse of seal_spool. Raises ValueError for foreign or tampered entries."""
+    if not HAS_CRYPTO:
+        raise RuntimeError('cryptography not available')
+    if not blob.startswith(SPOOL_MAGIC) or len(blob) < 4 + 12 + 16:
+        raise ValueError('not a sealed spool entry')
+    try:
+        return AESGCM(_spool_key()).decrypt(blob[4:16], blob[16:], SPOOL_MAGIC)
+    except InvalidTag:
+        raise ValueError('spool entry failed authentication') from None
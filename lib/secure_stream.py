@@ -0,0 +1,330 @@
+"""
+Streaming (segmented) AEAD for large payloads, constant memory.
+
+Same key construction as lib.secure_store: KEM-encapsulate to the local
+static key (or use the fallback master key), HKDF-SHA256, AES-256-GCM.
+The payload is cut into fixed-size segments, each sealed on its own, so
+neither side ever holds more than one segment in memory.
+
+Format:
+  magic: b'PQS1' (4)
+  alg_len: 1 byte (0 means fallback master key, no KEM ciphertext)
+  alg_name: bytes
+  ct_len: 2 bytes big-endian
+  kem_ct: bytes
+  salt: 16 bytes (HKDF salt, fresh per stream)
+  nonce_prefix: 7 bytes
+  segment_size: 4 bytes big-endian (plaintext bytes per segment,
+                at most MAX_SEGMENT_SIZE)
+  segments: AES-GCM(ciphertext || tag), segment_size + 16 bytes each,
+            the last one may be shorter (down to just the 16-byte tag)
+
+Segment i is sealed with nonce = nonce_prefix || i (4 bytes BE) || last
+(1 byte, 1 on the final segment) and AAD = SHA-256(header). Reordering,
+dropping, truncating at a segment boundary or appending segments all fail
+authentication.
+"""
+from __future__ import annotations
+import io
+import os
+import struct
+import hashlib
+import secrets
+from collections import deque
+from concurrent.futures import Executor
+from typing import BinaryIO, Iterator, Optional, Tuple
+
+from . import pqc_envelope
+from .secure_store import AESGCM, HAS_CRYPTO, _get_fallback_master_key, _hkdf_sha256
+
+STREAM_MAGIC = b'PQS1'
+DEFAULT_SEGMENT_SIZE = 1 << 16
+# The opener reads this field before anything is authenticated, so a larger
+# value is rejected instead of trying to buffer up to 4 GiB per segment
+MAX_SEGMENT_SIZE = 64 << 20
+TAG_LEN = 16
+SALT_LEN = 16
+NONCE_PREFIX_LEN = 7
+MAX_SEGMENTS = 1 << 32
+COPY_CHUNK = 1 << 20
+# Segments in flight per stream when an executor is used
+DEFAULT_MAX_INFLIGHT = 8
+
+
+def _nonce(prefix: bytes, index: int, last: bool) -> bytes:
+    if index >= MAX_SEGMENTS:
+        raise OverflowError('stream too long for 32-bit segment counter')
+    return prefix + struct.pack('>I', index) + (b'\x01' if last else b'\x00')
+
+
+def _new_key_material() -> Tuple[str, bytes, bytes]:
+    """(alg, kem_ct, ikm) for a fresh stream; alg '' means fallback master key."""
+    if pqc_envelope.has_pqc():
+        ct_kem, ss, alg = pqc_envelope.encapsulate_for_self()
+        return alg, ct_kem, ss
+    return '', b'', _get_fallback_master_key()
+
+
+def _stream_key(alg: str, ikm: bytes, salt: bytes) -> bytes:
+    info = b'stream-seal-pqc' if alg else b'stream-seal-fallback'
+    return _hkdf_sha256(ikm, info=info, salt=salt)
+
+
+class StreamSealer:
+    """Writable file-like object that seals everything written into dst.
+
+    close() (or leaving the with-block normally) writes the final segment.
+    Leaving the with-block by exception calls abort() instead, so a partial
+    stream is never sealed as complete and fails to open.
+
+    With an executor, segments are encrypted in parallel (AES-GCM releases
+    the GIL) and written in order; at most max_inflight segments are held.
+    """
+
+    def __init__(self, dst: BinaryIO, segment_size: int = DEFAULT_SEGMENT_SIZE,
+                 executor: Optional[Executor] = None, max_inflight: int = DEFAULT_MAX_INFLIGHT):
+        if not HAS_CRYPTO:
+            raise RuntimeError('cryptography not available')
+        if not 0 < segment_size <= MAX_SEGMENT_SIZE:
+            raise ValueError(f'segment_size must be 1..{MAX_SEGMENT_SIZE}')
+        self._dst = dst
+        self._segment_size = segment_size
+        alg, ct_kem, ikm = _new_key_material()
+        salt = secrets.token_bytes(SALT_LEN)
+        self._prefix = secrets.token_bytes(NONCE_PREFIX_LEN)
+        alg_b = alg.encode('utf-8')
+        header = (STREAM_MAGIC + bytes([len(alg_b)]) + alg_b + struct.pack('>H', len(ct_kem)) + ct_kem
+                  + salt + self._prefix + struct.pack('>I', segment_size))
+        self._aad = hashlib.sha256(header).digest()
+        self._aead = AESGCM(_stream_key(alg, ikm, salt))
+        self._buf = bytearray()
+        self._index = 0
+        self._executor = executor
+        self._max_inflight = max(1, max_inflight)
+        self._inflight: deque = deque()
+        self.closed = False
+        dst.write(header)
+
+    def __enter__(self) -> 'StreamSealer':
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        if exc_type is None:
+            self.close()
+        else:
+            self.abort()
+
+    def writable(self) -> bool:
+        return True
+
+    def _emit(self, chunk, last: bool) -> None:
+        nonce = _nonce(self._prefix, self._index, last)
+        self._index += 1
+        if self._executor is None:
+            self._dst.write(self._aead.encrypt(nonce, bytes(chunk), self._aad))
+            return
+        self._inflight.append(self._executor.submit(self._aead.encrypt, nonce, bytes(chunk), self._aad))
+        while len(self._inflight) > self._max_inflight:
+            self._dst.write(self._inflight.popleft().result())
+
+    def write(self, data) -> int:
+        if self.closed:
+            raise ValueError('write to closed stream')
+        mv = memoryview(data).cast('B')
+        n = len(mv)
+        seg = self._segment_size
+        if self._buf:
+            take = min(seg - len(self._buf), len(mv))
+            self._buf += mv[:take]
+            mv = mv[take:]
+            # a full buffer is only known to be non-final once more data arrives
+            if len(self._buf) == seg and mv:
+                self._emit(self._buf, False)
+                self._buf.clear()
+        if not self._buf:
+            while len(mv) > seg:
+                self._emit(mv[:seg], False)
+                mv = mv[seg:]
+            self._buf += mv
+        return n
+
+    def close(self) -> None:
+        if not self.closed:
+            self.closed = True
+            self._emit(self._buf, True)
+            self._buf.clear()
+            while self._inflight:
+                self._dst.write(self._inflight.popleft().result())
+
+    def abort(self) -> None:
+        """Stop without writing the final segment."""
+        self.closed = True
+        self._buf.clear()
+        while self._inflight:
+            self._inflight.popleft().cancel()
+
+
+class StreamOpener(io.RawIOBase):
+    """Readable file-like object yielding the plaintext of a PQS1 stream from src."""
+
+    def __init__(self, src: BinaryIO):
+        super().__init__()
+        if not HAS_CRYPTO:
+            raise RuntimeError('cryptography not available')
+        self._src = src
+        head = _read_exact(src, 5)
+        if head[:4] != STREAM_MAGIC:
+            raise ValueError('Not a PQS1 stream')
+        alg_b = _read_exact(src, head[4])
+        (ct_len,) = struct.unpack('>H', _read_exact(src, 2))
+        ct_kem = _read_exact(src, ct_len)
+        tail = _read_exact(src, SALT_LEN + NONCE_PREFIX_LEN + 4)
+        salt = tail[:SALT_LEN]
+        self._prefix = tail[SALT_LEN:SALT_LEN + NONCE_PREFIX_LEN]
+        (self._segment_size,) = struct.unpack_from('>I', tail, SALT_LEN + NONCE_PREFIX_LEN)
+        if not 0 < self._segment_size <= MAX_SEGMENT_SIZE:
+            raise ValueError(f'Invalid stream header: segment_size {self._segment_size}')
+        alg = alg_b.decode('utf-8')
+        if alg:
+            if not pqc_envelope.has_pqc():
+                raise RuntimeError('PQC-sealed stream but liboqs is not available')
+            ikm, _ = pqc_envelope.decapsulate(ct_kem)
+        else:
+            ikm = _get_fallback_master_key()
+        header = head + alg_b + struct.pack('>H', ct_len) + ct_kem + tail
+        self._aad = hashlib.sha256(header).digest()
+        self._aead = AESGCM(_stream_key(alg, ikm, salt))
+        self._index = 0
+        self._pending: Optional[bytes] = None  # one sealed segment of look-ahead
+        self._done = False
+        self._plain = b''
+        self._pos = 0
+
+    @property
+    def segment_size(self) -> int:
+        """Plaintext bytes per segment, as recorded in the header."""
+        return self._segment_size
+
+    def readable(self) -> bool:
+        return True
+
+    def _next_sealed(self) -> Optional[Tuple[bytes, bytes]]:
+        """(nonce, sealed segment) for the next segment, or None at the end."""
+        if self._done:
+            return None
+        size = self._segment_size + TAG_LEN
+        cur = self._pending if self._pending is not None else _read_upto(self._src, size)
+        if len(cur) < TAG_LEN:
+            raise ValueError('Truncated stream')
+        nxt = _read_upto(self._src, size) if len(cur) == size else b''
+        last = not nxt
+        nonce = _nonce(self._prefix, self._index, last)
+        self._index += 1
+        self._pending = nxt
+        self._done = last
+        return nonce, cur
+
+    def _next_segment(self) -> Optional[bytes]:
+        item = self._next_sealed()
+        if item is None:
+            return None
+        return self._aead.decrypt(item[0], item[1], self._aad)
+
+    def segments(self, executor: Optional[Executor] = None,
+                 max_inflight: int = DEFAULT_MAX_INFLIGHT) -> Iterator[bytes]:
+        """Yield authenticated plaintext segment by segment.
+
+        With an executor, up to max_inflight segments are decrypted in
+        parallel; output order is unchanged.
+        """
+        if self._pos < len(self._plain):
+            yield self._plain[self._pos:]
+            self._plain, self._pos = b'', 0
+        if executor is None:
+            while True:
+                seg = self._next_segment()
+                if seg is None:
+                    return
+                yield seg
+        inflight: deque = deque()
+        try:
+            while True:
+                item = self._next_sealed()
+                if item is None:
+                    break
+                inflight.append(executor.submit(self._aead.decrypt, item[0], item[1], self._aad))
+                if len(inflight) >= max(1, max_inflight):
+                    yield inflight.popleft().result()
+            while inflight:
+                yield inflight.popleft().result()
+        finally:
+            for fut in inflight:
+                fut.cancel()
+
+    def readinto(self, b) -> int:
+        while self._pos >= len(self._plain):
+            seg = self._next_segment()
+            if seg is None:
+                return 0
+            self._plain, self._pos = seg, 0
+        n = min(len(b), len(self._plain) - self._pos)
+        b[:n] = self._plain[self._pos:self._pos + n]
+        self._pos += n
+        return n
+
+
+def _read_upto(f: BinaryIO, n: int) -> bytes:
+    # tolerate short reads from pipes/sockets; short result only at EOF
+    data = f.read(n)
+    if data is None:
+        data = b''
+    while len(data) < n:
+        more = f.read(n - len(data))
+        if not more:
+            break
+        data += more
+    return data
+
+
+def _read_exact(f: BinaryIO, n: int) -> bytes:
+    data = _read_upto(f, n)
+    if len(data) != n:
+        raise ValueError('Truncated stream header')
+    return data
+
+
+def seal_file(src_path: str, dst_path: str, segment_size: int = DEFAULT_SEGMENT_SIZE) -> int:
+    """Seal src_path into dst_path in constant memory. Returns plaintext bytes."""
+    total = 0
+    fd = os.open(dst_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    with open(src_path, 'rb') as fin, os.fdopen(fd, 'wb') as fout:
+        with StreamSealer(fout, segment_size=segment_size) as w:
+            while True:
+                chunk = fin.read(COPY_CHUNK)
+                if not chunk:
+                    break
+                w.write(chunk)
+                total += len(chunk)
+    return total
+
+
+def open_file(src_path: str, dst_path: str) -> int:
+    """Open (decrypt) src_path into dst_path in constant memory. Returns plaintext bytes.
+
+    On authentication failure dst_path is removed so no unauthenticated
+    plaintext is left behind.
+    """
+    total = 0
+    fd = os.open(dst_path, os.O_WRONLY | os.O_CREAT | os.O_TRUNC, 0o600)
+    try:
+        with open(src_path, 'rb') as fin, os.fdopen(fd, 'wb') as fout:
+            for seg in StreamOpener(fin).segments():
+                fout.write(seg)
+                total += len(seg)
+    except Exception:
+        try:
+            os.unlink(dst_path)
+        except OSError:
+            pass
+        raise
+    return total
@@ -0,0 +1,245 @@
+"""
+Crash- and multi-process-safe file writes for the local stores.
+
+- file_lock(path): advisory exclusive lock on a sidecar lock file
+  (fcntl.flock on POSIX, msvcrt.locking on Windows, no-op elsewhere).
+- atomic_write(path, data): write to a temp file in the same directory,
+  fsync, os.replace over the target, fsync the directory. Readers see
+  either the old or the new file, never a torn one.
+- group_commit(...): writers spool their change as a small JSON file and
+  then take the lock. Whoever holds the lock drains *all* spooled changes,
+  loads the store once, applies them in order, saves once (one encryption
+  pass) and leaves a result file per change. Writers that queued behind
+  the leader find their result already there and return without touching
+  the store. Under many concurrent processes the number of store rewrites
+  grows much slower than the number of changes. Spool and result entries
+  pass through the caller's seal/unseal (e.g. AES-GCM) so secrets in a
+  change never reach the disk in the clear. The leader also sweeps
+  entries left behind by crashed writers.
+"""
+from __future__ import annotations
+import os
+import json
+import time
+import secrets
+import tempfile
+from contextlib import contextmanager
+from typing import Any, Callable, Dict, Iterator, Optional
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # Windows
+    fcntl = None  # type: ignore
+try:
+    import msvcrt  # type: ignore
+except ImportError:
+    msvcrt = None  # type: ignore
+
+SPOOL_SUFFIX = '.op'
+RESULT_SUFFIX = '.res'
+# results nobody collected and temp files older than this are removed
+STALE_SECONDS = 300.0
+
+Codec = Optional[Callable[[bytes], bytes]]
+
+
+@contextmanager
+def file_lock(lock_path: str) -> Iterator[None]:
+    """Hold an exclusive advisory lock on lock_path for the duration of the block."""
+    os.makedirs(os.path.dirname(lock_path) or '.', exist_ok=True)
+    fd = os.open(lock_path, os.O_RDWR | os.O_CREAT, 0o600)
+    try:
+        if fcntl is not None:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+        elif msvcrt is not None:
+            while True:
+                try:
+                    msvcrt.locking(fd, msvcrt.LK_LOCK, 1)
+                    break
+                except OSError:
+                    time.sleep(0.01)
+        yield
+    finally:
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+            elif msvcrt is not None:
+                os.lseek(fd, 0, os.SEEK_SET)
+                msvcrt.locking(fd, msvcrt.LK_UNLCK, 1)
+        finally:
+            os.close(fd)
+
+
+def _fsync_dir(dirpath: str) -> None:
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    try:
+        fd = os.open(dirpath, os.O_RDONLY | os.O_DIRECTORY)
+    except OSError:
+        return
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_write(path: str, data: bytes, mode: int = 0o600, sync: bool = True) -> None:
+    """Replace path with data atomically (temp file + fsync + rename).
+
+    sync=False skips the fsyncs; the rename is still atomic but the new
+    content may not survive a power loss (fine for spool/result files).
+    """
+    dirpath = os.path.dirname(path) or '.'
+    os.makedirs(dirpath, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix='.' + os.path.basename(path) + '.', suffix='.tmp', dir=dirpath)
+    try:
+        try:
+            os.fchmod(fd, mode)
+        except (AttributeError, OSError):
+            pass
+        with os.fdopen(fd, 'wb') as f:
+            f.write(data)
+            if sync:
+                f.flush()
+                os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    if sync:
+        _fsync_dir(dirpath)
+
+
+def _spool(spool_dir: str, op: Dict[str, Any], seal: Codec) -> str:
+    os.makedirs(spool_dir, exist_ok=True)
+    # time-ordered ids so the leader applies changes in arrival order
+    op_id = '%020d-%d-%s' % (time.time_ns(), os.getpid(), secrets.token_hex(4))
+    _write_entry(os.path.join(spool_dir, op_id + SPOOL_SUFFIX), op, seal)
+    return op_id
+
+
+def _write_entry(path: str, obj: Any, seal: Codec) -> None:
+    data = json.dumps(obj).encode('utf-8')
+    atomic_write(path, seal(data) if seal else data, sync=False)
+
+
+def _read_entry(path: str, unseal: Codec) -> Any:
+    with open(path, 'rb') as f:
+        data = f.read()
+    return json.loads((unseal(data) if unseal else data).decode('utf-8'))
+
+
+def _take_result(spool_dir: str, op_id: str, unseal: Codec) -> Any:
+    res_path = os.path.join(spool_dir, op_id + RESULT_SUFFIX)
+    try:
+        res = _read_entry(res_path, unseal)
+    finally:
+        os.unlink(res_path)
+    if 'error' in res:
+        raise RuntimeError(res['error'])
+    return res.get('result')
+
+
+def _writer_gone(name: str) -> bool:
+    try:
+        pid = int(name.split('-')[1])
+    except (IndexError, ValueError):
+        return True  # not one of ours
+    if pid == os.getpid():
+        return False
+    if os.name != 'posix':
+        return False  # no signal-0 probe; age alone decides
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return True
+    except OSError:
+        pass  # exists, owned by someone else
+    return False
+
+
+def _sweep(spool_dir: str) -> None:
+    """Remove leftovers of crashed writers (call with the lock held).
+
+    - .op of a dead writer: it never got an answer, so it is not applied
+      behind its back by a later leader.
+    - .res of a dead writer, or older than STALE_SECONDS.
+    - atomic_write temp files older than STALE_SECONDS.
+    """
+    now = time.time()
+    for name in os.listdir(spool_dir):
+        path = os.path.join(spool_dir, name)
+        if name.endswith(SPOOL_SUFFIX):
+            stale = _writer_gone(name)
+        elif name.endswith(RESULT_SUFFIX) or name.endswith('.tmp'):
+            try:
+                stale = now - os.stat(path).st_mtime > STALE_SECONDS or \
+                    (name.endswith(RESULT_SUFFIX) and _writer_gone(name))
+            except OSError:
+                continue
+        else:
+            continue
+        if stale:
+            try:
+                os.unlink(path)
+            except OSError:
+                pass
+
+
+def group_commit(
+    spool_dir: str,
+    lock_path: str,
+    op: Dict[str, Any],
+    load: Callable[[], Dict],
+    apply: Callable[[Dict, Dict[str, Any]], Any],
+    save: Callable[[Dict], None],
+    seal: Codec = None,
+    unseal: Codec = None,
+) -> Any:
+    """Queue op and make sure it is durably applied. Returns apply()'s result for op.
+
+    op and the value returned by apply() must be JSON-serializable; apply()
+    may raise ValueError to reject a single change without failing the batch.
+    seal/unseal transform the bytes of every spool and result entry (pass
+    both when op carries secrets); unseal raises ValueError for an entry it
+    cannot open, which rejects that change only.
+    """
+    op_id = _spool(spool_dir, op, seal)
+    with file_lock(lock_path):
+        if os.path.exists(os.path.join(spool_dir, op_id + RESULT_SUFFIX)):
+            # an earlier leader already applied our change
+            return _take_result(spool_dir, op_id, unseal)
+        _sweep(spool_dir)
+        pending = sorted(n for n in os.listdir(spool_dir) if n.endswith(SPOOL_SUFFIX))
+        state = load()
+        results: Dict[str, Dict[str, Any]] = {}
+        for name in pending:
+            pid = name[:-len(SPOOL_SUFFIX)]
+            try:
+                pop = _read_entry(os.path.join(spool_dir, name), unseal)
+                results[pid] = {'result': apply(state, pop)}
+            except (ValueError, KeyError) as e:
+                results[pid] = {'error': str(e) or type(e).__name__}
+        try:
+            save(state)
+        except BaseException:
+            # our change was not applied; withdraw it so a later leader
+            # does not apply it behind the caller's back
+            try:
+                os.unlink(os.path.join(spool_dir, op_id + SPOOL_SUFFIX))
+            except OSError:
+                pass
+            raise
+        # store is durable; now publish results and retire the spooled changes
+        for pid, res in results.items():
+            _write_entry(os.path.join(spool_dir, pid + RESULT_SUFFIX), res, seal)
+            try:
+                os.unlink(os.path.join(spool_dir, pid + SPOOL_SUFFIX))
+            except OSError:
+                pass
+        return _take_result(spool_dir, op_id, unseal)
@@ -0,0 +1,166 @@
+"""
+Compact binary codec for the users dict (plaintext of users.enc).
+
+Format (version 1), column-oriented so decoding is a handful of bulk
+slices instead of a per-field loop:
+  magic: b'UREC' (4)
+  version: 1 byte
+  count: varint
+  salt_len: 1 byte (16 by default)
+  hash_len: 1 byte (32 by default)
+  name_lens: count x uint16 little-endian (length prefixes of the names)
+  names: UTF-8 bytes, concatenated
+  rounds: run-length pairs (run: varint, rounds: varint) covering count records
+  salts: count x salt_len raw bytes
+  hashes: count x hash_len raw bytes
+
+Varints are unsigned LEB128. The in-memory shape stays the same as the
+JSON store ({'users': {name: {'salt': hex, 'rounds': int, 'hash': hex}}}),
+so callers do not care which codec produced it. Dicts carrying anything
+the codec cannot represent (extra keys, non-hex values) are encoded as
+compact JSON instead; decode_users() accepts both, including the indented
+JSON written by older versions.
+"""
+from __future__ import annotations
+import json
+import struct
+import binascii
+from itertools import accumulate
+from typing import Dict, Optional, Tuple
+
+CODEC_MAGIC = b'UREC'
+CODEC_VERSION = 1
+_RECORD_KEYS = {'salt', 'rounds', 'hash'}
+
+
+def _put_varint(out: bytearray, n: int) -> None:
+    if n < 0:
+        raise ValueError('varint must be non-negative')
+    while n >= 0x80:
+        out.append((n & 0x7F) | 0x80)
+        n >>= 7
+    out.append(n)
+
+
+def _get_varint(mv: memoryview, p: int) -> Tuple[int, int]:
+    n = 0
+    shift = 0
+    while True:
+        b = mv[p]
+        p += 1
+        n |= (b & 0x7F) << shift
+        if b < 0x80:
+            return n, p
+        shift += 7
+        if shift > 63:
+            raise ValueError('varint too long')
+
+
+def encode_users(obj: Dict) -> Optional[bytes]:
+    """Binary-encode obj; None if it holds data the record format cannot carry."""
+    if set(obj.keys()) - {'users'}:
+        return None
+    users = obj.get('users', {})
+    names = []
+    rounds = []
+    salts = bytearray()
+    hashes = bytearray()
+    salt_len = hash_len = None
+    try:
+        for name, rec in users.items():
+            if set(rec.keys()) != _RECORD_KEYS:
+                return None
+            salt = binascii.unhexlify(rec['salt'])
+            dk = binascii.unhexlify(rec['hash'])
+            if salt_len is None:
+                salt_len, hash_len = len(salt), len(dk)
+            if len(salt) != salt_len or len(dk) != hash_len or salt_len > 255 or hash_len > 255:
+                return None
+            raw_name = name.encode('utf-8')
+            if len(raw_name) > 0xFFFF:
+                return None
+            names.append(raw_name)
+            rounds.append(int(rec['rounds']))
+            salts += salt
+            hashes += dk
+        out = bytearray(CODEC_MAGIC)
+        out.append(CODEC_VERSION)
+        _put_varint(out, len(names))
+        out.append(salt_len or 0)
+        out.append(hash_len or 0)
+        out += struct.pack('<%dH' % len(names), *map(len, names))
+        out += b''.join(names)
+        i = 0
+        while i < len(rounds):
+            j = i
+            while j < len(rounds) and rounds[j] == rounds[i]:
+                j += 1
+            _put_varint(out, j - i)
+            _put_varint(out, rounds[i])
+            i = j
+    except (binascii.Error, TypeError, ValueError, AttributeError):
+        return None
+    out += salts
+    out += hashes
+    return bytes(out)
+
+
+def encode_payload(obj: Dict) -> bytes:
+    """Plaintext for users.enc: binary records if possible, else compact JSON."""
+    enc = encode_users(obj)
+    if enc is not None:
+        return enc
+    return json.dumps(obj, separators=(',', ':')).encode('utf-8')
+
+
+def _hex_split(mv: memoryview, width: int, count: int) -> list:
+    # hex() with a separator every `width` bytes, then one C-level split
+    if count == 0:
+        return []
+    if width == 0:
+        return [''] * count
+    return mv.hex(' ', width).split(' ')
+
+
+def decode_users(buf) -> Dict:
+    """Decode a users.enc plaintext (binary record codec or legacy JSON)."""
+    mv = memoryview(buf)
+    if mv[:4] != CODEC_MAGIC:
+        return json.loads(bytes(mv).decode('utf-8'))
+    version = mv[4]
+    if version != CODEC_VERSION:
+        raise ValueError(f'Unsupported user codec version: {version}')
+    count, p = _get_varint(mv, 5)
+    salt_len = mv[p]
+    hash_len = mv[p + 1]
+    p += 2
+    lens = struct.unpack_from('<%dH' % count, mv, p)
+    p += 2 * count
+    ends = list(accumulate(lens))
+    total = ends[-1] if ends else 0
+    starts = [0] + ends[:-1]
+    blob = bytes(mv[p:p+total])
+    p += total
+    if blob.isascii():
+        # byte offsets equal character offsets: decode once, slice the str
+        text = blob.decode('ascii')
+        names = [text[a:b] for a, b in zip(starts, ends)]
+    else:
+        names = [blob[a:b].decode('utf-8') for a, b in zip(starts, ends)]
+    rounds: list = []
+    while len(rounds) < count:
+        run, p = _get_varint(mv, p)
+        value, p = _get_varint(mv, p)
+        rounds += [value] * run
+    if len(rounds) != count:
+        raise ValueError('Corrupt rounds runs')
+    salts = _hex_split(mv[p:p + count * salt_len], salt_len, count)
+    p += count * salt_len
+    hashes = _hex_split(mv[p:p + count * hash_len], hash_len, count)
+    p += count * hash_len
+    if p != len(mv):
+        raise ValueError('Truncated or trailing data in user records')
+    return {'users': {
+        n: {'salt': s, 'rounds': r, 'hash': h}
+        for n, s, r, h in zip(names, salts, rounds, hashes)
+    }}
@@ -5,14 +5,46 @@ GUI 및 CLI 모두에서 `from qkdn_sim import default_topology, baseline_route,
 여기서 필요한 심볼을 재노출합니다.
 """
 
-from .model import default_topology  # noqa: F401
+__version__ = "0.4.0"
+
+from .model import QKDNetwork, default_topology, random_topology, resolve_node  # noqa: F401
 from .routing import baseline_route, crosslayer_route, rl_route  # noqa: F401
 from .plotting import plot_network_path  # noqa: F401
+from .physics import LinkParams, secret_key_rate  # noqa: F401
+from .allocation import Allocation, allocate, random_demands  # noqa: F401
+from .graph_arrays import ArrayGraph  # noqa: F401
+from .partition import PartitionedSimulation, partition_network  # noqa: F401
+from .contraction import ContractionHierarchy  # noqa: F401
+from .pareto import ParetoPath, pareto_routes  # noqa: F401
+from .astar import GeometricAStar, astar_route  # noqa: F401
+from . import profiling  # noqa: F401
+from . import checkpoint  # noqa: F401
+from .result_cache import ResultCache, scenario_key  # noqa: F401
 
 __all__ = [
+    "QKDNetwork",
     "default_topology",
+    "random_topology",
+    "resolve_node",
     "baseline_route",
     "crosslayer_route",
     "rl_route",
     "plot_network_path",
+    "LinkParams",
+    "secret_key_rate",
+    "Allocation",
+    "allocate",
+    "random_demands",
+    "ArrayGraph",
+    "PartitionedSimulation",
+    "partition_network",
+    "ContractionHierarchy",
+    "ParetoPath",
+    "pareto_routes",
+    "GeometricAStar",
+    "astar_route",
+    "profiling",
+    "checkpoint",
+    "ResultCache",
+    "scenario_key",
 ]
\ No newline at end of file
@@ -0,0 +1,440 @@
+"""키 생성률 제약 다중 상품(multi-commodity) 흐름 할당.
+
+demands: 요청 키 생성률 행렬 (src, dst) → rate. 간선 용량(capacity)은 링크별 비밀키 생성률
+(기본: QKDNetwork.key_rate(), step당 비트)이며 무방향 링크의 양방향 사용량 합이 용량을 넘지 않는다.
+
+목적 함수 (LP): 최소화  Σ_e c_e·f_e + penalty·(미충족 요청량 합)
+  용량 f_e ≤ cap_e, 요청별 흐름 보존. penalty(기본: 10·(노드 수-1)·max c_e)가 어떤 경로 비용보다
+  크므로 충족량을 먼저 늘리고 같은 충족량 안에서 비용을 줄인다.
+
+method="projection" (기본): 용량 로그 장벽을 더한 목적의 경로 기반 기울기 사영(Bertsekas-Gafni,
+Frank-Wolfe와 같은 최단 경로 오라클 방식).
+ 1) 탐욕 채우기(아래 greedy)를 1%만 줄여 용량 안쪽의 시작점으로 쓴다.
+ 2) 반복마다 간선 길이 l_e = c_e + μ/(cap_e - f_e) (장벽 목적의 기울기)로 출발지별 Dijkstra 1회.
+ 3) 요청마다 더 긴 경로(미충족 = 길이 penalty인 가상 경로)의 흐름을 최단 경로로 옮긴다. 이동량은
+    길이 차 / 2차 미분(뉴턴 단계)이고 새로 쓰는 간선의 남은 용량의 _FRAC 이내라 f < cap이 유지된다.
+ 4) obj - LB = (μ에서의 Frank-Wolfe 간격) + μ·(간선 수)이므로 앞 항이 뒤 항 이하가 되면 μ를 절반으로.
+ 5) 끝나면 장벽이 남긴 여유 용량에 미충족분을 탐욕적으로 다시 채운다 (목적값은 줄기만 한다).
+하한과 간격: y_e ≥ 0을 용량 제약의 라그랑주 승수로 두면
+  LB(y) = Σ_k d_k·min(penalty, dist_{c+y}(s_k, t_k)) - Σ_e y_e·cap_e
+는 LP 최적값의 하한(약쌍대성)이다. 2)의 Dijkstra가 y_e = μ/(cap_e - f_e)에서 이를 그대로 계산하고,
+마지막에 Polyak 부분기울기 단계(_DUAL_STEPS회)로 더 조인다. 결과의 lower_bound/gap이 남은 최적성
+간격의 보증값이며(실제 간격은 보통 이보다 작다), 상대 간격이 tol 이하가 되거나 max_iter에 이르면 멈춘다.
+
+method="greedy": 출발지별 묶음 탐욕적 최단 경로 채우기 (역방향 잔여 간선 없음, 빠르지만 최적 보장 없음).
+라운드마다 잔여 용량 > 0 인 간선으로 출발지별 Dijkstra 1회, 요청을 비용 오름차순으로 병목 용량만큼
+흘리고 포화 간선을 뺀다. lower_bound는 용량을 무시한 y = 0 하한이다.
+
+두 방법 모두 출발지 수 × 반복 수 만큼만 Dijkstra를 돌리므로 수천 개 요청도 다룰 수 있고, 결과는
+항상 용량을 만족한다.
+"""
+from __future__ import annotations
+import math
+from collections import defaultdict
+from dataclasses import dataclass, field
+from typing import Any, Dict, Hashable, Iterable, List, Mapping, Optional, Tuple, Union
+import networkx as nx
+import numpy as np
+
+from . import profiling
+from .graph_arrays import ArrayGraph
+from .model import resolve_node
+
+EPS = 1e-9
+_FRAC = 0.9          # 한 번의 이동이 쓰는 잔여 용량 비율 상한 (장벽 안쪽 유지)
+_DUAL_STEPS = 20     # 마지막 하한 조이기 단계 수
+
+Demands = Union[Mapping[Tuple[Hashable, Hashable], float], Iterable[Tuple[Hashable, Hashable, float]], np.ndarray]
+
+
+@dataclass
+class Allocation:
+    """할당 결과. 배열은 demands 순서(요청) 또는 edge id 순서(간선)."""
+    demands: List[Tuple[Hashable, Hashable, float]]
+    allocated: np.ndarray
+    flows: List[Dict[Tuple[Hashable, ...], float]]
+    edge_load: np.ndarray
+    capacity: np.ndarray
+    cost: float
+    rounds: int
+    dijkstra_runs: int
+    edges: List[Tuple[Hashable, Hashable]] = field(default_factory=list)
+    method: str = "greedy"
+    objective: float = 0.0          # cost + unmet_penalty · 미충족 합
+    lower_bound: float = float("-inf")  # LP 최적 목적값의 하한
+    unmet_penalty: float = 0.0
+
+    @property
+    def gap(self) -> float:
+        """남은 최적성 간격 (objective - lower_bound) / objective. 0이면 최적이 증명된 것."""
+        if not math.isfinite(self.lower_bound):
+            return float("inf")
+        return max(0.0, self.objective - self.lower_bound) / max(abs(self.objective), EPS)
+
+    @property
+    def requested(self) -> np.ndarray:
+        return np.array([r for _, _, r in self.demands], dtype=np.float64)
+
+    @property
+    def unsatisfied(self) -> np.ndarray:
+        return np.maximum(self.requested - self.allocated, 0.0)
+
+    @property
+    def utilization(self) -> np.ndarray:
+        with np.errstate(divide="ignore", invalid="ignore"):
+            return np.where(self.capacity > 0, self.edge_load / self.capacity, 0.0)
+
+    def per_demand(self) -> List[Dict[str, Any]]:
+        return [
+            {"src": s, "dst": d, "requested": r, "allocated": float(a), "unsatisfied": float(max(r - a, 0.0)),
+             "paths": [{"path": list(p), "rate": f} for p, f in flow.items()]}
+            for (s, d, r), a, flow in zip(self.demands, self.allocated, self.flows)
+        ]
+
+    def summary(self) -> Dict[str, Any]:
+        req = float(self.requested.sum())
+        got = float(self.allocated.sum())
+        return {
+            "demands": len(self.demands),
+            "requested": req,
+            "allocated": got,
+            "satisfied_ratio": got / req if req > 0 else 1.0,
+            "fully_satisfied": int(np.sum(self.unsatisfied <= EPS * np.maximum(1.0, self.requested))),
+            "saturated_links": int(np.sum(self.edge_load >= self.capacity - EPS)),
+            "max_utilization": float(self.utilization.max()) if len(self.capacity) else 0.0,
+            "cost": self.cost,
+            "method": self.method,
+            "objective": self.objective,
+            "lower_bound": self.lower_bound,
+            "gap": self.gap,
+            "rounds": self.rounds,
+            "dijkstra_runs": self.dijkstra_runs,
+        }
+
+
+def _normalize_demands(G: nx.Graph, demands: Demands, ag: ArrayGraph) -> List[Tuple[Hashable, Hashable, float]]:
+    if isinstance(demands, np.ndarray):
+        if demands.shape != (ag.n_nodes, ag.n_nodes):
+            raise ValueError(f"demand matrix must be {ag.n_nodes}x{ag.n_nodes} in G.nodes order")
+        ii, jj = np.nonzero(demands > 0)
+        return [(ag.nodes[i], ag.nodes[j], float(demands[i, j])) for i, j in zip(ii.tolist(), jj.tolist()) if i != j]
+    items = demands.items() if isinstance(demands, Mapping) else ((k[:2], k[2]) for k in demands)
+    out = []
+    for (s, d), rate in items:
+        rate = float(rate)
+        if rate < 0:
+            raise ValueError(f"negative demand for {(s, d)}")
+        out.append((resolve_node(G, s), resolve_node(G, d), rate))
+    return out
+
+
+def _edge_cost(G: nx.Graph, ag: ArrayGraph, cost: Union[str, np.ndarray]) -> np.ndarray:
+    if isinstance(cost, str):
+        return ag.edge_array(G, cost, 1.0)
+    arr = np.asarray(cost, dtype=np.float64)
+    if arr.shape != (ag.n_edges,):
+        raise ValueError("cost array must be in edge id order")
+    return arr
+
+
+def _greedy_fill(ag: ArrayGraph, reqs: List[Tuple[Hashable, Hashable, float]], weight: List[float],
+                 residual: List[float], remaining: List[float], flows: List[Dict[Tuple[int, ...], float]],
+                 max_rounds: Optional[int] = None) -> Tuple[int, int]:
+    """잔여 용량 안에서 remaining을 싼 경로부터 채운다 (residual/remaining/flows 제자리 갱신). (라운드, Dijkstra 수)"""
+    by_src: Dict[int, List[int]] = defaultdict(list)
+    for k, (s, d, _) in enumerate(reqs):
+        if remaining[k] > EPS and s != d:
+            by_src[ag.index[s]].append(k)
+    blocked = [False] * len(reqs)
+    rounds = runs = 0
+    limit = max_rounds if max_rounds is not None else ag.n_edges + 2  # 라운드마다 간선 ≥1개 포화 또는 종료
+    while by_src and rounds < limit:
+        rounds += 1
+        progress = False
+        usable = [c > EPS for c in residual]
+        for s, ks in list(by_src.items()):
+            ks = [k for k in ks if remaining[k] > EPS and not blocked[k]]
+            if not ks:
+                del by_src[s]
+                continue
+            by_src[s] = ks
+            dist, pred = ag.dijkstra(s, weight, usable)
+            runs += 1
+            for k in sorted(ks, key=lambda k: dist[ag.index[reqs[k][1]]]):
+                t = ag.index[reqs[k][1]]
+                if dist[t] == float("inf"):
+                    blocked[k] = True  # 잔여 그래프에서 도달 불가 → 이후 라운드에서도 불가
+                    continue
+                path = ag.path_edges(pred, s, t)
+                bottleneck = min(residual[e] for e in path)
+                if bottleneck <= EPS:
+                    continue  # 같은 라운드의 앞선 요청이 포화시킴 → 다음 라운드에서 재탐색
+                push = min(remaining[k], bottleneck)
+                for e in path:
+                    residual[e] -= push
+                    if residual[e] <= EPS:
+                        usable[e] = False
+                remaining[k] -= push
+                flows[k][tuple(path)] += push
+                progress = True
+        if not progress:
+            break
+    return rounds, runs
+
+
+def _lower_bound(ag: ArrayGraph, reqs, by_src: Dict[int, List[int]], length: List[float], usable: List[bool],
+                 penalty: float, y_cap: float, aon: Optional[Dict[int, Optional[Tuple[int, ...]]]] = None) -> float:
+    """라그랑주 하한 Σ d_k·min(penalty, dist) - y·cap. aon이 주어지면 요청별 최단 경로(또는 None)를 채운다."""
+    lb = -y_cap
+    for s, ks in by_src.items():
+        dist, pred = ag.dijkstra(s, length, usable)
+        for k in ks:
+            t = ag.index[reqs[k][1]]
+            r = reqs[k][2]
+            if dist[t] < penalty:
+                lb += r * dist[t]
+                if aon is not None:
+                    aon[k] = tuple(ag.path_edges(pred, s, t))
+            else:
+                lb += r * penalty
+                if aon is not None:
+                    aon[k] = None
+    return lb
+
+
+def _demands_by_source(ag: ArrayGraph, reqs) -> Dict[int, List[int]]:
+    by_src: Dict[int, List[int]] = defaultdict(list)
+    for k, (s, d, r) in enumerate(reqs):
+        if r > EPS and s != d:
+            by_src[ag.index[s]].append(k)
+    return by_src
+
+
+def _projection(ag: ArrayGraph, reqs, w: np.ndarray, cap: np.ndarray, flows: List[Dict[Tuple[int, ...], float]],
+                unmet: List[float], penalty: float, max_iter: int, tol: float) -> Tuple[float, np.ndarray, int, int]:
+    """장벽 목적의 경로 기반 기울기 사영 (flows/unmet 제자리 갱신). (최고 하한, 마지막 승수 y, 반복 수, Dijkstra 수)"""
+    m = ag.n_edges
+    usable = [c > EPS for c in cap.tolist()]
+    n_us = max(1, sum(usable))
+    by_src = _demands_by_source(ag, reqs)
+    rate = [r for _, _, r in reqs]
+    wl, cl = w.tolist(), cap.tolist()
+    f = [0.0] * m
+    for flow in flows:
+        for p, x in flow.items():
+            for e in p:
+                f[e] += x
+    obj = sum(a * b for a, b in zip(wl, f)) + penalty * sum(unmet)
+    mu = 0.1 * max(obj, EPS) / n_us
+    best_lb = -math.inf
+    y = [0.0] * m
+    it = runs = 0
+
+    def plen(p) -> float:
+        return sum(wl[e] + mu / (cl[e] - f[e]) for e in p)
+
+    def shift(src: Tuple[int, ...], dst: Tuple[int, ...], most: float, gain: float) -> float:
+        # src → dst로 Δ 이동 (빈 튜플 = 미충족). Δ = gain / 2차 미분 (뉴턴), 용량까지 남은 여유의 FRAC 이내
+        a, b = set(src), set(dst)
+        add, rem = b - a, a - b
+        h = sum(mu / (cl[e] - f[e]) ** 2 for e in add | rem)
+        delta = min(most, gain / h) if h > 0.0 else most
+        for e in add:
+            delta = min(delta, _FRAC * (cl[e] - f[e]))
+        if delta <= 0.0:
+            return 0.0
+        for e in add:
+            f[e] += delta
+        for e in rem:
+            f[e] -= delta
+        return delta
+
+    def drop(k: int, p: Tuple[int, ...]) -> None:
+        # 미세 흐름은 미충족으로 돌린다 (요청량 합 보존)
+        x = flows[k].pop(p)
+        unmet[k] += x
+        for e in p:
+            f[e] -= x
+
+    while it < max_iter and by_src:
+        it += 1
+        y = [mu / (cl[e] - f[e]) if usable[e] else 0.0 for e in range(m)]
+        aon: Dict[int, Optional[Tuple[int, ...]]] = {}
+        lb = _lower_bound(ag, reqs, by_src, [a + b for a, b in zip(wl, y)], usable, penalty,
+                          sum(y[e] * cl[e] for e in range(m) if usable[e]), aon)
+        runs += len(by_src)
+        best_lb = max(best_lb, lb)
+        obj = sum(a * b for a, b in zip(wl, f)) + penalty * sum(unmet)
+        if obj - best_lb <= tol * max(abs(obj), EPS):
+            break
+        # obj - lb = (현재 μ에서의 Frank-Wolfe 간격) + μ·(간선 수): 중심 경로에 가까우면 장벽을 줄인다
+        if obj - lb - mu * n_us <= mu * n_us:
+            mu *= 0.5
+        for k, best in aon.items():
+            flow = flows[k]
+            floor = EPS * rate[k]
+            if best is None:
+                # 최단 경로도 벌점보다 비싸다 → 벌점보다 긴 경로의 흐름을 미충족으로
+                for p in list(flow):
+                    gain = plen(p) - penalty
+                    if gain > 0.0:
+                        moved = shift(p, (), flow[p], gain)
+                        flow[p] -= moved
+                        unmet[k] += moved
+                        if flow[p] <= floor:
+                            drop(k, p)
+                continue
+            for p in list(flow):
+                if p == best:
+                    continue
+                gain = plen(p) - plen(best)
+                if gain > 0.0:
+                    moved = shift(p, best, flow[p], gain)
+                    flow[p] -= moved
+                    flow[best] = flow.get(best, 0.0) + moved
+                    if flow[p] <= floor:
+                        drop(k, p)
+            if unmet[k] > floor:
+                gain = penalty - plen(best)
+                if gain > 0.0:
+                    moved = shift((), best, unmet[k], gain)
+                    unmet[k] -= moved
+                    flow[best] = flow.get(best, 0.0) + moved
+    return best_lb, np.asarray(y), it, runs
+
+
+def _dual_polish(ag: ArrayGraph, reqs, w: np.ndarray, cap: np.ndarray, y: np.ndarray, penalty: float,
+                 target: float, steps: int) -> Tuple[float, int]:
+    """승수 y에서 시작하는 Polyak 부분기울기 단계로 하한을 조인다. (최고 하한, Dijkstra 수)"""
+    usable_arr = cap > EPS
+    usable = usable_arr.tolist()
+    by_src = _demands_by_source(ag, reqs)
+    best = -math.inf
+    runs = 0
+    for _ in range(steps):
+        aon: Dict[int, Optional[Tuple[int, ...]]] = {}
+        lb = _lower_bound(ag, reqs, by_src, (w + y).tolist(), usable, penalty, float(y @ cap), aon)
+        runs += len(by_src)
+        best = max(best, lb)
+        # 부분기울기: 최단 경로 흐름의 간선 부하 - 용량 (y = 0인 간선은 음의 방향 제외)
+        g = -cap.copy()
+        for k, p in aon.items():
+            if p:
+                g[list(p)] += reqs[k][2]
+        g[~usable_arr | ((y <= 0.0) & (g < 0.0))] = 0.0
+        norm = float(g @ g)
+        if norm <= 0.0 or target - lb <= 0.0:
+            break
+        y = np.maximum(0.0, y + (target - lb) / norm * g)
+    return best, runs
+
+
+def allocate(G: nx.Graph, demands: Demands, capacity: Optional[np.ndarray] = None,
+             cost: Union[str, np.ndarray] = "length_km", max_rounds: Optional[int] = None,
+             method: str = "projection", max_iter: int = 100, tol: float = 1e-3,
+             unmet_penalty: Optional[float] = None) -> Allocation:
+    """요청 키 생성률을 용량 제약 아래 최소 비용(+ 미충족 벌점)으로 분할 할당한다.
+
+    capacity: edge id(= G.edge_list) 순서 배열. None이면 G.key_rate() (QKDNetwork) 또는
+              간선 속성 "key_rate".
+    cost: 단위 키당 간선 비용(≥ 0) — 간선 속성 이름 또는 edge id 순서 배열.
+    method: "projection"(최적화, 하한/간격 보고) 또는 "greedy"(탐욕 채우기만).
+    max_rounds: 탐욕 채우기 라운드 상한. max_iter/tol: 기울기 사영 반복 상한과 목표 상대 간격.
+    unmet_penalty: 미충족 키 단위당 벌점 (기본: 10·(노드 수-1)·max 간선 비용).
+    """
+    if method not in ("projection", "greedy"):
+        raise ValueError(f"unknown method: {method}")
+    ag = ArrayGraph.from_graph(G)
+    reqs = _normalize_demands(G, demands, ag)
+    if capacity is None:
+        capacity = G.key_rate() if hasattr(G, "key_rate") else ag.edge_array(G, "key_rate", 0.0)
+    cap = np.asarray(capacity, dtype=np.float64).copy()
+    if cap.shape != (ag.n_edges,):
+        raise ValueError("capacity array must be in edge id order")
+    w = _edge_cost(G, ag, cost)
+    if np.any(w < 0):
+        raise ValueError("edge costs must be non-negative")
+    weight = w.tolist()
+    if unmet_penalty is None:
+        top = float(w[cap > EPS].max()) if np.any(cap > EPS) else 0.0
+        unmet_penalty = 10.0 * max(1, ag.n_nodes - 1) * max(top, 1.0)
+    penalty = float(unmet_penalty)
+
+    residual = cap.tolist()
+    remaining = [r if s != d else 0.0 for s, d, r in reqs]
+    flows: List[Dict[Tuple[int, ...], float]] = [defaultdict(float) for _ in reqs]
+    runs = 0
+    with profiling.timer("alloc.total"):
+        rounds, n = _greedy_fill(ag, reqs, weight, residual, remaining, flows, max_rounds)
+        runs += n
+        if method == "projection":
+            # 장벽 시작점은 용량 안쪽이어야 한다: 탐욕 해를 1% 줄인다
+            for k, flow in enumerate(flows):
+                for p in flow:
+                    flow[p] *= 0.99
+                remaining[k] = (reqs[k][2] - sum(flow.values())) if reqs[k][0] != reqs[k][1] else 0.0
+            lower, y, rounds, n = _projection(ag, reqs, w, cap, flows, remaining, penalty, max_iter, tol)
+            runs += n
+            load = np.zeros(ag.n_edges)
+            for flow in flows:
+                for p, x in flow.items():
+                    load[list(p)] += x
+            residual = np.maximum(cap - load, 0.0).tolist()
+            # 장벽이 남긴 여유 용량에 미충족분을 다시 채운다 (목적값은 줄기만 한다)
+            runs += _greedy_fill(ag, reqs, weight, residual, remaining, flows, max_rounds)[1]
+            load = cap - np.asarray(residual)
+            objective = float(w @ load) + penalty * sum(remaining)
+            if objective - lower > tol * max(abs(objective), EPS):
+                polished, n = _dual_polish(ag, reqs, w, cap, y, penalty, objective, _DUAL_STEPS)
+                lower = max(lower, polished)
+                runs += n
+        else:
+            by_src = _demands_by_source(ag, reqs)
+            lower = _lower_bound(ag, reqs, by_src, weight, (cap > EPS).tolist(), penalty, 0.0)
+            runs += len(by_src)
+    profiling.count("alloc.dijkstra", runs)
+
+    load = np.zeros(ag.n_edges)
+    node_flows: List[Dict[Tuple[Hashable, ...], float]] = []
+    allocated = []
+    for k, flow in enumerate(flows):
+        s_idx = ag.index[reqs[k][0]]
+        out: Dict[Tuple[Hashable, ...], float] = defaultdict(float)
+        for p, x in flow.items():
+            load[list(p)] += x
+            out[tuple(ag.path_nodes(p, s_idx))] += x
+        node_flows.append(dict(out))
+        allocated.append(reqs[k][2] if reqs[k][0] == reqs[k][1] else sum(flow.values()))
+    allocated_arr = np.minimum(np.asarray(allocated, dtype=np.float64),
+                               np.array([r for _, _, r in reqs], dtype=np.float64))
+    routing_cost = float(w @ load)
+    unmet_total = float(sum(max(r - a, 0.0) for (_, _, r), a in zip(reqs, allocated_arr.tolist())))
+    objective = routing_cost + penalty * unmet_total
+    return Allocation(
+        demands=reqs,
+        allocated=allocated_arr,
+        flows=node_flows,
+        edge_load=load,
+        capacity=cap,
+        cost=routing_cost,
+        rounds=rounds,
+        dijkstra_runs=runs,
+        edges=[(ag.nodes[u], ag.nodes[v]) for u, v in zip(ag.eu.tolist(), ag.ev.tolist())],
+        method=method,
+        objective=objective,
+        lower_bound=float(lower) if math.isfinite(lower) else float("-inf"),
+        unmet_penalty=penalty,
+    )
+
+
+def random_demands(G: nx.Graph, count: int, mean_rate: float, seed: int = 0) -> List[Tuple[Hashable, Hashable, float]]:
+    """실험용 무작위 요청 목록 (지수분포 요청률)."""
+    rng = np.random.default_rng(seed)
+    nodes = list(G.nodes)
+    src = rng.integers(0, len(nodes), size=count)
+    dst = (src + rng.integers(1, len(nodes), size=count)) % len(nodes)
+    rates = rng.exponential(mean_rate, size=count)
+    return [(nodes[s], nodes[d], float(r)) for s, d, r in zip(src.tolist(), dst.tolist(), rates)]
+
+
+__all__ = ["Allocation", "allocate", "random_demands"]
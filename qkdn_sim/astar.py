@@ -0,0 +1,206 @@
+"""노드 좌표(x, y km)를 쓰는 기하 A* / 양방향 A* 점대점 경로 탐색.
+
+model의 토폴로지는 length_km가 두 노드 좌표 사이의 직선거리이므로, 목적지까지의 직선거리는 남은 길이의
+하한(admissible)이다. 이 휴리스틱으로 목적지 쪽 노드부터 정착시키면 사방으로 퍼지는 Dijkstra보다 훨씬
+적은 노드만 확장한다.
+
+휴리스틱 h(v) = scale · |v - t|, scale = min_e (w_e / |e|) (간선 가중치 / 양 끝 직선거리의 최솟값).
+  - "length_km": 좌표·길이가 반올림돼 있어도 scale이 1보다 조금 작아질 뿐 허용·일관성이 유지된다.
+  - "cross": crosslayer_route 가중치 = 길이 × (1 + (1 - 가용성) + 키 생성률 패널티)이므로 scale은 그래프에서
+    실제로 가능한 최소 가중 배율이 된다. 링크 상태가 바뀌면 customize(G)로 가중치와 scale을 다시 계산한다.
+  - 좌표가 없는 노드가 있으면 scale = 0 (일반 Dijkstra와 같음).
+모든 간선에서 h(u) ≤ w(u, v) + h(v)이므로(일관성) 노드는 한 번만 정착하고 결과는 Dijkstra와 같은 최단 거리다.
+
+양방향 A*는 평균 포텐셜 p(v) = (h_t(v) - h_s(v)) / 2 (역방향은 -p)로 두 탐색의 축소 비용을 맞추고,
+두 힙 최솟값의 합이 지금까지의 최단 거리 이상이면 멈춘다.
+
+조기 종료: 목적지 정착(단방향)/위 조건(양방향)에서 바로 멈추고, max_cost가 주어지면 그보다 싼 경로가
+없다는 것이 증명되는 즉시, max_settled가 주어지면 정착 노드 수가 이를 넘는 즉시 NetworkXNoPath를 던진다.
+탐색 노력: last_settled(직전 질의의 정착 노드 수), settled_total/queries(누적), profiling 카운터 astar.settled.
+"""
+from __future__ import annotations
+import heapq
+import math
+from typing import Dict, Hashable, List, Optional, Tuple
+import networkx as nx
+import numpy as np
+
+from . import profiling
+from .contraction import Weight, _weights
+from .graph_arrays import ArrayGraph
+
+
+class GeometricAStar:
+    """좌표 휴리스틱 A* 색인. baseline_route / crosslayer_route의 index= 로 넘길 수 있다."""
+
+    def __init__(self, G: nx.Graph, weight: Weight = "length_km", bidirectional: bool = True):
+        self.ag = ArrayGraph.from_graph(G)
+        self.nodes = self.ag.nodes
+        self.index = self.ag.index
+        self.bidirectional = bidirectional
+        data = [G.nodes[n] for n in self.nodes]
+        self.has_coords = all("x" in d and "y" in d for d in data)
+        self._x = [float(d.get("x", 0.0)) for d in data]
+        self._y = [float(d.get("y", 0.0)) for d in data]
+        self.weight_name = weight if isinstance(weight, str) else "custom"
+        self.last_settled = 0
+        self.settled_total = 0
+        self.queries = 0
+        self._set_weights(_weights(G, self.ag, weight))
+
+    def _set_weights(self, w: np.ndarray) -> None:
+        ag = self.ag
+        usable = np.isfinite(w)
+        adj: List[List[Tuple[int, float]]] = [[] for _ in range(ag.n_nodes)]
+        for u, v, c, ok in zip(ag._eu_l, ag._ev_l, w.tolist(), usable.tolist()):
+            if ok:
+                adj[u].append((v, c))
+                adj[v].append((u, c))
+        self._adj = adj
+        self.scale = 0.0
+        if self.has_coords and usable.any():
+            x, y = np.array(self._x), np.array(self._y)
+            span = np.hypot(x[ag.eu] - x[ag.ev], y[ag.eu] - y[ag.ev])
+            mask = usable & (span > 0.0)
+            if mask.any():
+                # 부동소수 오차로 일관성이 깨지지 않도록 아주 조금 낮춘다
+                self.scale = max(0.0, float(np.min(w[mask] / span[mask])) * (1.0 - 1e-9))
+
+    def customize(self, G: nx.Graph, weight: Weight = None) -> "GeometricAStar":
+        """링크 상태(가용성, skr_bps 등)가 바뀐 뒤 가중치와 scale을 다시 계산한다 (제자리 갱신)."""
+        if weight is None:
+            if self.weight_name == "custom":
+                raise ValueError("pass the new weight array")
+            weight = self.weight_name
+        if list(G.nodes) != self.nodes:
+            raise ValueError("graph nodes differ from the indexed graph")
+        self._set_weights(_weights(G, self.ag, weight))
+        return self
+
+    # ----------------------------- 질의 ----------------------------- #
+
+    def query(self, src: Hashable, dst: Hashable, max_cost: Optional[float] = None,
+              max_settled: Optional[int] = None) -> Tuple[float, List[Hashable]]:
+        """(거리, 노드 경로). 경로가 없거나 max_cost/max_settled 안에서 못 찾으면 networkx.NetworkXNoPath."""
+        s, t = self.index[src], self.index[dst]
+        if s == t:
+            return 0.0, [src]
+        search = self._bidirectional if self.bidirectional else self._unidirectional
+        with profiling.timer("route.astar"):
+            best, path, settled = search(s, t, math.inf if max_cost is None else max_cost, max_settled)
+        self.last_settled = settled
+        self.settled_total += settled
+        self.queries += 1
+        if profiling.ENABLED:
+            profiling.count("astar.queries")
+            profiling.count("astar.settled", settled)
+        if path is None:
+            if max_settled is not None and settled >= max_settled:
+                raise nx.NetworkXNoPath(f"no path between {src} and {dst} within {max_settled} settled nodes")
+            bound = "" if max_cost is None else f" cheaper than {max_cost}"
+            raise nx.NetworkXNoPath(f"no path between {src} and {dst}{bound}")
+        return best, [self.nodes[i] for i in path]
+
+    def route(self, src: Hashable, dst: Hashable) -> List[Hashable]:
+        return self.query(src, dst)[1]
+
+    def distance(self, src: Hashable, dst: Hashable) -> float:
+        return self.query(src, dst)[0]
+
+    def _unidirectional(self, s: int, t: int, max_cost: float, max_settled: Optional[int]):
+        X, Y, k, adj = self._x, self._y, self.scale, self._adj
+        xt, yt = X[t], Y[t]
+        hypot, push, pop = math.hypot, heapq.heappush, heapq.heappop
+        inf = math.inf
+        dist: Dict[int, float] = {s: 0.0}
+        pred: Dict[int, int] = {}
+        done = set()
+        heap = [(k * hypot(X[s] - xt, Y[s] - yt), 0.0, s)]
+        settled = 0
+        while heap:
+            f, d, u = pop(heap)
+            if u in done:
+                continue
+            if f >= max_cost or (max_settled is not None and settled >= max_settled):
+                break
+            done.add(u)
+            settled += 1
+            if u == t:
+                path = [t]
+                while path[-1] != s:
+                    path.append(pred[path[-1]])
+                path.reverse()
+                return d, path, settled
+            for v, c in adj[u]:
+                nd = d + c
+                if nd < dist.get(v, inf):
+                    dist[v] = nd
+                    pred[v] = u
+                    push(heap, (nd + k * hypot(X[v] - xt, Y[v] - yt), nd, v))
+        return inf, None, settled
+
+    def _bidirectional(self, s: int, t: int, max_cost: float, max_settled: Optional[int]):
+        X, Y, k, adj = self._x, self._y, self.scale, self._adj
+        xs, ys, xt, yt = X[s], Y[s], X[t], Y[t]
+        hypot, push, pop = math.hypot, heapq.heappush, heapq.heappop
+        inf = math.inf
+        half = 0.5 * k
+        pot: Dict[int, float] = {}
+
+        def p(v: int) -> float:
+            # 정방향 포텐셜 (역방향은 -p)
+            r = pot.get(v)
+            if r is None:
+                r = pot[v] = half * (hypot(X[v] - xt, Y[v] - yt) - hypot(X[v] - xs, Y[v] - ys))
+            return r
+
+        dist = ({s: 0.0}, {t: 0.0})
+        pred: Tuple[Dict[int, int], Dict[int, int]] = ({}, {})
+        done = (set(), set())
+        heaps = ([(p(s), 0.0, s)], [(-p(t), 0.0, t)])
+        sign = (1.0, -1.0)
+        best, meet = inf, -1
+        settled = 0
+        while heaps[0] and heaps[1]:
+            # 축소 비용 기준 하한: 남은 어떤 경로도 두 힙 최솟값의 합보다 싸지 않다
+            if heaps[0][0][0] + heaps[1][0][0] >= min(best, max_cost):
+                break
+            if max_settled is not None and settled >= max_settled:
+                best, meet = inf, -1
+                break
+            side = 0 if heaps[0][0][0] <= heaps[1][0][0] else 1
+            _, d, u = pop(heaps[side])
+            mine, other, closed = dist[side], dist[side ^ 1], done[side]
+            if u in closed:
+                continue
+            closed.add(u)
+            settled += 1
+            heap, pr, sg = heaps[side], pred[side], sign[side]
+            for v, c in adj[u]:
+                nd = d + c
+                if nd < mine.get(v, inf):
+                    mine[v] = nd
+                    pr[v] = u
+                    push(heap, (nd + sg * p(v), nd, v))
+                    ov = other.get(v)
+                    if ov is not None and nd + ov < best:
+                        best, meet = nd + ov, v
+        if meet < 0 or best >= max_cost:
+            return inf, None, settled
+        fwd = [meet]
+        while fwd[-1] != s:
+            fwd.append(pred[0][fwd[-1]])
+        fwd.reverse()
+        bwd = [meet]
+        while bwd[-1] != t:
+            bwd.append(pred[1][bwd[-1]])
+        return best, fwd + bwd[1:], settled
+
+
+def astar_route(G: nx.Graph, src: Hashable, dst: Hashable, weight: Weight = "length_km",
+                bidirectional: bool = True) -> List[Hashable]:
+    """일회성 A* 경로 (같은 그래프에 여러 번 질의하면 GeometricAStar를 만들어 index=로 재사용)."""
+    return GeometricAStar(G, weight, bidirectional).route(src, dst)
+
+
+__all__ = ["GeometricAStar", "astar_route"]
@@ -0,0 +1,215 @@
+"""장시간 시뮬레이션 체크포인트/재개.
+
+체크포인트 하나는 NumPy npz(압축 없음, allow_pickle 없이 읽음) 파일이다.
+  - link_state 배열 전부 (ls.<이름>)
+  - meta: JSON(UTF-8 바이트 배열) — 형식 버전, 시각 t, seed, numpy Generator 상태,
+          파이썬 random 모듈 상태(RL 탐색용), edge_list 지문(SHA-256), 물리 파라미터와 step_seconds(apply_physics 사용 시)
+  - extra.<이름>: 호출 측이 덧붙이는 배열 (예: Q-table)
+같은 토폴로지를 다시 만든 뒤 restore()하면 step()이 중단 지점부터 비트 단위로 같은 결과를 낸다.
+
+쓰기는 임시 파일 + fsync + os.replace로 원자적이라 도중에 죽어도 이전 체크포인트가 남는다.
+Checkpointer는 시뮬레이션 스레드에서 배열 복사(스냅샷)만 하고 직렬화/디스크 쓰기는 백그라운드
+스레드 하나가 맡는다. 쓰기가 밀리면 가장 최근 스냅샷만 남기고(latest-wins), min_interval초보다
+자주 저장하지 않으므로 루프가 지불하는 비용은 스냅샷 복사로 제한된다.
+"""
+from __future__ import annotations
+import hashlib
+import io
+import json
+import os
+import random
+import tempfile
+import threading
+import time
+from dataclasses import asdict
+from typing import Any, Dict, Optional
+import numpy as np
+
+from . import profiling
+from .model import STEP_SECONDS, QKDNetwork
+from .physics import LinkParams
+
+FORMAT_VERSION = 1
+DEFAULT_MIN_INTERVAL = 5.0     # 초; Checkpointer.maybe_save의 최소 저장 간격
+
+
+def _atomic_replace(path: str, data: bytes) -> None:
+    dirpath = os.path.dirname(os.path.abspath(path))
+    os.makedirs(dirpath, exist_ok=True)
+    fd, tmp = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", suffix=".tmp", dir=dirpath)
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+
+
+def edges_digest(net: QKDNetwork) -> str:
+    """edge_list(순서 포함)의 지문. 체크포인트와 토폴로지가 같은지 확인하는 데 쓴다."""
+    h = hashlib.sha256()
+    for u, v in net.edge_list:
+        h.update(f"{u}\t{v}\n".encode("utf-8"))
+    return h.hexdigest()
+
+
+def snapshot(net: QKDNetwork, extra: Optional[Dict[str, np.ndarray]] = None,
+             digest: Optional[str] = None) -> Dict[str, np.ndarray]:
+    """현재 상태의 복사본 (시뮬레이션이 계속 진행돼도 바뀌지 않음). digest: edges_digest(net) 캐시값."""
+    version, internal, gauss = random.getstate()
+    meta = {
+        "format": FORMAT_VERSION,
+        "t": net.t,
+        "seed": net.seed,
+        "rng": net.rng.bit_generator.state,
+        "py_random": [version, list(internal), gauss],
+        "edges": digest or edges_digest(net),
+        "link_params": asdict(net.link_params) if net.link_params is not None else None,
+        "step_seconds": net.step_seconds,
+    }
+    arrays = {"meta": np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8)}
+    for name, arr in net.link_state.items():
+        arrays["ls." + name] = np.array(arr, copy=True)
+    for name, arr in (extra or {}).items():
+        arrays["extra." + name] = np.array(arr, copy=True)
+    return arrays
+
+
+def write(path: str, arrays: Dict[str, np.ndarray]) -> None:
+    buf = io.BytesIO()
+    np.savez(buf, **arrays)
+    _atomic_replace(path, buf.getvalue())
+
+
+def save(path: str, net: QKDNetwork, extra: Optional[Dict[str, np.ndarray]] = None) -> None:
+    """동기 저장 (스냅샷 + 원자적 쓰기)."""
+    write(path, snapshot(net, extra))
+
+
+def restore(path: str, net: QKDNetwork) -> Dict[str, np.ndarray]:
+    """체크포인트를 같은 토폴로지의 net에 적용하고 extra 배열들을 반환한다.
+
+    간선 구성이 다르면 ValueError.
+    """
+    with np.load(path, allow_pickle=False) as z:
+        meta = json.loads(z["meta"].tobytes().decode("utf-8"))
+        if meta.get("format") != FORMAT_VERSION:
+            raise ValueError(f"unsupported checkpoint format: {meta.get('format')}")
+        net.init_link_state()
+        if edges_digest(net) != meta["edges"]:
+            raise ValueError("checkpoint was written for a different topology")
+        # 이전 형식에는 step_seconds가 없다 → 기본값
+        net.step_seconds = float(meta.get("step_seconds", STEP_SECONDS))
+        if meta["link_params"] is not None:
+            net.apply_physics(LinkParams(**meta["link_params"]), net.step_seconds)
+        for key in z.files:
+            if key.startswith("ls."):
+                net.link_state[key[3:]] = z[key].copy()
+        extra = {key[6:]: z[key].copy() for key in z.files if key.startswith("extra.")}
+    net.t = int(meta["t"])
+    net.seed = meta["seed"]
+    net.rng.bit_generator.state = meta["rng"]
+    version, internal, gauss = meta["py_random"]
+    random.setstate((version, tuple(internal), gauss))
+    net._sync_edges()
+    return extra
+
+
+class Checkpointer:
+    """주기적 체크포인트. 스냅샷은 호출 스레드에서, 쓰기는 백그라운드 스레드 하나에서.
+
+    with Checkpointer(path, net) as ck:
+        while ...:
+            net.step(n)
+            ck.maybe_save()
+    블록이 정상 종료되면 마지막 상태를 저장하고, 예외로 빠져나가면(step 도중일 수 있음) 이미 뜬
+    스냅샷만 마저 쓴다. 어느 경우든 쓰기가 끝날 때까지 기다린다.
+    """
+
+    def __init__(self, path: str, net: QKDNetwork, min_interval: float = DEFAULT_MIN_INTERVAL):
+        self.path = path
+        self.net = net
+        self.min_interval = min_interval
+        self.saved = 0          # 실제 디스크에 쓴 횟수
+        self.skipped = 0        # 쓰기가 밀려 덮어쓴 스냅샷 수
+        self.error: Optional[BaseException] = None
+        self._last = -float("inf")
+        self._digest = (None, None)     # (edge_list 객체, 지문) — 토폴로지가 바뀔 때만 다시 계산
+        self._pending: Optional[Dict[str, np.ndarray]] = None
+        self._cond = threading.Condition()
+        self._closed = False
+        self._busy = False
+        self._thread = threading.Thread(target=self._run, name="qkd-checkpoint", daemon=True)
+        self._thread.start()
+
+    def maybe_save(self, extra: Optional[Dict[str, np.ndarray]] = None, force: bool = False) -> bool:
+        """min_interval이 지났으면(또는 force) 스냅샷을 떠서 쓰기 대기열에 넣는다."""
+        now = time.monotonic()
+        if not force and now - self._last < self.min_interval:
+            return False
+        self._last = now
+        with profiling.timer("checkpoint.snapshot"):
+            edges = self.net.edge_list
+            if self._digest[0] is not edges:
+                self._digest = (edges, edges_digest(self.net))
+            arrays = snapshot(self.net, extra, self._digest[1])
+        with self._cond:
+            if self._pending is not None:
+                self.skipped += 1
+            self._pending = arrays
+            self._cond.notify()
+        return True
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closed:
+                    self._cond.wait()
+                if self._pending is None:
+                    return
+                arrays, self._pending = self._pending, None
+                self._busy = True
+            try:
+                write(self.path, arrays)
+                self.saved += 1
+            except BaseException as e:  # 다음 maybe_save/close에서 호출 측에 알림
+                self.error = e
+            finally:
+                with self._cond:
+                    self._busy = False
+                    self._cond.notify_all()
+
+    def flush(self) -> None:
+        """대기 중인 쓰기가 끝날 때까지 기다린다. 쓰기 실패가 있었으면 다시 던진다."""
+        with self._cond:
+            while self._pending is not None or self._busy:
+                self._cond.wait()
+        if self.error is not None:
+            raise self.error
+
+    def close(self, final: bool = True, extra: Optional[Dict[str, np.ndarray]] = None) -> None:
+        """final이면 현재 상태를 한 번 더 저장한 뒤 쓰기 스레드를 정리한다."""
+        if final and not self._closed:
+            self.maybe_save(extra, force=True)
+        try:
+            self.flush()
+        finally:
+            with self._cond:
+                self._closed = True
+                self._cond.notify_all()
+            self._thread.join()
+
+    def __enter__(self) -> "Checkpointer":
+        return self
+
+    def __exit__(self, exc_type: Any, *exc: Any) -> None:
+        self.close(final=exc_type is None)
+
+
+__all__ = ["Checkpointer", "edges_digest", "snapshot", "save", "restore", "write"]
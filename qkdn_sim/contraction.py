@@ -0,0 +1,321 @@
+"""Contraction Hierarchy(CH) 색인 — 정적/완만히 변하는 백본의 점대점 최단 경로.
+
+전처리: 노드를 중요도(2·간선 차이 + 제거된 이웃 수 + 계층 깊이, lazy 갱신) 순으로 하나씩 수축한다. 노드 v를 뺄 때
+이웃 u, w 사이에 v를 지나는 경로보다 짧은 우회로(witness)가 없으면 지름길 간선 (u, w; 가운데 v)을
+추가한다. witness 탐색은 정착 노드 수를 제한한 지역 Dijkstra라 지름길이 조금 더 생길 수는 있어도
+거리는 항상 정확하다.
+
+질의: 출발/도착 양쪽에서 순위가 높아지는 방향(upward) 간선만 따라가는 양방향 Dijkstra. 한쪽 힙의
+최솟값이 지금까지의 최단 거리 이상이 되면 그쪽을 멈추고, 더 높은 순위 노드를 거쳐 더 싸게 닿는 노드는
+더 뻗지 않는다(stall-on-demand). 결과 경로의 지름길은 가운데 노드를 따라
+재귀적으로 풀어 원래 노드 목록으로 돌려준다.
+
+가중치: "length_km"(baseline_route와 같음), "cross"(crosslayer_route와 같은 식을 간선 속성으로 계산),
+또는 edge id(ArrayGraph, = QKDNetwork.edge_list) 순서 배열. 가중치가 바뀌면 customize()가 기존 수축
+순서를 재사용해 다시 수축한다(순서 계산을 건너뛰므로 build보다 빠름). save()/load()는 npz 파일.
+"""
+from __future__ import annotations
+import heapq
+import io
+import json
+import os
+import tempfile
+from typing import Dict, Hashable, List, Optional, Sequence, Tuple, Union
+import networkx as nx
+import numpy as np
+
+from . import profiling
+from .graph_arrays import ArrayGraph
+from .partition import edge_weights
+
+WITNESS_SETTLE_LIMIT = 60      # witness 탐색 한 번이 정착시키는 최대 노드 수
+FORMAT_VERSION = 1
+
+Weight = Union[str, Sequence[float], np.ndarray]
+
+
+def _weights(G: nx.Graph, ag: ArrayGraph, weight: Weight) -> np.ndarray:
+    if isinstance(weight, str):
+        if weight == "cross":
+            skr = ag.edge_array(G, "skr_bps", np.nan)
+            return edge_weights("cross", ag.edge_array(G, "length_km", 1.0), ag.edge_array(G, "availability", 0.95),
+                                None if np.isnan(skr).all() else np.nan_to_num(skr, nan=np.inf))
+        return ag.edge_array(G, weight, 1.0)
+    arr = np.asarray(weight, dtype=np.float64)
+    if arr.shape != (ag.n_edges,):
+        raise ValueError("weight array must be in edge id order")
+    return arr
+
+
+def _witness(adj: List[Dict[int, float]], source: int, skip: int, targets: Dict[int, float], limit: float) -> set:
+    """source에서 skip을 거치지 않고 targets[w] 이하 비용으로 닿는 w 집합 (정착 수 제한)."""
+    found = set()
+    dist = {source: 0.0}
+    heap = [(0.0, source)]
+    settled = 0
+    remaining = len(targets)
+    while heap and settled < WITNESS_SETTLE_LIMIT:
+        d, u = heapq.heappop(heap)
+        if d > dist[u]:
+            continue
+        if d > limit:
+            break
+        settled += 1
+        if u in targets and u not in found and d <= targets[u]:
+            found.add(u)
+            remaining -= 1
+            if not remaining:
+                break
+        for v, w in adj[u].items():
+            if v == skip:
+                continue
+            nd = d + w
+            if nd < dist.get(v, float("inf")):
+                dist[v] = nd
+                heapq.heappush(heap, (nd, v))
+    return found
+
+
+def _shortcuts(adj: List[Dict[int, float]], v: int) -> List[Tuple[int, int, float]]:
+    """v 수축 시 필요한 지름길 (u, w, 비용) 목록."""
+    nbrs = list(adj[v].items())
+    out = []
+    for i, (u, wu) in enumerate(nbrs):
+        targets = {w: wu + ww for w, ww in nbrs[i + 1:]}
+        if not targets:
+            continue
+        # 기존 직접 간선이 이미 충분히 짧으면 witness
+        for w in [w for w, c in targets.items() if adj[u].get(w, float("inf")) <= c]:
+            del targets[w]
+        if not targets:
+            continue
+        have = _witness(adj, u, v, targets, max(targets.values()))
+        out.extend((u, w, c) for w, c in targets.items() if w not in have)
+    return out
+
+
+class ContractionHierarchy:
+    """수축된 그래프의 upward CSR + 지름길 가운데 노드 표."""
+
+    def __init__(self, nodes: List[Hashable], rank: np.ndarray, up_indptr: np.ndarray, up_to: np.ndarray,
+                 up_w: np.ndarray, mid: Dict[Tuple[int, int], int], weight_name: str = "custom"):
+        self.nodes = nodes
+        self.index = {n: i for i, n in enumerate(nodes)}
+        self.rank = rank
+        self.up_indptr, self.up_to, self.up_w = up_indptr, up_to, up_w
+        self.mid = mid
+        self.weight_name = weight_name
+        # 질의 루프용 리스트 (numpy 스칼라 인덱싱 회피)
+        self._up = [list(zip(up_to[up_indptr[i]:up_indptr[i + 1]].tolist(),
+                             up_w[up_indptr[i]:up_indptr[i + 1]].tolist())) for i in range(len(nodes))]
+
+    # ----------------------------- 구축 ----------------------------- #
+
+    @classmethod
+    def build(cls, G: nx.Graph, weight: Weight = "length_km", order: Optional[Sequence[int]] = None
+              ) -> "ContractionHierarchy":
+        """G와 가중치로 색인을 만든다. order(노드 번호 수축 순서)를 주면 중요도 계산을 건너뛴다."""
+        ag = ArrayGraph.from_graph(G)
+        w = _weights(G, ag, weight)
+        name = weight if isinstance(weight, str) else "custom"
+        with profiling.timer("ch.build"):
+            return cls._contract(ag, w, order, name)
+
+    def customize(self, G: nx.Graph, weight: Weight = None) -> "ContractionHierarchy":
+        """가중치가 바뀐 뒤 같은 수축 순서로 다시 만든다 (weight 기본값: 만들 때와 같은 이름)."""
+        if weight is None:
+            if self.weight_name == "custom":
+                raise ValueError("pass the new weight array")
+            weight = self.weight_name
+        if list(G.nodes) != self.nodes:
+            raise ValueError("graph nodes differ from the indexed graph")
+        order = np.argsort(self.rank).tolist()
+        return type(self).build(G, weight, order)
+
+    @classmethod
+    def _contract(cls, ag: ArrayGraph, w: np.ndarray, order: Optional[Sequence[int]], name: str
+                  ) -> "ContractionHierarchy":
+        n = ag.n_nodes
+        adj: List[Dict[int, float]] = [dict() for _ in range(n)]
+        for e, (u, v, c) in enumerate(zip(ag._eu_l, ag._ev_l, w.tolist())):
+            if u == v or not c < float("inf"):
+                continue
+            if c < adj[u].get(v, float("inf")):
+                adj[u][v] = c
+                adj[v][u] = c
+        mid: Dict[Tuple[int, int], int] = {}
+        rank = np.empty(n, dtype=np.int64)
+        up: List[List[Tuple[int, float]]] = [[] for _ in range(n)]
+        deleted = [0] * n
+        level = [0] * n
+
+        def priority(v: int) -> int:
+            return 2 * (len(_shortcuts(adj, v)) - len(adj[v])) + deleted[v] + level[v]
+
+        if order is None:
+            heap = [(priority(v), v) for v in range(n)]
+            heapq.heapify(heap)
+
+            def next_node() -> int:
+                while True:
+                    _, v = heapq.heappop(heap)
+                    p = priority(v)  # lazy 갱신: 여전히 최소일 때만 수축
+                    if not heap or p <= heap[0][0]:
+                        return v
+                    heapq.heappush(heap, (p, v))
+            sequence = (next_node() for _ in range(n))
+        else:
+            if len(order) != n:
+                raise ValueError("order must list every node once")
+            sequence = iter(order)
+
+        shortcuts = 0
+        for r, v in enumerate(sequence):
+            rank[v] = r
+            up[v].extend(adj[v].items())
+            new = _shortcuts(adj, v)
+            for u in adj[v]:
+                del adj[u][v]
+                deleted[u] += 1
+                if level[u] <= level[v]:
+                    level[u] = level[v] + 1
+            for u, x, c in new:
+                if c < adj[u].get(x, float("inf")):
+                    adj[u][x] = c
+                    adj[x][u] = c
+                    mid[(u, x) if u < x else (x, u)] = v
+                    shortcuts += 1
+            adj[v] = {}
+        profiling.count("ch.shortcuts", shortcuts)
+
+        indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum([len(x) for x in up], out=indptr[1:])
+        up_to = np.fromiter((u for x in up for u, _ in x), dtype=np.int64, count=int(indptr[-1]))
+        up_w = np.fromiter((c for x in up for _, c in x), dtype=np.float64, count=int(indptr[-1]))
+        # 수축 당시 이웃만 남기므로 up에 든 가운데 노드 표만 유지
+        keep = {(min(v, u), max(v, u)) for v in range(n) for u, _ in up[v]}
+        mid = {k: m for k, m in mid.items() if k in keep}
+        return cls(list(ag.nodes), rank, indptr, up_to, up_w, mid, name)
+
+    # ----------------------------- 질의 ----------------------------- #
+
+    def query(self, src: Hashable, dst: Hashable) -> Tuple[float, List[Hashable]]:
+        """(거리, 노드 경로). 경로가 없으면 networkx.NetworkXNoPath."""
+        s, t = self.index[src], self.index[dst]
+        if s == t:
+            return 0.0, [src]
+        inf = float("inf")
+        up = self._up
+        push = heapq.heappush
+        dist = ({s: 0.0}, {t: 0.0})
+        pred: Tuple[Dict[int, int], Dict[int, int]] = ({}, {})
+        heaps = ([(0.0, s)], [(0.0, t)])
+        best, meet = inf, -1
+        settled = 0
+        side = 0
+        while heaps[0] or heaps[1]:
+            # 두 방향을 번갈아, 비었거나 best 이상인 쪽은 건너뜀
+            if not heaps[side] or heaps[side][0][0] >= best:
+                side ^= 1
+                if not heaps[side] or heaps[side][0][0] >= best:
+                    break
+            d, u = heapq.heappop(heaps[side])
+            mine, other = dist[side], dist[side ^ 1]
+            if d > mine[u]:
+                side ^= 1
+                continue
+            settled += 1
+            if u in other and d + other[u] < best:
+                best, meet = d + other[u], u
+            # stall-on-demand: 더 높은 순위 노드를 거쳐 u에 더 싸게 올 수 있으면 u에서 더 뻗지 않는다
+            relax = []
+            for v, c in up[u]:
+                dv = mine.get(v, inf)
+                if dv + c < d:
+                    break
+                if d + c < dv:
+                    relax.append((d + c, v))
+            else:
+                p = pred[side]
+                heap = heaps[side]
+                for nd, v in relax:
+                    mine[v] = nd
+                    p[v] = u
+                    push(heap, (nd, v))
+            side ^= 1
+        if profiling.ENABLED:
+            profiling.count("ch.queries")
+            profiling.count("ch.settled", settled)
+        if meet < 0:
+            raise nx.NetworkXNoPath(f"no path between {src} and {dst}")
+        fwd = [meet]
+        while fwd[-1] != s:
+            fwd.append(pred[0][fwd[-1]])
+        fwd.reverse()
+        bwd = [meet]
+        while bwd[-1] != t:
+            bwd.append(pred[1][bwd[-1]])
+        packed = fwd + bwd[1:]
+        return best, [self.nodes[i] for i in self._unpack(packed)]
+
+    def route(self, src: Hashable, dst: Hashable) -> List[Hashable]:
+        return self.query(src, dst)[1]
+
+    def distance(self, src: Hashable, dst: Hashable) -> float:
+        return self.query(src, dst)[0]
+
+    def _unpack(self, packed: List[int]) -> List[int]:
+        out = [packed[0]]
+        mid = self.mid
+        for a, b in zip(packed[:-1], packed[1:]):
+            stack = [(a, b)]
+            while stack:
+                x, y = stack.pop()
+                m = mid.get((x, y) if x < y else (y, x))
+                if m is None:
+                    out.append(y)
+                else:
+                    stack.append((m, y))
+                    stack.append((x, m))
+        return out
+
+    # ----------------------------- 저장 ----------------------------- #
+
+    def save(self, path: str) -> None:
+        """npz로 원자적 저장 (임시 파일 + os.replace)."""
+        pairs = np.array([k for k, _ in self.mid.items()], dtype=np.int64).reshape(-1, 2)
+        mids = np.array([m for _, m in self.mid.items()], dtype=np.int64)
+        meta = {"format": FORMAT_VERSION, "weight": self.weight_name, "nodes": [str(n) for n in self.nodes]}
+        buf = io.BytesIO()
+        np.savez(buf, meta=np.frombuffer(json.dumps(meta).encode("utf-8"), dtype=np.uint8), rank=self.rank,
+                 up_indptr=self.up_indptr, up_to=self.up_to, up_w=self.up_w, mid_pairs=pairs, mid_nodes=mids)
+        dirpath = os.path.dirname(os.path.abspath(path))
+        fd, tmp = tempfile.mkstemp(prefix="." + os.path.basename(path) + ".", suffix=".tmp", dir=dirpath)
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(buf.getvalue())
+            os.replace(tmp, path)
+        except BaseException:
+            try:
+                os.unlink(tmp)
+            except OSError:
+                pass
+            raise
+
+    @classmethod
+    def load(cls, path: str, G: Optional[nx.Graph] = None) -> "ContractionHierarchy":
+        """save()한 색인을 읽는다. G를 주면 노드 객체(이름)를 G의 것으로 맞추고 일치 여부를 확인한다."""
+        with np.load(path, allow_pickle=False) as z:
+            meta = json.loads(z["meta"].tobytes().decode("utf-8"))
+            if meta.get("format") != FORMAT_VERSION:
+                raise ValueError(f"unsupported index format: {meta.get('format')}")
+            nodes: List[Hashable] = meta["nodes"]
+            if G is not None:
+                if [str(n) for n in G.nodes] != nodes:
+                    raise ValueError("index was built for a different graph")
+                nodes = list(G.nodes)
+            mid = {(int(a), int(b)): int(m) for (a, b), m in zip(z["mid_pairs"].tolist(), z["mid_nodes"].tolist())}
+            return cls(nodes, z["rank"], z["up_indptr"], z["up_to"], z["up_w"], mid, meta["weight"])
+
+
+__all__ = ["ContractionHierarchy"]
@@ -0,0 +1,116 @@
+"""networkx 그래프의 배열(CSR) 표현과 배열 기반 최단 경로.
+
+QKDNetwork.edge_list 순서의 간선 번호(edge id)를 그대로 사용하므로 link_state 배열, 용량/비용 배열과
+인덱스가 일치한다. 할당/라우팅 엔진이 간선 속성 dict 대신 float 배열로 가중치를 다룰 때 사용한다.
+"""
+from __future__ import annotations
+import heapq
+from typing import Hashable, List, Optional, Sequence, Tuple
+import networkx as nx
+import numpy as np
+
+
+class ArrayGraph:
+    """무방향 그래프의 CSR 인접 구조.
+
+    nodes[i] ↔ index[node], 간선 e = (eu[e], ev[e]).
+    노드 i의 이웃: nbr[indptr[i]:indptr[i+1]], 해당 간선 번호: eid[같은 구간].
+    """
+
+    def __init__(self, nodes: Sequence[Hashable], edges: Sequence[Tuple[Hashable, Hashable]]):
+        self.nodes: List[Hashable] = list(nodes)
+        self.index = {n: i for i, n in enumerate(self.nodes)}
+        n = len(self.nodes)
+        m = len(edges)
+        self.eu = np.fromiter((self.index[u] for u, _ in edges), dtype=np.int64, count=m)
+        self.ev = np.fromiter((self.index[v] for _, v in edges), dtype=np.int64, count=m)
+        src = np.concatenate([self.eu, self.ev])
+        dst = np.concatenate([self.ev, self.eu])
+        ids = np.concatenate([np.arange(m), np.arange(m)])
+        order = np.argsort(src, kind="stable")
+        self.nbr = dst[order]
+        self.eid = ids[order]
+        self.indptr = np.zeros(n + 1, dtype=np.int64)
+        np.cumsum(np.bincount(src, minlength=n), out=self.indptr[1:])
+        # 파이썬 루프용 리스트 사본 (numpy 스칼라 인덱싱보다 빠름)
+        self._eu_l: List[int] = self.eu.tolist()
+        self._ev_l: List[int] = self.ev.tolist()
+        self._adj = [list(zip(self.nbr[self.indptr[i]:self.indptr[i + 1]].tolist(),
+                              self.eid[self.indptr[i]:self.indptr[i + 1]].tolist())) for i in range(n)]
+
+    @classmethod
+    def from_graph(cls, G: nx.Graph) -> "ArrayGraph":
+        edges = getattr(G, "edge_list", None)
+        if not edges or len(edges) != G.number_of_edges():
+            edges = list(G.edges())
+        return cls(list(G.nodes), edges)
+
+    @property
+    def n_nodes(self) -> int:
+        return len(self.nodes)
+
+    @property
+    def n_edges(self) -> int:
+        return len(self.eu)
+
+    def edge_array(self, G: nx.Graph, attr: str, default: float = 0.0) -> np.ndarray:
+        """간선 속성을 edge id 순서의 float 배열로."""
+        return np.array([G.edges[self.nodes[u], self.nodes[v]].get(attr, default)
+                         for u, v in zip(self._eu_l, self._ev_l)], dtype=np.float64)
+
+    def dijkstra(self, source: int, weight: Sequence[float], usable: Optional[Sequence[bool]] = None,
+                 target: Optional[int] = None) -> Tuple[List[float], List[int]]:
+        """source(노드 번호)에서의 최단 거리와 선행 간선(pred_edge, 없으면 -1).
+
+        weight/usable은 edge id 순서(리스트 권장). target이 주어지면 도달 즉시 멈춘다.
+        """
+        n = len(self.nodes)
+        inf = float("inf")
+        dist = [inf] * n
+        pred = [-1] * n
+        done = [False] * n
+        dist[source] = 0.0
+        heap = [(0.0, source)]
+        adj = self._adj
+        while heap:
+            d, u = heapq.heappop(heap)
+            if done[u]:
+                continue
+            done[u] = True
+            if u == target:
+                break
+            for v, e in adj[u]:
+                if done[v] or (usable is not None and not usable[e]):
+                    continue
+                nd = d + weight[e]
+                if nd < dist[v]:
+                    dist[v] = nd
+                    pred[v] = e
+                    heapq.heappush(heap, (nd, v))
+        return dist, pred
+
+    def path_edges(self, pred: Sequence[int], source: int, target: int) -> List[int]:
+        """dijkstra의 pred_edge로 source→target 간선 번호 목록을 복원 (도달 불가 시 [])."""
+        edges: List[int] = []
+        v = target
+        eu, ev = self._eu_l, self._ev_l
+        while v != source:
+            e = pred[v]
+            if e < 0:
+                return []
+            edges.append(e)
+            v = eu[e] if ev[e] == v else ev[e]
+        edges.reverse()
+        return edges
+
+    def path_nodes(self, edges: Sequence[int], source: int) -> List[Hashable]:
+        out = [self.nodes[source]]
+        v = source
+        eu, ev = self._eu_l, self._ev_l
+        for e in edges:
+            v = ev[e] if eu[e] == v else eu[e]
+            out.append(self.nodes[v])
+        return out
+
+
+__all__ = ["ArrayGraph"]
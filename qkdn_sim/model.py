@@ -2,28 +2,167 @@
 
 기본(default_topology)은 소규모 교육용 그래프로 노드간 물리 길이(km), 감쇠(dB), 가용성(availability)
 등의 속성을 포함한다.
+
+QKDNetwork.step()은 링크 상태(가용성, 누적 키 풀)를 시간 단계별로 진화시킨다. 상태는 간선 순서대로
+배열(link_state)에 보관되고, 매 step 후 간선 속성(availability, key_pool_bits)에 반영되어
+라우팅 함수가 그대로 사용할 수 있다.
+
+apply_physics()를 호출하면 링크별 키 생성률이 물리 계층 모델(physics, decoy-state BB84)로 바뀌고
+간선 속성 skr_bps(bit/s)가 기록된다 (crosslayer_route, RL 보상이 사용).
 """
 from __future__ import annotations
 import math
 import random
+from typing import Any, Hashable, Dict, List, Optional, Tuple
 import networkx as nx
+import numpy as np
+
+from . import profiling
+from .physics import DEFAULT_PARAMS, LinkParams, secret_key_rate
 
 RANDOM_SEED = 42
 random.seed(RANDOM_SEED)
 
+# 링크 상태 진화 파라미터
+AVAILABILITY_SIGMA = 0.01      # step당 가용성 랜덤워크 표준편차
+AVAILABILITY_REVERT = 0.1      # 기준 가용성으로의 평균회귀 계수
+AVAILABILITY_MIN = 0.5
+AVAILABILITY_MAX = 0.999
+KEY_RATE_SCALE = 1000.0        # 감쇠 0dB 링크가 step당 생성하는 키 비트(가용성 1.0 기준)
+STEP_SECONDS = 1.0             # apply_physics 사용 시 step 하나의 길이(초)
+
 
 def _attenuation_db(length_km: float, fiber_db_per_km: float = 0.2) -> float:
     """간단한 광섬유 감쇠 모델 (dB)."""
     return round(length_km * fiber_db_per_km, 3)
 
 
-def default_topology() -> nx.Graph:
+class QKDNetwork(nx.Graph):
+    """링크 상태를 시간에 따라 진화시키는 QKD 네트워크 그래프.
+
+    nx.Graph와 동일하게 사용할 수 있으며, step()으로 시뮬레이션 시간을 진행한다.
+    link_state: {"availability", "base_availability", "attenuation_db", "base_key_rate", "key_pool_bits"}
+                → 간선 순서(edge_list)의 float 배열. base_key_rate는 가용성 1.0 기준 step당 키 비트.
+    """
+
+    def __init__(self, incoming_graph_data=None, seed: int = RANDOM_SEED, **attr):
+        super().__init__(incoming_graph_data, **attr)
+        self.seed = seed
+        self.rng = np.random.default_rng(seed)
+        self.t = 0
+        self.edge_list: List[Tuple[Hashable, Hashable]] = []
+        self.link_state: Dict[str, np.ndarray] = {}
+        self.link_params: Optional[LinkParams] = None
+        self.step_seconds = STEP_SECONDS
+        self._skr_cache: Dict[LinkParams, np.ndarray] = {}
+
+    def init_link_state(self) -> None:
+        """현재 간선 속성으로 링크 상태 배열을 (재)구성한다."""
+        self.edge_list = list(self.edges())
+        data = [self.edges[e] for e in self.edge_list]
+        avail = np.array([d.get("availability", 0.95) for d in data], dtype=np.float64)
+        att = np.array([d.get("attenuation_db", 0.0) for d in data], dtype=np.float64)
+        self.link_state = {
+            "base_availability": avail.copy(),
+            "availability": avail,
+            "attenuation_db": att,
+            "base_key_rate": KEY_RATE_SCALE * np.power(10.0, -att / 10.0),
+            "key_pool_bits": np.array([d.get("key_pool_bits", 0.0) for d in data], dtype=np.float64),
+        }
+        self._skr_cache.clear()  # 감쇠가 바뀌었을 수 있음
+        if self.link_params is not None:
+            self.apply_physics(self.link_params, self.step_seconds)
+
+    def link_rates(self, params: LinkParams = DEFAULT_PARAMS) -> np.ndarray:
+        """파라미터 집합별 링크 비밀키 생성률(bit/s, edge_list 순서). 같은 params는 캐시에서 반환."""
+        rates = self._skr_cache.get(params)
+        if rates is None:
+            if len(self.edge_list) != self.number_of_edges():
+                self.init_link_state()
+            rates = secret_key_rate(self.link_state["attenuation_db"], params)
+            rates.setflags(write=False)
+            self._skr_cache[params] = rates
+        return rates
+
+    def apply_physics(self, params: LinkParams = DEFAULT_PARAMS, step_seconds: Optional[float] = None) -> np.ndarray:
+        """물리 계층 모델로 링크 키 생성률을 설정하고 간선 속성 skr_bps를 기록한다.
+
+        이후 step()/key_rate()는 skr_bps * step_seconds * 가용성을 step당 키 비트로 사용한다.
+        params와 step_seconds(None이면 직전 값, 처음엔 STEP_SECONDS)는 네트워크에 기억되어
+        init_link_state()가 다시 적용한다.
+        """
+        if step_seconds is None:
+            step_seconds = self.step_seconds
+        rates = self.link_rates(params)
+        self.link_params = params
+        self.step_seconds = float(step_seconds)
+        self.link_state["skr_bps"] = rates
+        self.link_state["base_key_rate"] = rates * step_seconds
+        for (u, v), r in zip(self.edge_list, rates.tolist()):
+            self._adj[u][v]["skr_bps"] = r
+        return rates
+
+    def reorder_edges(self, order: np.ndarray) -> None:
+        """edge_list와 link_state 배열을 order(새 위치 → 기존 edge id) 순서로 재배치한다."""
+        if len(self.edge_list) != self.number_of_edges():
+            self.init_link_state()
+        order = np.asarray(order, dtype=np.int64)
+        if len(order) != len(self.edge_list):
+            raise ValueError("order must be a permutation of the edge ids")
+        self.edge_list = [self.edge_list[i] for i in order.tolist()]
+        for name, arr in self.link_state.items():
+            self.link_state[name] = arr[order]
+        self._skr_cache.clear()  # 캐시된 배열은 이전 간선 순서
+
+    def _sync_edges(self) -> None:
+        avail = self.link_state["availability"]
+        pool = self.link_state["key_pool_bits"]
+        for i, (u, v) in enumerate(self.edge_list):
+            d = self._adj[u][v]
+            d["availability"] = round(float(avail[i]), 3)
+            d["key_pool_bits"] = float(pool[i])
+
+    def key_rate(self) -> np.ndarray:
+        """간선별 현재 비밀키 생성률(step당 비트, edge_list 순서).
+
+        base_key_rate * 가용성 — step()이 키 풀에 누적하는 양과 같다.
+        """
+        if len(self.edge_list) != self.number_of_edges():
+            self.init_link_state()
+        ls = self.link_state
+        return ls["base_key_rate"] * ls["availability"]
+
+    def step(self, steps: int = 1) -> int:
+        """링크 상태를 steps 단계 진행하고 현재 시각(t)을 반환한다.
+
+        가용성: 기준값으로 평균회귀하는 랜덤워크 (AVAILABILITY_MIN~MAX로 제한)
+        키 풀: base_key_rate * 가용성 만큼 매 step 누적 (기본 KEY_RATE_SCALE * 10^(-감쇠/10))
+        """
+        steps = max(0, int(steps))
+        profiling.count("sim.steps", steps)
+        with profiling.timer("sim.step"):
+            if len(self.edge_list) != self.number_of_edges():
+                self.init_link_state()
+            ls = self.link_state
+            rate = ls["base_key_rate"]
+            for _ in range(steps):
+                noise = self.rng.normal(0.0, AVAILABILITY_SIGMA, size=len(self.edge_list))
+                avail = ls["availability"]
+                avail += AVAILABILITY_REVERT * (ls["base_availability"] - avail) + noise
+                np.clip(avail, AVAILABILITY_MIN, AVAILABILITY_MAX, out=avail)
+                ls["key_pool_bits"] += rate * avail
+                self.t += 1
+            self._sync_edges()
+        return self.t
+
+
+def default_topology(seed: int = RANDOM_SEED) -> QKDNetwork:
     """학습용 기본 토폴로지 그래프를 생성한다.
 
     노드: A,B,C,D,E,F
     위치(임의 배치)를 통해 노드간 유클리드 거리로 링크 길이를 계산하고, 감쇠 및 가용성 값을 부여한다.
     """
-    G = nx.Graph()
+    G = QKDNetwork(seed=seed)
     # 고정 좌표 (x,y km 단위 가정)
     coords = {
         "A": (0, 0),
@@ -60,6 +199,83 @@ def default_topology() -> nx.Graph:
     ]
     for u, v in links:
         add_link(u, v)
+    G.init_link_state()
     return G
 
-__all__ = ["default_topology"]
+
+def random_topology(n_nodes: int, seed: int = RANDOM_SEED, mean_degree: float = 6.0) -> QKDNetwork:
+    """대규모 실험/시각화용 무작위 기하(geometric) 토폴로지.
+
+    노드를 약 10km 간격 밀도로 정사각 영역에 균일 배치하고, 평균 차수가 mean_degree가 되는 반경 안의
+    노드쌍을 잇는다(2차원 연속 퍼콜레이션 임계 ≈4.5보다 큰 기본값 6으로 거대 컴포넌트가 생긴다). 분리된 컴포넌트는 가장 가까운 노드로 연결해 전체를 하나로 만든다.
+    노드 이름은 "N0001"처럼 0으로 채운 번호(정렬 순서 = 생성 순서).
+    """
+    rng = np.random.default_rng(seed)
+    n = max(2, int(n_nodes))
+    side = 10.0 * math.sqrt(n)
+    pts = rng.uniform(0.0, side, size=(n, 2))
+    pts = pts[np.argsort(pts[:, 0], kind="stable")]
+    radius = math.sqrt(mean_degree * side * side / (math.pi * n))
+    width = len(str(n))
+    names = [f"N{i + 1:0{width}d}" for i in range(n)]
+
+    G = QKDNetwork(seed=seed)
+    for name, (x, y) in zip(names, pts):
+        G.add_node(name, x=round(float(x), 3), y=round(float(y), 3))
+
+    def add_link(i: int, j: int, dist: float) -> None:
+        length_km = round(float(dist), 3)
+        G.add_edge(
+            names[i],
+            names[j],
+            length_km=length_km,
+            attenuation_db=_attenuation_db(length_km),
+            availability=round(float(rng.uniform(0.90, 0.99)), 3),
+        )
+
+    # x 정렬 후 행 블록마다 x가 반경 안인 열 구간만 거리 계산 (n^2 회피)
+    xs = pts[:, 0]
+    block = 256
+    for start in range(0, n, block):
+        end = min(n, start + block)
+        lo = int(np.searchsorted(xs, xs[start] - radius, side="left"))
+        hi = int(np.searchsorted(xs, xs[end - 1] + radius, side="right"))
+        d = np.hypot(*(pts[start:end, None, :] - pts[None, lo:hi, :]).transpose(2, 0, 1))
+        ii, jj = np.nonzero(d <= radius)
+        for i, j in zip(ii, jj):
+            if i + start < j + lo:
+                add_link(int(i + start), int(j + lo), d[i, j])
+
+    index = {name: i for i, name in enumerate(names)}
+    comps = sorted(nx.connected_components(G), key=len, reverse=True)
+    in_main = np.zeros(n, dtype=bool)
+    in_main[[index[v] for v in comps[0]]] = True
+    for comp in comps[1:]:
+        members = [index[v] for v in comp]
+        d = np.hypot(*(pts[members][:, None, :] - pts[None, :, :]).transpose(2, 0, 1))
+        d[:, ~in_main] = np.inf
+        a, b = np.unravel_index(int(np.argmin(d)), d.shape)
+        add_link(members[a], int(b), d[a, b])
+        in_main[members] = True
+    G.init_link_state()
+    return G
+
+
+def resolve_node(G: nx.Graph, token: Any) -> Hashable:
+    """노드 이름 또는 1부터 시작하는 번호(정렬 순서)를 실제 노드로 변환한다."""
+    if token in G:
+        return token
+    s = str(token)
+    if s in G:
+        return s
+    try:
+        idx = int(s)
+    except ValueError:
+        raise KeyError(f"unknown node: {token}")
+    nodes = sorted(G.nodes, key=str)
+    if 1 <= idx <= len(nodes):
+        return nodes[idx - 1]
+    raise KeyError(f"node index out of range: {token}")
+
+
+__all__ = ["QKDNetwork", "default_topology", "random_topology", "resolve_node"]
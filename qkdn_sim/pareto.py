@@ -0,0 +1,139 @@
+"""다기준(길이, 종단 가용성, 홉 수) 파레토 경로 열거.
+
+crosslayer_route는 두 기준을 고정된 가중식 하나로 합치므로 절충점을 바꿀 때마다 다시 탐색해야 한다.
+pareto_routes는 라벨 설정(label-setting) 다기준 Dijkstra 한 번으로 지배되지 않는 경로 전체(파레토 전선)를
+돌려주고, 운영자는 그중에서 고르면 된다.
+
+기준 (모두 최소화)
+  length_km 합, -log(availability) 합(= 종단 가용성 곱의 최대화), 홉 수
+라벨 (경로 비용 벡터, 노드, 선행 라벨)을 사전식 순서로 꺼내므로 먼저 확정된 라벨은 나중 라벨에 지배되지
+않는다. 가지치기:
+  - 노드별 확정 라벨에 지배되는 라벨은 버린다. 확정 순서가 길이 오름차순이라 길이 기준은 항상 성립하므로
+    (risk, hops) 2기준 검사를 홉 수별 최소 risk 누적 배열로 O(1)에 한다.
+  - 목적지까지의 기준별 하한(역방향 Dijkstra 세 번)을 더한 벡터가 이미 찾은 목적지 라벨에 지배되면 버린다.
+  - eps > 0: (1+eps)배 이내로 지배되는 라벨도 버린다(근사 전선, 라벨 수 감소).
+  - max_labels: 노드당 확정 라벨 수 상한(근사), max_hops: 홉 수 상한(정확).
+crosslayer_route와 같이 키를 만들 수 없는 링크(skr_bps == 0)는 쓰지 않는다.
+"""
+from __future__ import annotations
+import heapq
+import math
+from dataclasses import dataclass
+from typing import Hashable, List, Optional
+import networkx as nx
+import numpy as np
+
+from . import profiling
+from .graph_arrays import ArrayGraph
+
+
+@dataclass(frozen=True)
+class ParetoPath:
+    path: List[Hashable]
+    length_km: float
+    availability: float     # 링크 가용성의 곱
+    hops: int
+
+
+def pareto_routes(G: nx.Graph, src: Hashable, dst: Hashable, eps: float = 0.0,
+                  max_labels: Optional[int] = None, max_hops: Optional[int] = None) -> List[ParetoPath]:
+    """src→dst 파레토 최적 경로 목록(length_km 오름차순). 경로가 없으면 NetworkXNoPath."""
+    with profiling.timer("route.pareto"):
+        return _pareto(G, src, dst, eps, max_labels, max_hops)
+
+
+def _pareto(G, src, dst, eps, max_labels, max_hops):
+    ag = ArrayGraph.from_graph(G)
+    s, t = ag.index[src], ag.index[dst]
+    avail_arr = ag.edge_array(G, "availability", 0.95)
+    ok = (ag.edge_array(G, "skr_bps", 1.0) > 0.0) & (avail_arr > 0.0)
+    length = ag.edge_array(G, "length_km", 1.0).tolist()
+    risk = (-np.log(np.where(ok, avail_arr, 1.0))).tolist()
+    avail = avail_arr.tolist()
+    usable = ok.tolist()
+    # 목적지까지 기준별 하한 (무방향 그래프이므로 dst에서의 거리)
+    lb_len = ag.dijkstra(t, length, usable)[0]
+    if lb_len[s] == math.inf:
+        raise nx.NetworkXNoPath(f"No path between {src} and {dst}.")
+    lb_risk = ag.dijkstra(t, risk, usable)[0]
+    lb_hops = ag.dijkstra(t, [1.0] * ag.n_edges, usable)[0]
+    if max_hops is not None and lb_hops[s] > max_hops:
+        raise nx.NetworkXNoPath(f"No path between {src} and {dst} within {max_hops} hops.")
+
+    f = 1.0 + eps
+    # 라벨 i: (L_len[i], L_risk[i], L_hops[i]) at L_node[i], 선행 라벨 L_prev[i], 마지막 간선 L_edge[i]
+    L_len, L_risk, L_hops, L_node, L_prev, L_edge = [0.0], [0.0], [0], [s], [-1], [-1]
+    # 확정 라벨은 길이 오름차순으로 나오므로 지금 검사하는 어떤 라벨보다도 길이가 짧거나 같다. 따라서 지배
+    # 검사는 (risk, hops) 2기준만 보면 되고, 노드별 prefix[h] = 홉 수 h 이하 확정 라벨의 최소 risk로 O(1)이다.
+    prefix: List[List[float]] = [[] for _ in range(ag.n_nodes)]
+    count = [0] * ag.n_nodes
+    front: List[int] = []
+    inf = math.inf
+
+    def dominated(pm, b, c):
+        if not pm:
+            return False
+        h = int(f * c)
+        return pm[h if h < len(pm) else -1] <= f * b
+
+    def settle(pm, b, c):
+        if len(pm) <= c:
+            pm.extend([pm[-1] if pm else inf] * (c + 1 - len(pm)))
+        for h in range(c, len(pm)):
+            if pm[h] <= b:
+                break
+            pm[h] = b
+
+    pm_t = prefix[t]
+    heap = [(0.0, 0.0, 0, 0)]
+    adj = ag._adj
+    created = pruned = 0
+    while heap:
+        a, b, c, i = heapq.heappop(heap)
+        v = L_node[i]
+        pm = prefix[v]
+        if (max_labels is not None and count[v] >= max_labels) or dominated(pm, b, c):
+            continue
+        if v != t and dominated(pm_t, b + lb_risk[v], c + lb_hops[v]):
+            continue
+        settle(pm, b, c)
+        count[v] += 1
+        if v == t:
+            front.append(i)
+            continue
+        for w, e in adj[v]:
+            if not usable[e]:
+                continue
+            nb, nc = b + risk[e], c + 1
+            if (max_hops is not None and nc + lb_hops[w] > max_hops) or dominated(prefix[w], nb, nc) \
+                    or dominated(pm_t, nb + lb_risk[w], nc + lb_hops[w]):
+                pruned += 1
+                continue
+            na = a + length[e]
+            L_len.append(na)
+            L_risk.append(nb)
+            L_hops.append(nc)
+            L_node.append(w)
+            L_prev.append(i)
+            L_edge.append(e)
+            created += 1
+            heapq.heappush(heap, (na, nb, nc, len(L_node) - 1))
+    if profiling.ENABLED:
+        profiling.count("pareto.labels", created)
+        profiling.count("pareto.pruned", pruned)
+        profiling.count("pareto.front", len(front))
+
+    out = []
+    for i in front:
+        edges = []
+        j = i
+        while L_prev[j] >= 0:
+            edges.append(L_edge[j])
+            j = L_prev[j]
+        edges.reverse()
+        out.append(ParetoPath(ag.path_nodes(edges, s), L_len[i], math.prod(avail[e] for e in edges), L_hops[i]))
+    out.sort(key=lambda p: (p.length_km, -p.availability, p.hops))
+    return out
+
+
+__all__ = ["ParetoPath", "pareto_routes"]
@@ -0,0 +1,435 @@
+"""대규모 QKD 네트워크의 영역 분할 다중 프로세스 시뮬레이션.
+
+1) 분할: geometric_partition()이 노드 x/y 좌표로 재귀 좌표 이분할(RCB)을 수행해 노드마다 영역 번호를
+   붙인다. 각 간선은 edge_list상 첫 끝점의 영역이 소유하며, QKDNetwork.reorder_edges()로 간선을
+   영역별로 연속되게 재배치한다. 양 끝점의 영역이 다른 간선이 경계 간선, 경계 간선에 닿은 노드가
+   경계 노드다.
+2) 진행: PartitionedSimulation은 link_state 배열을 공유 메모리(multiprocessing.shared_memory)로
+   옮기고 영역마다 작업 프로세스 하나를 띄운다. 링크 상태 진화는 링크별로 독립이므로 각 작업자는
+   자기 구간만 in-place로 갱신하고 step(n) 호출당 한 번만 동기화한다 → 처리량이 코어 수에 거의
+   비례한다. 영역별 난수열은 SeedSequence(seed).spawn(parts)로 나누므로 (seed, parts)가 같으면
+   프로세스 사용 여부와 무관하게 결과가 같다.
+3) 라우팅: OverlayRouter는 영역마다 경계 노드 사이 영역 내부 최단 거리(작업자가 병렬 계산)와 경계
+   간선으로 오버레이 그래프를 만든다. 질의는 출발/도착 영역 안의 Dijkstra + 오버레이 Dijkstra로
+   경로를 찾고, 오버레이 간선을 영역 내부 경로로 풀어 노드 목록을 돌려준다.
+
+다단계(multilevel) 그래프 분할기(METIS 등)는 의존성이 없어 쓰지 않는다. 링크 상태 진화에는 영역 간
+결합이 없으므로 좌표 분할로 부하(간선 수)만 고르게 맞추면 충분하다.
+"""
+from __future__ import annotations
+import heapq
+import multiprocessing as mp
+import os
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Any, Dict, Hashable, List, Optional, Tuple
+import numpy as np
+
+from . import profiling
+from .graph_arrays import ArrayGraph
+from .model import AVAILABILITY_MAX, AVAILABILITY_MIN, AVAILABILITY_REVERT, AVAILABILITY_SIGMA, QKDNetwork
+from .routing import SKR_HALF_BPS
+
+SHARED_FIELDS = ("availability", "base_availability", "base_key_rate", "key_pool_bits")
+POLICIES = ("baseline", "cross")
+
+
+def geometric_partition(G: QKDNetwork, parts: int) -> np.ndarray:
+    """재귀 좌표 이분할. G.nodes 순서의 영역 번호 배열 (각 영역 노드 수가 거의 같음)."""
+    nodes = list(G.nodes)
+    xy = np.array([(G.nodes[n].get("x", 0.0), G.nodes[n].get("y", 0.0)) for n in nodes], dtype=np.float64)
+    label = np.zeros(len(nodes), dtype=np.int64)
+
+    def split(idx: np.ndarray, k: int, base: int) -> None:
+        if k <= 1 or len(idx) == 0:
+            label[idx] = base
+            return
+        left = k // 2
+        pts = xy[idx]
+        axis = int(np.argmax(np.ptp(pts, axis=0)))   # 긴 축으로 자른다
+        order = idx[np.argsort(pts[:, axis], kind="stable")]
+        cut = len(order) * left // k
+        split(order[:cut], left, base)
+        split(order[cut:], k - left, base + left)
+
+    split(np.arange(len(nodes)), max(1, int(parts)), 0)
+    return label
+
+
+@dataclass
+class Partition:
+    """분할 결과. 간선 번호는 재배치 후 edge_list 순서."""
+    parts: int
+    nodes: List[Hashable]
+    node_part: np.ndarray           # G.nodes 순서
+    bounds: np.ndarray              # 영역 r의 소유 간선 = [bounds[r], bounds[r+1])
+    eu: np.ndarray                  # 간선 끝점 (노드 번호)
+    ev: np.ndarray
+    boundary: np.ndarray            # bool, 경계 간선
+    borders: List[np.ndarray]       # 영역별 경계 노드 번호
+
+    def region_edges(self, r: int) -> np.ndarray:
+        """영역 r 내부 간선 번호 (양 끝점이 모두 r)."""
+        lo, hi = int(self.bounds[r]), int(self.bounds[r + 1])
+        ids = np.arange(lo, hi)
+        return ids[~self.boundary[lo:hi]]
+
+    def summary(self) -> Dict[str, Any]:
+        return {"parts": self.parts, "edges": int(self.bounds[-1]),
+                "edges_per_part": np.diff(self.bounds).tolist(),
+                "boundary_edges": int(self.boundary.sum()),
+                "border_nodes": [len(b) for b in self.borders]}
+
+
+def partition_network(net: QKDNetwork, parts: int) -> Partition:
+    """net을 parts개 영역으로 나누고 간선을 영역별 연속 구간으로 재배치한다."""
+    with profiling.timer("partition.build"):
+        if len(net.edge_list) != net.number_of_edges():
+            net.init_link_state()
+        nodes = list(net.nodes)
+        index = {n: i for i, n in enumerate(nodes)}
+        node_part = geometric_partition(net, parts)
+        eu = np.fromiter((index[u] for u, _ in net.edge_list), dtype=np.int64, count=len(net.edge_list))
+        ev = np.fromiter((index[v] for _, v in net.edge_list), dtype=np.int64, count=len(net.edge_list))
+        owner = node_part[eu]
+        order = np.argsort(owner, kind="stable")
+        net.reorder_edges(order)
+        eu, ev, owner = eu[order], ev[order], owner[order]
+        bounds = np.searchsorted(owner, np.arange(parts + 1), side="left")
+        boundary = node_part[eu] != node_part[ev]
+        touched = np.unique(np.concatenate([eu[boundary], ev[boundary]]))
+        borders = [touched[node_part[touched] == r] for r in range(parts)]
+    return Partition(parts, nodes, node_part, bounds, eu, ev, boundary, borders)
+
+
+def edge_weights(policy: str, length: np.ndarray, avail: np.ndarray, skr: Optional[np.ndarray]) -> np.ndarray:
+    """routing.baseline_route / crosslayer_route와 같은 간선 가중치의 배열 버전 (키 없는 링크는 inf)."""
+    if policy == "baseline":
+        return length.astype(np.float64, copy=True)
+    if policy != "cross":
+        raise ValueError(f"unsupported policy for partitioned routing: {policy}")
+    penalty = 0.0 if skr is None else SKR_HALF_BPS / (skr + SKR_HALF_BPS)
+    w = length * (1.0 + (1.0 - avail) + penalty)
+    if skr is not None:
+        w = np.where(skr > 0.0, w, np.inf)
+    return w
+
+
+def _region_graph(part: Partition, r: int) -> Tuple[ArrayGraph, np.ndarray]:
+    """영역 r 내부 간선만으로 만든 ArrayGraph와 (지역 edge id → 전역 edge id) 배열."""
+    ids = part.region_edges(r)
+    members = np.flatnonzero(part.node_part == r)
+    ag = ArrayGraph(members.tolist(), list(zip(part.eu[ids].tolist(), part.ev[ids].tolist())))
+    return ag, ids
+
+
+class _Region:
+    """영역 하나의 상태 진행과 오버레이 계산. 작업 프로세스 안(또는 processes=False면 현재 프로세스)에서 쓴다."""
+
+    def __init__(self, r: int, lo: int, hi: int, arrays: Dict[str, np.ndarray], statics: Dict[str, np.ndarray],
+                 seed: np.random.SeedSequence, part: Partition):
+        self.r = r
+        self.lo, self.hi = lo, hi
+        self.arrays = arrays
+        self.statics = statics
+        self.rng = np.random.default_rng(seed)
+        self.part = part
+        self._graph: Optional[Tuple[ArrayGraph, np.ndarray]] = None
+
+    def step(self, steps: int) -> None:
+        sl = slice(self.lo, self.hi)
+        avail = self.arrays["availability"][sl]
+        base = self.arrays["base_availability"][sl]
+        rate = self.arrays["base_key_rate"][sl]
+        pool = self.arrays["key_pool_bits"][sl]
+        for _ in range(steps):
+            noise = self.rng.normal(0.0, AVAILABILITY_SIGMA, size=len(avail))
+            avail += AVAILABILITY_REVERT * (base - avail) + noise
+            np.clip(avail, AVAILABILITY_MIN, AVAILABILITY_MAX, out=avail)
+            pool += rate * avail
+
+    def overlay(self, policy: str) -> Tuple[List[int], List[List[float]]]:
+        """경계 노드 목록과 그 사이 영역 내부 최단 거리 행렬 (도달 불가 = inf)."""
+        if self._graph is None:
+            self._graph = _region_graph(self.part, self.r)
+        ag, ids = self._graph
+        skr = self.statics.get("skr_bps")
+        w = edge_weights(policy, self.statics["length_km"][ids], self.arrays["availability"][ids],
+                         None if skr is None else skr[ids]).tolist()
+        border = self.part.borders[self.r].tolist()
+        local = [ag.index[b] for b in border]
+        table = []
+        for b in local:
+            dist, _ = ag.dijkstra(b, w)
+            table.append([dist[c] for c in local])
+        return border, table
+
+
+def _attach(names: Dict[str, str], n: int) -> Tuple[Dict[str, np.ndarray], List[shared_memory.SharedMemory]]:
+    handles = [shared_memory.SharedMemory(name=nm) for nm in names.values()]
+    arrays = {k: np.ndarray((n,), dtype=np.float64, buffer=h.buf) for k, h in zip(names, handles)}
+    return arrays, handles
+
+
+def _worker(conn, names: Dict[str, str], n: int, r: int, lo: int, hi: int, seed: np.random.SeedSequence,
+            part: Partition) -> None:
+    arrays, handles = _attach(names, n)
+    statics = {k: arrays.pop(k) for k in list(arrays) if k not in SHARED_FIELDS}
+    region = _Region(r, lo, hi, arrays, statics, seed, part)
+    try:
+        while True:
+            cmd, arg = conn.recv()
+            if cmd == "stop":
+                break
+            try:
+                result = region.step(arg) if cmd == "step" else region.overlay(arg)
+                conn.send(("ok", result))
+            except Exception as e:  # 호출 측에서 다시 던진다
+                conn.send(("error", f"{type(e).__name__}: {e}"))
+    finally:
+        del region, arrays, statics
+        for h in handles:
+            h.close()
+        conn.close()
+
+
+class PartitionedSimulation:
+    """영역별 작업 프로세스로 link_state를 진행한다.
+
+    with PartitionedSimulation(net, parts=8) as sim:
+        sim.step(1000)
+        path = sim.router("cross").route(src, dst)
+    진행 중 net.link_state 배열은 공유 메모리를 가리키며, close() 시 일반 배열로 되돌린다.
+    step()은 성능을 위해 간선 속성(availability, key_pool_bits)을 갱신하지 않는다 — 필요하면 sync_edges().
+    """
+
+    def __init__(self, net: QKDNetwork, parts: Optional[int] = None, processes: bool = True):
+        self.net = net
+        self.parts = max(1, int(parts or os.cpu_count() or 1))
+        self.partition = partition_network(net, self.parts)
+        n = len(net.edge_list)
+        self._n = n
+        fields = list(SHARED_FIELDS) + ["length_km"] + (["skr_bps"] if "skr_bps" in net.link_state else [])
+        length = np.array([net.edges[e].get("length_km", 1.0) for e in net.edge_list], dtype=np.float64)
+        source = dict(net.link_state, length_km=length)
+        self._shm: List[shared_memory.SharedMemory] = []
+        shared: Dict[str, np.ndarray] = {}
+        names: Dict[str, str] = {}
+        for name in fields:
+            h = shared_memory.SharedMemory(create=True, size=max(8, n * 8))
+            self._shm.append(h)
+            arr = np.ndarray((n,), dtype=np.float64, buffer=h.buf)
+            arr[:] = source[name]
+            shared[name] = arr
+            names[name] = h.name
+        for name in SHARED_FIELDS:
+            net.link_state[name] = shared[name]
+        self.statics = {k: shared[k] for k in fields if k not in SHARED_FIELDS}
+        seeds = np.random.SeedSequence(net.seed).spawn(self.parts)
+        b = self.partition.bounds
+        self._regions: List[_Region] = []
+        self._conns = []
+        self._procs = []
+        if processes:
+            ctx = mp.get_context()
+            for r in range(self.parts):
+                parent, child = ctx.Pipe()
+                p = ctx.Process(target=_worker, name=f"qkd-region-{r}", daemon=True,
+                                args=(child, names, n, r, int(b[r]), int(b[r + 1]), seeds[r], self.partition))
+                p.start()
+                child.close()
+                self._conns.append(parent)
+                self._procs.append(p)
+        else:
+            state = {k: shared[k] for k in SHARED_FIELDS}
+            self._regions = [_Region(r, int(b[r]), int(b[r + 1]), state, self.statics, seeds[r], self.partition)
+                             for r in range(self.parts)]
+
+    def _broadcast(self, cmd: str, arg: Any) -> List[Any]:
+        if not self._conns:
+            return [getattr(region, cmd)(arg) for region in self._regions]
+        for conn in self._conns:
+            conn.send((cmd, arg))
+        results = []
+        for conn in self._conns:
+            status, payload = conn.recv()
+            if status != "ok":
+                raise RuntimeError(f"region worker failed: {payload}")
+            results.append(payload)
+        return results
+
+    def step(self, steps: int = 1) -> int:
+        """모든 영역을 steps 단계 진행하고 현재 시각(t)을 반환한다."""
+        steps = max(0, int(steps))
+        profiling.count("sim.steps", steps)
+        with profiling.timer("sim.step.partitioned"):
+            if steps:
+                self._broadcast("step", steps)
+            self.net.t += steps
+        return self.net.t
+
+    def sync_edges(self) -> None:
+        self.net._sync_edges()
+
+    def overlay_tables(self, policy: str) -> List[Tuple[List[int], List[List[float]]]]:
+        with profiling.timer("partition.overlay"):
+            return self._broadcast("overlay", policy)
+
+    def router(self, policy: str = "cross") -> "OverlayRouter":
+        return OverlayRouter(self, policy)
+
+    def close(self) -> None:
+        """작업자를 멈추고 link_state를 일반 배열로 되돌린 뒤 공유 메모리를 해제한다."""
+        if not self._shm:
+            return
+        for conn in self._conns:
+            try:
+                conn.send(("stop", None))
+            except OSError:
+                pass
+        for p in self._procs:
+            p.join(timeout=5)
+            if p.is_alive():
+                p.terminate()
+        for conn in self._conns:
+            conn.close()
+        self._conns, self._procs, self._regions = [], [], []
+        for name in SHARED_FIELDS:
+            self.net.link_state[name] = np.array(self.net.link_state[name], copy=True)
+        self.statics = {}
+        for h in self._shm:
+            h.close()
+            h.unlink()
+        self._shm = []
+
+    def __enter__(self) -> "PartitionedSimulation":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+class OverlayRouter:
+    """경계 노드 오버레이 기반 영역 간 라우팅.
+
+    refresh() 시점의 간선 가중치(policy: baseline | cross)로 오버레이를 만들며, route()는 같은 가중치로
+    경로를 찾는다. 링크 상태가 진행된 뒤 최신 가중치를 쓰려면 refresh()를 다시 호출한다.
+    """
+
+    def __init__(self, sim: PartitionedSimulation, policy: str = "cross"):
+        if policy not in POLICIES:
+            raise ValueError(f"policy must be one of {POLICIES}")
+        self.sim = sim
+        self.policy = policy
+        self.part = sim.partition
+        self._index = {n: i for i, n in enumerate(self.part.nodes)}
+        self._graphs: Dict[int, Tuple[ArrayGraph, np.ndarray]] = {}
+        self.refresh()
+
+    def refresh(self) -> None:
+        sim, part = self.sim, self.part
+        skr = sim.statics.get("skr_bps")
+        self.weights = edge_weights(self.policy, sim.statics["length_km"], sim.net.link_state["availability"], skr)
+        self._local_w: Dict[int, List[float]] = {}
+        # 오버레이 인접: 노드 → [(이웃, 가중치, ("r", 영역) | ("e", 간선))]
+        adj: Dict[int, List[Tuple[int, float, Tuple[str, int]]]] = {}
+        for r, (border, table) in enumerate(sim.overlay_tables(self.policy)):
+            for i, b in enumerate(border):
+                row = table[i]
+                lst = adj.setdefault(b, [])
+                for j, c in enumerate(border):
+                    if i != j and row[j] < float("inf"):
+                        lst.append((c, row[j], ("r", r)))
+        for e in np.flatnonzero(part.boundary).tolist():
+            w = float(self.weights[e])
+            if w < float("inf"):
+                u, v = int(part.eu[e]), int(part.ev[e])
+                adj.setdefault(u, []).append((v, w, ("e", e)))
+                adj.setdefault(v, []).append((u, w, ("e", e)))
+        self._adj = adj
+
+    def _graph(self, r: int) -> Tuple[ArrayGraph, np.ndarray, List[float]]:
+        if r not in self._graphs:
+            self._graphs[r] = _region_graph(self.part, r)
+        ag, ids = self._graphs[r]
+        if r not in self._local_w:
+            self._local_w[r] = self.weights[ids].tolist()
+        return ag, ids, self._local_w[r]
+
+    def _inner_path(self, r: int, a: int, b: int) -> List[int]:
+        """영역 r 안에서 a→b 노드 번호 경로."""
+        ag, _, w = self._graph(r)
+        s, t = ag.index[a], ag.index[b]
+        _, pred = ag.dijkstra(s, w, target=t)
+        return ag.path_nodes(ag.path_edges(pred, s, t), s)
+
+    def route(self, src: Hashable, dst: Hashable) -> List[Hashable]:
+        """src→dst 노드 경로. 경로가 없으면 networkx.NetworkXNoPath."""
+        import networkx as nx
+        part = self.part
+        s, t = self._index[src], self._index[dst]
+        if s == t:
+            return [src]
+        rs, rt = int(part.node_part[s]), int(part.node_part[t])
+        inf = float("inf")
+        with profiling.timer("route.overlay"):
+            ag_s, _, w_s = self._graph(rs)
+            dist_s, pred_s = ag_s.dijkstra(ag_s.index[s], w_s)
+            ag_t, _, w_t = self._graph(rt)
+            dist_t, pred_t = ag_t.dijkstra(ag_t.index[t], w_t)
+            exit_cost = {b: dist_t[ag_t.index[b]] for b in part.borders[rt].tolist()}
+            best = dist_s[ag_s.index[t]] if rs == rt else inf
+            best_end: Optional[int] = None  # None이면 영역 내부 직행
+
+            dist: Dict[int, float] = {}
+            prev: Dict[int, Tuple[int, Tuple[str, int]]] = {}
+            heap = []
+            for b in part.borders[rs].tolist():
+                d = dist_s[ag_s.index[b]]
+                if d < inf:
+                    dist[b] = d
+                    heap.append((d, b))
+            heapq.heapify(heap)
+            done = set()
+            while heap:
+                d, u = heapq.heappop(heap)
+                if u in done:
+                    continue
+                if d >= best:
+                    break
+                done.add(u)
+                out = exit_cost.get(u, inf)
+                if d + out < best:
+                    best, best_end = d + out, u
+                for v, w, via in self._adj.get(u, ()):
+                    nd = d + w
+                    if nd < dist.get(v, inf):
+                        dist[v] = nd
+                        prev[v] = (u, via)
+                        heapq.heappush(heap, (nd, v))
+            if best == inf:
+                raise nx.NetworkXNoPath(f"no path between {src} and {dst}")
+
+            if best_end is None:
+                si = ag_s.index[s]
+                nodes = ag_s.path_nodes(ag_s.path_edges(pred_s, si, ag_s.index[t]), si)
+            else:
+                hops = []
+                v = best_end
+                while v in prev:
+                    u, via = prev[v]
+                    hops.append((u, v, via))
+                    v = u
+                hops.reverse()
+                si = ag_s.index[s]
+                nodes = ag_s.path_nodes(ag_s.path_edges(pred_s, si, ag_s.index[v]), si)
+                for u, v, (kind, ref) in hops:
+                    nodes.extend([v] if kind == "e" else self._inner_path(ref, u, v)[1:])
+                ti = ag_t.index[t]
+                tail = ag_t.path_nodes(ag_t.path_edges(pred_t, ti, ag_t.index[best_end]), ti)
+                nodes.extend(reversed(tail[:-1]))
+        return [part.nodes[i] for i in nodes]
+
+
+__all__ = ["geometric_partition", "partition_network", "Partition", "PartitionedSimulation", "OverlayRouter",
+           "edge_weights"]
@@ -0,0 +1,80 @@
+"""물리 계층 비밀키 생성률 모델 (decoy-state BB84, 약한 decoy + vacuum).
+
+모든 링크의 감쇠(dB) 배열을 한 번에 받아 NumPy 배열 연산으로 비밀키 생성률(bit/s)을 계산한다.
+GLLP 공식과 vacuum+weak decoy 하한(Ma et al., 2005)을 점근(무한 키) 근사로 사용한다.
+
+  η     = 10^(-(감쇠 + 수신측 손실)/10) · 검출 효율
+  Q_μ   = Y0 + 1 - e^{-ημ},          E_μ Q_μ = e0·Y0 + e_d(1 - e^{-ημ})     (신호/decoy 동일)
+  Y1_L  = μ/(μν - ν²) · (Q_ν e^ν - Q_μ e^μ ν²/μ² - (μ² - ν²)/μ² · Y0)
+  e1_U  = (E_ν Q_ν e^ν - e0·Y0) / (Y1_L ν)
+  R     = q · [Q1_L (1 - H2(e1_U)) - f_EC · Q_μ · H2(E_μ)],   Q1_L = Y1_L μ e^{-μ}
+
+결과는 파라미터 집합(LinkParams, 불변·해시 가능)별로 QKDNetwork에 캐시되며, 감쇠가 바뀌면
+(init_link_state) 캐시가 비워진다.
+"""
+from __future__ import annotations
+from dataclasses import dataclass, replace
+from typing import Any
+import numpy as np
+
+from . import profiling
+
+E0 = 0.5                # 잡음(dark count) 비트의 오류율
+
+
+@dataclass(frozen=True)
+class LinkParams:
+    """링크 공통 물리 파라미터. 값 객체(frozen)이므로 캐시 키로 쓴다."""
+    mu: float = 0.5                     # 신호 평균 광자 수
+    nu: float = 0.1                     # 약한 decoy 평균 광자 수
+    detector_efficiency: float = 0.1    # 수신측 검출 효율 η_d
+    dark_count: float = 1e-6            # 펄스당 dark count 확률 Y0
+    misalignment: float = 0.015         # 광학 정렬 오류 e_d
+    ec_efficiency: float = 1.16         # 오류 정정 효율 f_EC (≥1)
+    sifting: float = 0.5                # 기저 일치 비율 q
+    receiver_loss_db: float = 0.0       # 수신측 내부 손실
+    pulse_rate_hz: float = 1e9          # 송신 펄스 반복률
+
+    def with_(self, **changes: Any) -> "LinkParams":
+        return replace(self, **changes)
+
+
+DEFAULT_PARAMS = LinkParams()
+
+
+def _h2(p: np.ndarray) -> np.ndarray:
+    """이진 엔트로피 (0, 1 경계는 0으로)."""
+    p = np.clip(p, 1e-15, 1.0 - 1e-15)
+    return -p * np.log2(p) - (1.0 - p) * np.log2(1.0 - p)
+
+
+def secret_key_rate(attenuation_db: np.ndarray, params: LinkParams = DEFAULT_PARAMS) -> np.ndarray:
+    """감쇠 배열 → 링크별 비밀키 생성률(bit/s). 양의 키를 만들 수 없는 링크는 0."""
+    p = params
+    if not 0.0 < p.nu < p.mu:
+        raise ValueError("decoy intensity must satisfy 0 < nu < mu")
+    with profiling.timer("physics.skr"):
+        att = np.asarray(attenuation_db, dtype=np.float64)
+        eta = np.power(10.0, -(att + p.receiver_loss_db) / 10.0) * p.detector_efficiency
+        y0 = p.dark_count
+
+        def gain(x: float):
+            det = -np.expm1(-eta * x)               # 1 - e^{-ηx}
+            q = y0 + det
+            return q, (E0 * y0 + p.misalignment * det) / q
+
+        q_mu, e_mu = gain(p.mu)
+        q_nu, e_nu = gain(p.nu)
+        mu, nu = p.mu, p.nu
+        y1 = mu / (mu * nu - nu * nu) * (q_nu * np.exp(nu) - q_mu * np.exp(mu) * nu * nu / (mu * mu)
+                                         - (mu * mu - nu * nu) / (mu * mu) * y0)
+        y1 = np.maximum(y1, 0.0)
+        with np.errstate(divide="ignore", invalid="ignore"):
+            e1 = np.where(y1 > 0, (e_nu * q_nu * np.exp(nu) - E0 * y0) / (y1 * nu), E0)
+        e1 = np.clip(e1, 0.0, E0)
+        q1 = y1 * mu * np.exp(-mu)
+        r = p.sifting * (q1 * (1.0 - _h2(e1)) - p.ec_efficiency * q_mu * _h2(e_mu))
+        return np.maximum(r, 0.0) * p.pulse_rate_hz
+
+
+__all__ = ["LinkParams", "DEFAULT_PARAMS", "secret_key_rate"]
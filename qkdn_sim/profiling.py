@@ -0,0 +1,109 @@
+"""qkdn_sim 계측(프로파일링) 레이어.
+
+이름 붙은 타이머와 카운터를 모아 `qkd run --profile` 결과로 내보낸다.
+
+- timer(name): with 블록 실행 시간을 누적 (호출 수, 합계, 최대)
+- count(name, n): 카운터 증가 (Dijkstra relaxation, RL 에피소드/스텝 등)
+- report(): {"timers": {...}, "counters": {...}} 형태의 JSON 직렬화 가능한 dict
+
+비활성(기본) 상태에서 timer()는 공유 nullcontext를, count()는 즉시 반환하므로 계측 비용이
+사실상 없다. 반복문 안쪽은 호출 측에서 `if profiling.ENABLED:`로 한 번만 분기한다.
+전역 상태이므로 단일 스레드 실행(CLI) 기준이다.
+"""
+from __future__ import annotations
+import json
+import time
+from contextlib import nullcontext
+from typing import Any, Dict, List
+
+ENABLED = False
+
+_NULL = nullcontext()
+_timers: Dict[str, List[float]] = {}   # name -> [calls, total_s, max_s]
+_counters: Dict[str, int] = {}
+
+
+def enable() -> None:
+    global ENABLED
+    ENABLED = True
+
+
+def disable() -> None:
+    global ENABLED
+    ENABLED = False
+
+
+def reset() -> None:
+    _timers.clear()
+    _counters.clear()
+
+
+class _Timer:
+    __slots__ = ("name", "t0")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.t0 = 0.0
+
+    def __enter__(self) -> "_Timer":
+        self.t0 = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        add_time(self.name, time.perf_counter() - self.t0)
+
+
+def add_time(name: str, seconds: float) -> None:
+    """외부에서 잰 구간 시간을 타이머에 합산한다 (예: import 시간)."""
+    rec = _timers.get(name)
+    if rec is None:
+        _timers[name] = [1, seconds, seconds]
+    else:
+        rec[0] += 1
+        rec[1] += seconds
+        if seconds > rec[2]:
+            rec[2] = seconds
+
+
+def timer(name: str):
+    """with profiling.timer("phase"): ... — 비활성 시 nullcontext."""
+    return _Timer(name) if ENABLED else _NULL
+
+
+def count(name: str, n: int = 1) -> None:
+    if ENABLED:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def report() -> Dict[str, Any]:
+    timers = {
+        name: {
+            "calls": int(calls),
+            "total_ms": total * 1e3,
+            "mean_ms": total * 1e3 / calls,
+            "max_ms": peak * 1e3,
+        }
+        for name, (calls, total, peak) in sorted(_timers.items())
+    }
+    return {"timers": timers, "counters": dict(sorted(_counters.items()))}
+
+
+def dump_json(path: str) -> str:
+    with open(path, "w", encoding="utf-8") as f:
+        json.dump(report(), f, indent=2)
+        f.write("\n")
+    return path
+
+
+def format_report() -> str:
+    """사람이 읽기 위한 요약 표."""
+    rep = report()
+    lines = [f"{'phase':<24}{'calls':>8}{'total ms':>12}{'mean ms':>12}{'max ms':>12}"]
+    for name, t in rep["timers"].items():
+        lines.append(f"{name:<24}{t['calls']:>8}{t['total_ms']:>12.3f}{t['mean_ms']:>12.3f}{t['max_ms']:>12.3f}")
+    for name, n in rep["counters"].items():
+        lines.append(f"{name:<24}{n:>8}")
+    return "\n".join(lines)
+
+
+__all__ = ["enable", "disable", "reset", "timer", "add_time", "count", "report", "dump_json", "format_report"]
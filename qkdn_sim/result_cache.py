@@ -0,0 +1,226 @@
+"""시나리오 결과의 내용 주소(content-addressed) 디스크 캐시.
+
+키 = SHA-256(토폴로지 지문 + 시나리오 파라미터 + qkdn_sim 코드 버전). 같은 입력이면 같은 키이므로
+반복 실행은 RL 학습/라우팅/플롯 없이 저장된 결과(경로, 지표 JSON, PNG 등 파일)를 바로 돌려준다.
+
+디렉터리 구성 (root 기본값: $PQC_QKD_CACHE, 없으면 $XDG_CACHE_HOME/pqc_qkd 또는 ~/.cache/pqc_qkd)
+  entries/<키 앞 2자리>/<키>/meta.json   지표/경로 + 저장 시각
+  entries/<키 앞 2자리>/<키>/<파일 이름>  PNG 등 부가 파일
+  tmp/                                   작성 중인 항목
+
+프로세스 간 안전성
+  - 항목은 tmp/에서 완성한 뒤 디렉터리 rename 한 번으로 공개한다. 다른 프로세스가 먼저 같은 키를
+    공개했으면 자기 것은 버린다(내용이 같으므로).
+  - 축출은 항목을 tmp/로 rename한 뒤 지운다. 읽는 쪽은 항목 파일을 전부 메모리로 읽으므로 중간에
+    축출되면 미스로 처리될 뿐 부분 결과를 보지 않는다.
+  - 조회 시 meta.json의 mtime을 갱신해 LRU 순서를 기록하고, 전체 크기가 max_bytes를 넘으면
+    잠금(.lock, fcntl.flock)을 잡은 한 프로세스가 오래된 항목부터 지운다.
+"""
+from __future__ import annotations
+import hashlib
+import json
+import os
+import secrets
+import shutil
+import time
+from dataclasses import dataclass, field
+from functools import lru_cache
+from typing import Any, Dict, Mapping, Optional
+import networkx as nx
+
+try:
+    import fcntl  # type: ignore
+except ImportError:  # Windows: 축출 잠금 없이 동작 (rename 기반이라 읽기는 여전히 안전)
+    fcntl = None  # type: ignore
+
+DEFAULT_MAX_BYTES = 256 * 1024 * 1024
+META = "meta.json"
+
+
+def default_cache_dir() -> str:
+    env = os.environ.get("PQC_QKD_CACHE")
+    if env:
+        return env
+    base = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return os.path.join(base, "pqc_qkd")
+
+
+@lru_cache(maxsize=1)
+def code_version() -> str:
+    """qkdn_sim 소스(.py) 내용의 해시. 코드가 바뀌면 이전 결과는 자동으로 무효가 된다.
+
+    소스를 읽을 수 없는 배포본(PyInstaller 등)에서는 패키지 __version__을 쓴다.
+    """
+    from . import __version__
+    pkg = os.path.dirname(os.path.abspath(__file__))
+    h = hashlib.sha256(__version__.encode("utf-8"))
+    try:
+        names = sorted(n for n in os.listdir(pkg) if n.endswith(".py"))
+        for name in names:
+            with open(os.path.join(pkg, name), "rb") as f:
+                h.update(name.encode("utf-8") + b"\0" + f.read())
+    except OSError:
+        return __version__
+    return h.hexdigest()[:16] if names else __version__
+
+
+def topology_fingerprint(G: nx.Graph) -> str:
+    """노드/간선과 그 속성(좌표, 길이, 감쇠, 가용성 등)의 해시. 시뮬레이션 시작 전 상태에 적용한다."""
+    h = hashlib.sha256()
+    for n in sorted(G.nodes, key=str):
+        h.update(json.dumps([str(n), G.nodes[n]], sort_keys=True, default=str).encode("utf-8"))
+    edges = sorted(((tuple(sorted((str(u), str(v)))), d) for u, v, d in G.edges(data=True)), key=lambda e: e[0])
+    for (a, b), d in edges:
+        h.update(json.dumps([a, b, d], sort_keys=True, default=str).encode("utf-8"))
+    h.update(str(getattr(G, "seed", "")).encode("utf-8"))
+    return h.hexdigest()
+
+
+def scenario_key(G: nx.Graph, params: Mapping[str, Any]) -> str:
+    """토폴로지 지문 + 시나리오 파라미터(JSON 직렬화 가능) + 코드 버전 → 캐시 키."""
+    blob = json.dumps({"topology": topology_fingerprint(G), "params": dict(params), "code": code_version()},
+                      sort_keys=True, default=str)
+    return hashlib.sha256(blob.encode("utf-8")).hexdigest()
+
+
+@dataclass
+class CachedResult:
+    key: str
+    data: Dict[str, Any]
+    files: Dict[str, bytes] = field(default_factory=dict)
+
+
+class ResultCache:
+    """크기 제한 LRU 디스크 캐시 (여러 프로세스가 동시에 읽고 써도 안전)."""
+
+    def __init__(self, root: Optional[str] = None, max_bytes: int = DEFAULT_MAX_BYTES):
+        self.root = root or default_cache_dir()
+        self.max_bytes = max_bytes
+        self.entries = os.path.join(self.root, "entries")
+        self.tmp = os.path.join(self.root, "tmp")
+
+    def _entry(self, key: str) -> str:
+        return os.path.join(self.entries, key[:2], key)
+
+    def get(self, key: str) -> Optional[CachedResult]:
+        path = self._entry(key)
+        try:
+            with open(os.path.join(path, META), "rb") as f:
+                meta = json.loads(f.read().decode("utf-8"))
+            files = {}
+            for name in meta.get("files", []):
+                with open(os.path.join(path, name), "rb") as f:
+                    files[name] = f.read()
+            os.utime(os.path.join(path, META))  # LRU: 최근 사용 시각
+        except (OSError, ValueError):
+            return None  # 없음, 축출 중, 손상 → 미스
+        return CachedResult(key, meta["data"], files)
+
+    def put(self, key: str, data: Mapping[str, Any], files: Optional[Mapping[str, bytes]] = None) -> CachedResult:
+        """결과를 저장한다. 같은 키가 이미 있으면 그대로 두고 사용 시각만 갱신한다."""
+        files = dict(files or {})
+        for name in files:
+            if name == META or os.path.basename(name) != name:
+                raise ValueError(f"invalid cache file name: {name}")
+        final = self._entry(key)
+        os.makedirs(os.path.dirname(final), exist_ok=True)
+        os.makedirs(self.tmp, exist_ok=True)
+        staging = os.path.join(self.tmp, f"{key}.{os.getpid()}.{secrets.token_hex(4)}")
+        os.mkdir(staging)
+        try:
+            for name, blob in files.items():
+                with open(os.path.join(staging, name), "wb") as f:
+                    f.write(blob)
+            meta = {"key": key, "created": time.time(), "files": sorted(files), "data": dict(data)}
+            with open(os.path.join(staging, META), "wb") as f:
+                f.write(json.dumps(meta, default=str).encode("utf-8"))
+            try:
+                os.rename(staging, final)
+            except OSError:
+                if not os.path.isdir(final):
+                    raise
+                shutil.rmtree(staging, ignore_errors=True)  # 다른 프로세스가 먼저 공개
+                os.utime(os.path.join(final, META))
+        except BaseException:
+            shutil.rmtree(staging, ignore_errors=True)
+            raise
+        self.evict()
+        return CachedResult(key, dict(data), files)
+
+    def _scan(self):
+        """(mtime, 크기, 경로) 목록."""
+        out = []
+        try:
+            buckets = list(os.scandir(self.entries))
+        except FileNotFoundError:
+            return out
+        for bucket in buckets:
+            try:
+                items = list(os.scandir(bucket.path))
+            except OSError:
+                continue
+            for entry in items:
+                try:
+                    size = sum(f.stat().st_size for f in os.scandir(entry.path))
+                    mtime = os.stat(os.path.join(entry.path, META)).st_mtime
+                except OSError:
+                    continue
+                out.append((mtime, size, entry.path))
+        return out
+
+    def _remove(self, path: str) -> None:
+        os.makedirs(self.tmp, exist_ok=True)
+        doomed = os.path.join(self.tmp, f"evict.{os.getpid()}.{secrets.token_hex(4)}")
+        try:
+            os.rename(path, doomed)
+        except OSError:
+            return  # 이미 다른 프로세스가 축출
+        shutil.rmtree(doomed, ignore_errors=True)
+
+    def _sweep_tmp(self, max_age: float = 3600.0) -> None:
+        """중간에 죽은 프로세스가 남긴 작성/축출 잔여물 정리."""
+        try:
+            items = list(os.scandir(self.tmp))
+        except FileNotFoundError:
+            return
+        cutoff = time.time() - max_age
+        for entry in items:
+            try:
+                if entry.stat().st_mtime < cutoff:
+                    shutil.rmtree(entry.path, ignore_errors=True)
+            except OSError:
+                continue
+
+    def evict(self, max_bytes: Optional[int] = None) -> int:
+        """전체 크기가 max_bytes 이하가 될 때까지 가장 오래 안 쓴 항목부터 지운다. 지운 항목 수 반환."""
+        limit = self.max_bytes if max_bytes is None else max_bytes
+        os.makedirs(self.root, exist_ok=True)
+        fd = os.open(os.path.join(self.root, ".lock"), os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            if fcntl is not None:
+                fcntl.flock(fd, fcntl.LOCK_EX)
+            self._sweep_tmp()
+            entries = self._scan()
+            total = sum(size for _, size, _ in entries)
+            removed = 0
+            for _, size, path in sorted(entries):
+                if total <= limit:
+                    break
+                self._remove(path)
+                total -= size
+                removed += 1
+            return removed
+        finally:
+            os.close(fd)  # flock은 fd와 함께 풀린다
+
+    def clear(self) -> int:
+        return self.evict(0)
+
+    def stats(self) -> Dict[str, Any]:
+        entries = self._scan()
+        return {"root": self.root, "entries": len(entries), "bytes": sum(s for _, s, _ in entries),
+                "max_bytes": self.max_bytes}
+
+
+__all__ = ["ResultCache", "CachedResult", "scenario_key", "topology_fingerprint", "code_version",
+           "default_cache_dir"]
@@ -1,7 +1,7 @@
 """QKD 네트워크 라우팅 알고리즘 모음.
 
 baseline_route: 거리 기반 최단 경로.
-crosslayer_route: 거리 + 가용성 가중 혼합.
+crosslayer_route: 거리 + 가용성 가중 혼합 (간선 속성 skr_bps가 있으면 키 생성률도 반영).
 rl_route: 간단한 Q-learning을 통한 경로 탐색(교육용, 소규모 그래프 전제).
 """
 from __future__ import annotations
@@ -10,23 +10,65 @@ import random
 from typing import List, Tuple, Dict, Any
 import networkx as nx
 
+from . import profiling
+
+SKR_HALF_BPS = 1e6      # 키 생성률 패널티가 절반이 되는 비밀키 생성률 (bit/s)
+
+
+def _rate_penalty(data: Dict[str, Any]) -> float:
+    """skr_bps → [0, 1) 패널티 (속성 없으면 0, 키를 못 만드는 링크는 1)."""
+    skr = data.get("skr_bps")
+    if skr is None:
+        return 0.0
+    return SKR_HALF_BPS / (skr + SKR_HALF_BPS)
+
 # ----------------------------- 기본/크로스레이어 라우팅 ----------------------------- #
 
-def baseline_route(G: nx.Graph, src: str, dst: str) -> List[str]:
-    """길이(length_km) 가중 최단 경로."""
-    return nx.shortest_path(G, src, dst, weight="length_km")
+def _shortest_path(G: nx.Graph, src: str, dst: str, weight: Any, phase: str) -> List[str]:
+    """nx.shortest_path + 계측. profiling 활성 시 가중치 평가(= Dijkstra relaxation) 횟수를 센다."""
+    if not profiling.ENABLED:
+        return nx.shortest_path(G, src, dst, weight=weight)
+    fn = weight if callable(weight) else (lambda u, v, d: d.get(weight, 1))
+
+    def counted(u: str, v: str, data: Dict[str, Any]) -> float:
+        profiling.count("dijkstra.relaxations")
+        return fn(u, v, data)
+
+    profiling.count("dijkstra.calls")
+    with profiling.timer(phase):
+        return nx.shortest_path(G, src, dst, weight=counted)
+
+
+def baseline_route(G: nx.Graph, src: str, dst: str, index: Any = None) -> List[str]:
+    """길이(length_km) 가중 최단 경로.
+
+    index: length_km로 만든 ContractionHierarchy(qkdn_sim.contraction) 또는 좌표 휴리스틱
+    GeometricAStar(qkdn_sim.astar)를 주면 그 색인으로 질의한다.
+    """
+    if index is not None:
+        return index.route(src, dst)
+    return _shortest_path(G, src, dst, "length_km", "route.baseline")
 
 
-def crosslayer_route(G: nx.Graph, src: str, dst: str) -> List[str]:
+def crosslayer_route(G: nx.Graph, src: str, dst: str, index: Any = None) -> List[str]:
     """거리 + (1-가용성) 가중 결합.
     낮은 availability(불안정 링크)에 패널티를 부여해 우회하도록 유도.
     weight = length_km * (1 + (1 - availability))
+    skr_bps 속성이 있으면(QKDNetwork.apply_physics) 키 생성률이 낮을수록 패널티를 더하고,
+    키를 만들 수 없는 링크(skr_bps == 0)는 사용하지 않는다:
+    weight = length_km * (1 + (1 - availability) + SKR_HALF_BPS / (skr_bps + SKR_HALF_BPS))
+    index: "cross" 가중치로 만든 ContractionHierarchy 또는 GeometricAStar. 링크 상태가 바뀌면
+    index.customize(G)로 갱신한다.
     """
-    def weight(u: str, v: str, data: Dict[str, Any]) -> float:
+    if index is not None:
+        return index.route(src, dst)
+    def weight(u: str, v: str, data: Dict[str, Any]) -> Any:
+        if data.get("skr_bps", 1.0) <= 0.0:
+            return None  # networkx: 간선 제외
         length = data.get("length_km", 1.0)
         availability = data.get("availability", 0.95)
-        return length * (1.0 + (1.0 - availability))
-    return nx.shortest_path(G, src, dst, weight=weight)
+        return length * (1.0 + (1.0 - availability) + _rate_penalty(data))
+    return _shortest_path(G, src, dst, weight, "route.crosslayer")
 
 # ----------------------------- 간단한 RL 라우팅 ----------------------------- #
 
@@ -36,6 +78,7 @@ class RLAgent:
     상태: 현재 노드
     행동: 인접 노드로 이동
     보상: -length_km + availability * 0.5 (도착 시 추가 +5)
+          skr_bps 속성이 있으면 + 0.5 * (1 - 키 생성률 패널티), 키를 못 만드는 링크는 -10
     """
     def __init__(self, G: nx.Graph, src: str, dst: str, alpha: float = 0.3, gamma: float = 0.9):
         self.G = G
@@ -47,11 +90,13 @@ class RLAgent:
 
     def _reward(self, u: str, v: str) -> float:
         data = self.G.get_edge_data(u, v)
-        if not data:
+        if not data or data.get("skr_bps", 1.0) <= 0.0:
             return -10.0
         length = data.get("length_km", 1.0)
         availability = data.get("availability", 0.95)
         r = -length + availability * 0.5
+        if "skr_bps" in data:
+            r += 0.5 * (1.0 - _rate_penalty(data))
         if v == self.dst:
             r += 5.0
         return r
@@ -73,6 +118,7 @@ class RLAgent:
         return best_v
 
     def train(self, episodes: int = 300, max_steps: int = 20) -> None:
+        taken = 0
         for ep in range(episodes):
             state = self.src
             epsilon = max(0.05, 1.0 - ep / episodes)  # 선형 감소 탐욕
@@ -90,6 +136,10 @@ class RLAgent:
                 new_q = old_q + self.alpha * (reward + self.gamma * max_next_q - old_q)
                 self.Q[(state, action)] = new_q
                 state = action
+                taken += 1
+        if profiling.ENABLED:
+            profiling.count("rl.episodes", episodes)
+            profiling.count("rl.steps", taken)
 
     def best_path(self) -> List[str]:
         path = [self.src]
@@ -125,7 +175,9 @@ class RLAgent:
 
 def rl_route(G: nx.Graph, src: str, dst: str, episodes: int = 300) -> List[str]:
     agent = RLAgent(G, src, dst)
-    agent.train(episodes=episodes)
-    return agent.best_path()
+    with profiling.timer("rl.train"):
+        agent.train(episodes=episodes)
+    with profiling.timer("rl.best_path"):
+        return agent.best_path()
 
 __all__ = ["baseline_route", "crosslayer_route", "rl_route", "RLAgent"]
@@ -0,0 +1,6 @@
+import sys
+
+from app_gui.tetris_engine import main
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+"""
+A forked child must not reuse the parent's cached DEK: every sealed blob
+from parent and child needs a distinct (DEK header, nonce) pair.
+
+Runs under pytest or directly: python scripts/test_secure_store_fork.py
+"""
+import os
+import sys
+import json
+import tempfile
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+from lib import secure_store  # noqa: E402
+
+WRITES = 3
+
+
+def _header_and_nonce(blob: bytes):
+    mv = memoryview(blob)
+    p = 4
+    p += 1 + mv[4]
+    ct_len = int.from_bytes(mv[p:p+2], 'big')
+    p += 2 + ct_len + 8 + 12
+    p += 1 + mv[p]
+    return bytes(mv[:p]).hex(), bytes(mv[p:p+12]).hex()
+
+
+def _seal_n(n: int):
+    return [_header_and_nonce(secure_store._seal_with_dek(b'{}')) for _ in range(n)]
+
+
+def test_fork_does_not_reuse_dek_nonces():
+    if not hasattr(os, 'fork'):
+        return
+    with tempfile.TemporaryDirectory() as tmp:
+        saved = secure_store.DATA_DIR, secure_store.MASTER_KEY_PATH
+        secure_store.DATA_DIR = tmp
+        secure_store.MASTER_KEY_PATH = os.path.join(tmp, 'master.key')
+        secure_store.rotate_dek()
+        try:
+            before = _seal_n(WRITES)  # parent now holds a DEK with counter = WRITES
+            r, w = os.pipe()
+            pid = os.fork()
+            if pid == 0:
+                code = 0
+                try:
+                    os.close(r)
+                    with os.fdopen(w, 'w') as f:
+                        json.dump(_seal_n(WRITES), f)
+                except BaseException:
+                    code = 1
+                os._exit(code)
+            os.close(w)
+            with os.fdopen(r) as f:
+                child = [tuple(x) for x in json.load(f)]
+            _, status = os.waitpid(pid, 0)
+            assert os.waitstatus_to_exitcode(status) == 0
+            after = _seal_n(WRITES)
+        finally:
+            secure_store.DATA_DIR, secure_store.MASTER_KEY_PATH = saved
+            secure_store.rotate_dek()
+    pairs = before + child + after
+    assert len(set(pairs)) == len(pairs), 'nonce reused under the same DEK'
+    parent_headers = {h for h, _ in before + after}
+    assert not parent_headers & {h for h, _ in child}, 'child wrote with the parent DEK'
+
+
+if __name__ == '__main__':
+    test_fork_does_not_reuse_dek_nonces()
+    print('ok')